@@ -26,13 +26,37 @@ def create_app():
             app.logger.setLevel(gunicorn_error_handlers.level)
 
     # Extensions
+    # Metrics first: it swaps in a pool class that times checkouts, and
+    # db.init_app builds the engine
+    from .metrics import metrics
+    metrics.init_app(app)
+
     db.init_app(app)
     migrate.init_app(app, db)
+    from .ledger import utc_sessions
+    with app.app_context():
+        utc_sessions(db.engine)
     jwt.init_app(app)
 
+    from .cache import response_cache
+    response_cache.init_app(app)
+
+    from .passwords import passwords, HasherBusy, RETRY_AFTER
+    passwords.init_app(app)
+
+    from .tokens import tokens
+    tokens.init_app(app)
+
+    from .instrumentation import instrumentation
+    instrumentation.init_app(app)
+
+    from .holds import sweeper
+    sweeper.init_app(app)
+
     # CORS
     origins = app.config.get("CORS_ORIGINS", ["*"])
-    CORS(app, resources={r"/api/*": {"origins": origins}}, supports_credentials=True)
+    CORS(app, resources={r"/api/*": {"origins": origins}}, supports_credentials=True,
+         expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"])
 
     # Blueprints
     from .routes.health import bp as health_bp
@@ -41,6 +65,7 @@ def create_app():
     from .routes.bookings import bp as bookings_bp
     from .routes.admin import bp as admin_bp
     from .routes.me import bp as me_bp
+    from .routes.search import bp as search_bp
 
     app.register_blueprint(health_bp, url_prefix="/api")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -48,6 +73,7 @@ def create_app():
     app.register_blueprint(bookings_bp, url_prefix="/api")
     app.register_blueprint(admin_bp, url_prefix="/api")
     app.register_blueprint(me_bp, url_prefix="/api")
+    app.register_blueprint(search_bp, url_prefix="/api")
 
     # Error handlers -> JSON as default
     @app.errorhandler(404)
@@ -58,9 +84,20 @@ def create_app():
     def _400(e):
         return jsonify({"error": "Bad request", "detail": str(e)}), 400
 
+    # Password hashing pool saturated (login, register, password change)
+    @app.errorhandler(HasherBusy)
+    def _busy(_e):
+        resp = jsonify({"error": "Server busy, please retry"})
+        resp.headers["Retry-After"] = str(RETRY_AFTER)
+        return resp, 503
+
     @app.errorhandler(500)
     def _500(e):
         app.logger.exception("Server error: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
+    if app.config.get("WARMUP_ON_START"):
+        from .probes import warmup
+        app.logger.info("Warmup: %s", warmup(app))
+
     return app
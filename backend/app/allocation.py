@@ -0,0 +1,290 @@
+import bisect
+from datetime import date, timedelta
+from sqlalchemy import bindparam, text
+from . import db
+
+# Room assignment: the physical room (rooms table) each booking gets.
+#
+# The ledger only promises that a room type has a room free on every night of
+# a stay; no single room may be free for all of them (room 101 taken Monday,
+# room 102 Tuesday). So stays are placed best-fit: a room's stays are a sorted
+# list of non-overlapping [first night, last night + 1) intervals, and a new
+# stay goes where it fills the tightest gap, which keeps long free runs whole
+# for long stays. When no room has a gap big enough, the room type's upcoming
+# stays are re-packed: taken in order of first night and dealt to rooms
+# greedily, which never fails while no night has more stays than rooms (what
+# the ledger guarantees) and costs O(n log n) for n stays.
+#
+# Assignment runs in the booking transaction, after the ledger reserve, with
+# the room type's rooms locked FOR UPDATE so assignments to one room type take
+# turns. Checked-in guests keep their room.
+
+# Statuses that occupy a room; no-shows and checked-out guests have left, and
+# their room_id stays on the booking as history
+HOLDS_ROOM = ("pending", "confirmed", "checked_in")
+
+_EPOCH = date(1970, 1, 1)
+
+# Free nights on either side of a stay count up to this many: longer runs
+# fit any stay, so best fit need not tell them apart (and needs to look only
+# this far around a new stay)
+_HORIZON = 30
+
+# Nights as days since 1970-01-01, with the ledger's boundaries (NIGHTS_SQL)
+_STAY_SQL = """
+    SELECT b.id, b.hotel_id, b.room_type_id, b.room_id, b.status,
+           CAST(b.check_in AS date) - DATE '1970-01-01' AS first,
+           GREATEST(CAST(b.check_out AS date), CAST(b.check_in AS date) + 1) - DATE '1970-01-01' AS stop
+    FROM bookings b
+"""
+_HOLDS_SQL = "b.status <> 'cancelled' AND b.status IN ({})".format(", ".join(f"'{s}'" for s in HOLDS_ROOM))
+
+
+class RoomSchedule:
+    """One room's stays as sorted, non-overlapping [start, end) night intervals."""
+
+    __slots__ = ("room_id", "starts", "ends")
+
+    def __init__(self, room_id: int):
+        self.room_id = room_id
+        self.starts = []
+        self.ends = []
+
+    def gap(self, start: int, end: int):
+        """Free nights left around [start, end) if it fits in this room, else None."""
+        # Stays before i start before `end`; ends are sorted too, so only the
+        # last of them can reach past `start`
+        i = bisect.bisect_left(self.starts, end)
+        before = self.ends[i - 1] if i else None
+        if before is not None and before > start:
+            return None
+        after = self.starts[i] if i < len(self.starts) else None
+        return (min(start - before, _HORIZON) if before is not None else _HORIZON) + \
+            (min(after - end, _HORIZON) if after is not None else _HORIZON)
+
+    def add(self, start: int, end: int):
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+
+def best_fit(schedules, start: int, end: int):
+    """The schedule where [start, end) leaves the smallest gap, or None if no room is free."""
+    best, best_gap = None, None
+    for s in schedules:
+        g = s.gap(start, end)
+        if g is not None and (best_gap is None or g < best_gap):
+            best, best_gap = s, g
+    return best
+
+
+def pack(room_ids, stays, stable: bool = True) -> dict:
+    """Assign one room type's stays to its rooms; booking id -> room id (None if none is free).
+
+    `stays` are (booking_id, current room_id or None, start, end, fixed) and a
+    fixed stay keeps its room. The rest are taken by first night; each gets
+    its current room if `stable` and that room is free by then, otherwise the
+    free room that was freed last, so the idle gap it leaves is the smallest.
+    """
+    free_at = dict.fromkeys(room_ids, float("-inf"))
+    out = {}
+    for bid, rid, start, end, fixed in stays:
+        if fixed:
+            out[bid] = rid
+            if rid in free_at:
+                free_at[rid] = max(free_at[rid], end)
+    # (free from night, room id), sorted: the best fit for a stay starting at
+    # night n is the last entry not after n
+    free = sorted((night, rid) for rid, night in free_at.items())
+    for bid, rid, start, end, _ in sorted((s for s in stays if not s[4]), key=lambda s: (s[2], s[3], s[0])):
+        if stable and rid in free_at and free_at[rid] <= start:
+            i = bisect.bisect_left(free, (free_at[rid], rid))
+        else:
+            i = bisect.bisect_right(free, (start, float("inf"))) - 1
+            if i < 0:
+                out[bid] = None
+                continue
+        room = free.pop(i)[1]
+        free_at[room] = end
+        bisect.insort(free, (end, room))
+        out[bid] = room
+    return out
+
+
+def overlaps(stays) -> list:
+    """(booking id, booking id, room id) for every two stays in one room on a common night.
+
+    `stays` are (booking_id, room_id, start, end); None rooms are skipped.
+    """
+    out = []
+    by_room = {}
+    for bid, rid, start, end in stays:
+        if rid is not None:
+            by_room.setdefault(rid, []).append((start, end, bid))
+    for rid, items in by_room.items():
+        items.sort()
+        last_end, last_bid = None, None
+        for start, end, bid in items:
+            if last_end is not None and start < last_end:
+                out.append((last_bid, bid, rid))
+            if last_end is None or end > last_end:
+                last_end, last_bid = end, bid
+    return out
+
+
+def _lock_rooms(hotel_ids, room_type_ids=None) -> dict:
+    """Room type id -> active room ids, locked in id order; all of the hotels' rooms without `room_type_ids`."""
+    where, params = "", {"hids": sorted(hotel_ids)}
+    if room_type_ids is not None:
+        where, params["rtids"] = "AND room_type_id IN :rtids", sorted(room_type_ids)
+    stmt = text(f"""
+        SELECT id, room_type_id FROM rooms
+        WHERE hotel_id IN :hids {where} AND active = TRUE
+        ORDER BY id
+        FOR UPDATE
+    """).bindparams(bindparam("hids", expanding=True))
+    if room_type_ids is not None:
+        stmt = stmt.bindparams(bindparam("rtids", expanding=True))
+    out = {rtid: [] for rtid in room_type_ids or ()}
+    for rid, rtid in db.session.execute(stmt, params).all():
+        out.setdefault(rtid, []).append(rid)
+    return out
+
+
+def _save(changes: dict):
+    if changes:
+        db.session.execute(text("""
+            UPDATE bookings b SET room_id = c.room_id, updated_at = now()
+            FROM unnest(CAST(:ids AS bigint[]), CAST(:rooms AS bigint[])) AS c(id, room_id)
+            WHERE b.id = c.id
+        """), {"ids": list(changes), "rooms": list(changes.values())})
+
+
+def _repack(hotel_id: int, room_type_ids, rooms: dict, stable: bool) -> tuple:
+    """Re-pack upcoming stays of room types (all the hotel's if None) whose rooms the caller locked.
+
+    Returns (stays, moved, unassigned booking ids).
+    """
+    where, params = "", {"hid": hotel_id}
+    if room_type_ids is not None:
+        where, params["rtids"] = "AND b.room_type_id IN :rtids", sorted(room_type_ids)
+    stmt = text(f"""
+        {_STAY_SQL}
+        WHERE b.hotel_id = :hid {where} AND {_HOLDS_SQL} AND b.check_out > now()
+    """)
+    if room_type_ids is not None:
+        stmt = stmt.bindparams(bindparam("rtids", expanding=True))
+    rows = db.session.execute(stmt, params).all()
+    by_type = {}
+    for r in rows:
+        fixed = r.status == "checked_in" and r.room_id is not None
+        by_type.setdefault(r.room_type_id, []).append((r.id, r.room_id, r.first, r.stop, fixed))
+    changes, unassigned = {}, []
+    for rtid, stays in by_type.items():
+        current = {bid: rid for bid, rid, *_ in stays}
+        for bid, rid in pack(rooms.get(rtid, []), stays, stable).items():
+            if rid is None:
+                unassigned.append(bid)
+            # An unplaced stay gives up its old room, which may have gone to another
+            if rid != current[bid]:
+                changes[bid] = rid
+    _save(changes)
+    return len(rows), len(changes), sorted(unassigned)
+
+
+def assign(booking_ids) -> list:
+    """Give rooms to new bookings, in the caller's transaction; returns ids left without one.
+
+    Best fit into the current schedules; a room type where some stay does
+    not fit anywhere is re-packed instead. A booking stays unassigned only if
+    its room type has fewer active rooms than stays on some night.
+    """
+    new = db.session.execute(text(f"{_STAY_SQL} WHERE b.id IN :ids").bindparams(
+        bindparam("ids", expanding=True)), {"ids": list(booking_ids)}).all()
+    if not new:
+        return []
+    hotels = {r.hotel_id for r in new}
+    rooms = _lock_rooms(hotels, {r.room_type_id for r in new})
+    # Stays already in those rooms within _HORIZON nights of the new ones
+    taken = db.session.execute(text(f"""
+        {_STAY_SQL}
+        WHERE b.hotel_id IN :hids AND b.room_type_id IN :rtids AND {_HOLDS_SQL}
+          AND b.room_id IS NOT NULL AND b.id NOT IN :ids
+          AND b.check_in < CAST(:hi AS date) + :horizon AND b.check_out > CAST(:lo AS date) - :horizon
+    """).bindparams(*(bindparam(p, expanding=True) for p in ("hids", "rtids", "ids"))), {
+        "hids": sorted(hotels), "rtids": sorted(rooms), "ids": [r.id for r in new],
+        "lo": _EPOCH + timedelta(days=min(r.first for r in new)), "hi": _EPOCH + timedelta(days=max(r.stop for r in new)),
+        "horizon": _HORIZON + 1,
+    }).all()
+    schedules = {rtid: {rid: RoomSchedule(rid) for rid in rids} for rtid, rids in rooms.items()}
+    for r in taken:
+        s = schedules[r.room_type_id].get(r.room_id)
+        if s is not None:
+            s.add(r.first, r.stop)
+
+    placed, repack = {}, {}
+    for r in sorted(new, key=lambda r: (r.first, r.stop, r.id)):
+        s = best_fit(schedules[r.room_type_id].values(), r.first, r.stop)
+        if s is None:
+            repack.setdefault(r.hotel_id, set()).add(r.room_type_id)
+            continue
+        s.add(r.first, r.stop)
+        placed[r.id] = s.room_id
+    _save(placed)
+    unassigned = []
+    for hid, rtids in repack.items():
+        unassigned += _repack(hid, rtids, rooms, stable=True)[2]
+    mine = {r.id for r in new}
+    return sorted(bid for bid in unassigned if bid in mine)
+
+
+def optimize(hotel_id: int, stable: bool = True) -> dict:
+    """Re-pack all upcoming stays of a hotel, in the caller's transaction.
+
+    With `stable`, stays keep their room whenever it is free, so only the
+    stays that have to move do; without it every stay that is not checked in
+    is placed afresh.
+    """
+    rooms = _lock_rooms([hotel_id])
+    stays, moved, unassigned = _repack(hotel_id, None, rooms, stable)
+    return {"stays": stays, "moved": moved, "unassigned": unassigned}
+
+
+def conflicts(hotel_id: int | None = None, limit: int = 1000) -> list:
+    """Bookings that break the assignment invariants, for scripts.rooms check.
+
+    `double`: two stays that hold a room share a night in the same room.
+    `room_type`: the assigned room is not of the booking's room type.
+    """
+    where, params = "", {"limit": limit}
+    if hotel_id is not None:
+        where, params["hid"] = "AND a.hotel_id = :hid", hotel_id
+    holds = _HOLDS_SQL.replace("b.", "{t}.")
+    night = "CAST({t}.check_in AS date)"
+    stop = "GREATEST(CAST({t}.check_out AS date), CAST({t}.check_in AS date) + 1)"
+    rows = db.session.execute(text(f"""
+        SELECT 'double' AS problem, a.hotel_id, a.room_id, a.id AS booking_id, b.id AS other_id
+        FROM bookings a
+        JOIN bookings b ON b.room_id = a.room_id AND b.id > a.id
+             AND b.check_in < a.check_out + interval '1 day' AND b.check_out > a.check_in - interval '1 day'
+        WHERE a.room_id IS NOT NULL AND {holds.format(t="a")} AND {holds.format(t="b")} {where}
+          AND {night.format(t="b")} < {stop.format(t="a")} AND {night.format(t="a")} < {stop.format(t="b")}
+        UNION ALL
+        SELECT 'room_type', a.hotel_id, a.room_id, a.id, NULL
+        FROM bookings a JOIN rooms r ON r.id = a.room_id
+        WHERE r.room_type_id <> a.room_type_id {where}
+        LIMIT :limit
+    """), params).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def unassigned_count(hotel_id: int | None = None) -> int:
+    """Upcoming stays that hold no room."""
+    where, params = "", {}
+    if hotel_id is not None:
+        where, params = "AND b.hotel_id = :hid", {"hid": hotel_id}
+    return db.session.execute(text(f"""
+        SELECT COUNT(*) FROM bookings b
+        WHERE b.room_id IS NULL AND {_HOLDS_SQL} AND b.check_out > now() {where}
+    """), params).scalar()
+
@@ -0,0 +1,296 @@
+import asyncio
+import re
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl
+from sqlalchemy import JSON
+from sqlalchemy.engine import make_url
+from werkzeug.exceptions import BadRequest
+from . import create_app
+from .availability import min_remaining, nightly_query, nightly_rows
+from .images import HOTEL_IMAGES_SQL, PRIMARY_IMAGES_SQL
+from .ledger import utc_sessions
+from .metrics import metrics
+from .pagination import NEXT_CURSOR_HEADER, encode_cursor, page_args
+from .routes.bookings import booking_record, my_bookings_query
+from .routes.hotels import FITTING_ROOM_TYPES_SQL, HOTEL_SQL, ROOM_TYPES_SQL, hotels_query
+from .search import has_trigram, search_query
+from .tokens import USER_SQL, MemoryDenylist, tokens
+
+# Optional ASGI serving mode (asgi.py, e.g. `uvicorn asgi:app --workers 4`).
+# The read-heavy GET routes of routes/hotels.py and routes/bookings.py are
+# served by coroutines over SQLAlchemy's asyncio engine (asyncpg, or aiosqlite
+# for the SQLite dev database), so while one request waits on the database
+# the worker serves others, and concurrency is bounded by the connection pool
+# instead of by the number of workers. The handlers run the same statements
+# as the Flask views (the query builders they share) and return the same JSON;
+# they skip the response cache and ETag revalidation. Every other route, and
+# other methods, go to the Flask app from create_app() on a thread pool
+# (a2wsgi), so one server still serves the whole API with the same config.
+
+_ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_url(uri: str):
+    """SQLALCHEMY_DATABASE_URI with its driver swapped for the asyncio one."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise RuntimeError(f"No asyncio driver known for {backend!r} databases")
+    query = dict(url.query)
+    if "sslmode" in query:
+        # libpq's sslmode is asyncpg's ssl
+        query["ssl"] = query.pop("sslmode")
+    return url.set(drivername=f"{backend}+{_ASYNC_DRIVERS[backend]}", query=query)
+
+
+def _typed(stmt):
+    # asyncpg hands json columns back as text unless the statement types them
+    return stmt.columns(amenities=JSON)
+
+
+class _Request:
+    __slots__ = ("path", "args", "headers")
+
+    def __init__(self, scope):
+        self.path = scope["path"]
+        self.args = {}
+        for key, value in parse_qsl(scope["query_string"].decode("latin1"), keep_blank_values=True):
+            self.args.setdefault(key, value)
+        self.headers = {k.decode("latin1"): v.decode("latin1") for k, v in scope["headers"]}
+
+
+class _Reject(Exception):
+    """Ends a handler with an error response."""
+
+    def __init__(self, status: int, body: dict):
+        self.status = status
+        self.body = body
+
+
+class AsyncApp:
+    def __init__(self, flask_app):
+        try:
+            from a2wsgi import WSGIMiddleware
+            from sqlalchemy.ext.asyncio import create_async_engine
+        except ImportError as e:
+            raise RuntimeError("The ASGI mode needs 'a2wsgi' and an asyncio database driver "
+                               "(pip install uvicorn a2wsgi asyncpg, or aiosqlite for SQLite)") from e
+        self.flask = flask_app
+        config = flask_app.config
+        opts = {k: v for k, v in config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).items() if k != "poolclass"}
+        self.engine = create_async_engine(async_url(config["SQLALCHEMY_DATABASE_URI"]), **opts)
+        utc_sessions(self.engine.sync_engine)
+        self.fallback = WSGIMiddleware(flask_app, workers=config.get("ASGI_WSGI_THREADS", 10))
+        self.compact = not flask_app.debug
+        origins = config.get("CORS_ORIGINS", ["*"])
+        self.origins = None if "*" in origins else set(origins)
+        # Flask's rule strings, so metrics label both modes alike
+        self.routes = [(re.compile(pattern), rule, handler) for pattern, rule, handler in (
+            (r"/api/hotels", "/api/hotels", self.list_hotels),
+            (r"/api/hotels/(?P<hotel_id>\d+)", "/api/hotels/<int:hotel_id>", self.hotel_detail),
+            (r"/api/hotels/(?P<hotel_id>\d+)/availability", "/api/hotels/<int:hotel_id>/availability",
+             self.hotel_availability),
+            (r"/api/bookings", "/api/bookings", self.my_bookings),
+        )]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET":
+            for pattern, rule, handler in self.routes:
+                m = pattern.fullmatch(scope["path"])
+                if m:
+                    kwargs = {k: int(v) for k, v in m.groupdict().items()}
+                    return await self._serve(scope, send, rule, handler, kwargs)
+        await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.to_thread(self._startup)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _startup(self):
+        from . import db
+        from .holds import sweeper
+        with self.flask.app_context():
+            # Cached per engine, so search_query never queries from the event loop
+            if db.engine.dialect.name == "postgresql":
+                has_trigram()
+        sweeper.start()
+
+    async def _serve(self, scope, send, rule, handler, kwargs):
+        started = time.perf_counter()
+        if metrics.enabled:
+            metrics.gauge_add("http_requests_in_flight", 1)
+        req = _Request(scope)
+        headers = {}
+        try:
+            status, body = 200, await handler(req, headers, **kwargs)
+        except _Reject as e:
+            status, body = e.status, e.body
+        except BadRequest as e:
+            status, body = 400, {"error": "Bad request", "detail": str(e)}
+        except Exception:
+            self.flask.logger.exception("Server error: %s %s", scope["method"], scope["path"])
+            status, body = 500, {"error": "Internal server error"}
+        finally:
+            if metrics.enabled:
+                metrics.gauge_add("http_requests_in_flight", -1)
+        await self._send_json(send, req, status, body, headers)
+        if metrics.enabled:
+            metrics.inc("http_requests_total", endpoint=rule, method="GET", status=str(status))
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - started,
+                            endpoint=rule, method="GET")
+
+    async def _send_json(self, send, req, status, body, headers):
+        # The same bytes as flask.jsonify
+        dump_args = {"separators": (",", ":")} if self.compact else {"indent": 2, "separators": (", ", ": ")}
+        data = f"{self.flask.json.dumps(body, **dump_args)}\n".encode()
+        headers = dict(headers, **{"content-type": "application/json", "content-length": str(len(data))})
+        origin = req.headers.get("origin")
+        if origin and (self.origins is None or origin in self.origins):
+            headers.update({"access-control-allow-origin": origin, "access-control-allow-credentials": "true",
+                            "access-control-expose-headers": "ETag, Server-Timing, X-Next-Cursor",
+                            "vary": "Origin"})
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in headers.items()]})
+        await send({"type": "http.response.body", "body": data})
+
+    @staticmethod
+    def _next_cursor(headers, rows, limit, key):
+        if len(rows) == limit:
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+
+    async def _primary_images(self, conn, records):
+        ids = list(dict.fromkeys(r["id"] for r in records))
+        urls = {}
+        if ids:
+            result = await conn.execute(PRIMARY_IMAGES_SQL, {"ids": ids})
+            urls = {r["hotel_id"]: r["url"] for r in result.mappings()}
+        for rec in records:
+            rec["primary_image"] = urls.get(rec["id"])
+        return records
+
+    async def _authenticate(self, conn, req) -> tuple:
+        """(user id, role) of the request's access token, as jwt_required checks it."""
+        from flask_jwt_extended import decode_token
+        from flask_jwt_extended.exceptions import JWTExtendedException
+        from jwt import ExpiredSignatureError, InvalidTokenError
+        auth = req.headers.get("authorization", "")
+        if not auth.startswith("Bearer "):
+            raise _Reject(401, {"msg": "Missing Authorization Header"})
+        try:
+            with self.flask.app_context():
+                payload = decode_token(auth[7:])
+        except ExpiredSignatureError:
+            raise _Reject(401, {"msg": "Token has expired"})
+        except (InvalidTokenError, JWTExtendedException) as e:
+            raise _Reject(422, {"msg": str(e)})
+        if payload.get("type") != "access":
+            raise _Reject(422, {"msg": "Only non-refresh tokens are allowed"})
+
+        denylist = tokens.denylist
+        jti = payload.get("jti")
+        revoked = jti in denylist if isinstance(denylist, MemoryDenylist) else \
+            await asyncio.to_thread(denylist.__contains__, jti)
+        uid = int(payload["sub"])
+        key = str(uid)
+        cached = self.flask.config.get("AUTH_USER_CACHE_TTL", 30) > 0
+        user = tokens.users.get(key) if cached else None
+        if cached and metrics.enabled:
+            metrics.inc("cache_requests_total", cache="auth_users", result="miss" if user is None else "hit")
+        if user is None:
+            result = await conn.execute(USER_SQL, {"id": uid})
+            row = result.mappings().first()
+            user = dict(row) if row else {}
+            if cached:
+                tokens.users.set(key, user)
+        if revoked or not user or not user["active"]:
+            raise _Reject(401, {"error": "Token has been revoked"})
+        return uid, user["role"]
+
+    # handlers: (request, response headers, **path values) -> JSON body
+
+    async def list_hotels(self, req, headers):
+        q = (req.args.get("q") or "").strip()
+        city = (req.args.get("city") or "").strip()
+        async with self.engine.connect() as conn:
+            if q:
+                limit, cursor = page_args((float, int), default=20, maximum=100, args=req.args)
+                with self.flask.app_context():
+                    query = search_query(q, city, limit, cursor)
+                key = lambda r: (r["rank"], r["id"])
+            else:
+                limit, cursor = page_args((int,), default=20, maximum=100, args=req.args)
+                query = hotels_query(city, limit, cursor)
+                key = lambda r: (r["id"],)
+            rows = []
+            if query is not None:
+                result = await conn.execute(_typed(query[0]), query[1])
+                rows = [dict(r) for r in result.mappings()]
+            out = await self._primary_images(conn, rows)
+        self._next_cursor(headers, out, limit, key)
+        return out
+
+    async def hotel_detail(self, req, headers, hotel_id):
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(_typed(HOTEL_SQL), {"id": hotel_id})).mappings().first()
+            if not row:
+                raise _Reject(404, {"error": "Not found"})
+            rec = dict(row)
+            result = await conn.execute(HOTEL_IMAGES_SQL, {"ids": [hotel_id]})
+            images = [{"url": r["url"], "alt_text": r["alt_text"], "is_primary": r["is_primary"]}
+                      for r in result.mappings()]
+            rec["images"] = images
+            rec["primary_image"] = images[0]["url"] if images else None
+            result = await conn.execute(_typed(ROOM_TYPES_SQL), {"hid": hotel_id})
+            rec["room_types"] = [dict(r) for r in result.mappings()]
+        return rec
+
+    async def hotel_availability(self, req, headers, hotel_id):
+        try:
+            ci = datetime.fromisoformat(req.args["check_in"])
+            co = datetime.fromisoformat(req.args["check_out"])
+            guests = int(req.args.get("guests") or 1)
+        except (KeyError, ValueError):
+            raise _Reject(400, {"error": "check_in and check_out (ISO8601) are required"})
+        async with self.engine.connect() as conn:
+            result = await conn.execute(_typed(FITTING_ROOM_TYPES_SQL), {"hid": hotel_id, "guests": guests})
+            rows = result.mappings().all()
+            if not rows:
+                return []
+            query = nightly_query(hotel_id, ci, co, [r["id"] for r in rows])
+            remaining = min_remaining(nightly_rows((await conn.execute(*query)).mappings()))
+        out = []
+        for r in rows:
+            left = remaining.get(r["id"], 0)
+            if left > 0:
+                out.append(dict(r, available_rooms=left))
+        return out
+
+    async def my_bookings(self, req, headers):
+        async with self.engine.connect() as conn:
+            uid, role = await self._authenticate(conn, req)
+            everyone = role == "admin" and req.args.get("all") == "1"
+            limit, cursor = page_args((datetime, int), default=100, maximum=100, args=req.args)
+            result = await conn.execute(*my_bookings_query(uid, everyone, limit, cursor))
+            rows = result.mappings().all()
+        out = [booking_record(r) for r in rows]
+        self._next_cursor(headers, rows, limit, lambda r: (r["created_at"], r["id"]))
+        return out
+
+
+def create_asgi_app(flask_app=None):
+    """The ASGI application; builds the Flask app with create_app() unless given one."""
+    return AsyncApp(flask_app or create_app())
@@ -1,14 +1,15 @@
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask_jwt_extended import verify_jwt_in_request
+from .tokens import current_role
 
 def role_required(*roles):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
             verify_jwt_in_request()
-            claims = get_jwt() or {}
-            if claims.get("role") not in roles:
+            # Current role from the cached user lookup, not the token's claim
+            if current_role() not in roles:
                 return jsonify({"error": "forbidden"}), 403
             return fn(*args, **kwargs)
         return wrapper
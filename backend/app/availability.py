@@ -0,0 +1,153 @@
+from sqlalchemy import text, bindparam
+from . import db
+from .ledger import NIGHTS_SQL
+
+# Per-night inventory for a hotel read from the room_type_nights ledger: a
+# primary-key range scan per room type instead of a scan over booking history.
+# Nights without a ledger row have nothing booked and the live room count.
+_NIGHTLY_SQL = f"""
+    WITH nights AS (
+        SELECT CAST(d AS date) AS night FROM {NIGHTS_SQL.format(ci=":ci", co=":co")} AS d
+    ),
+    inv AS (
+        SELECT room_type_id, COUNT(*) AS rooms
+        FROM rooms
+        WHERE hotel_id = :hid AND active = TRUE
+        GROUP BY room_type_id
+    )
+    SELECT rt.id AS room_type_id, n.night,
+           COALESCE(l.capacity, inv.rooms, 0) AS capacity,
+           COALESCE(l.booked_count, 0) AS booked
+    FROM room_types rt
+    CROSS JOIN nights n
+    LEFT JOIN inv ON inv.room_type_id = rt.id
+    LEFT JOIN room_type_nights l ON l.room_type_id = rt.id AND l.night = n.night
+    WHERE rt.hotel_id = :hid AND rt.active = TRUE
+      {{rt_filter}}
+    ORDER BY rt.id, n.night
+"""
+
+
+def nightly_query(hotel_id: int, check_in, check_out, room_type_ids=None):
+    """(statement, params) for nightly_inventory, or None when `room_type_ids` is empty."""
+    params = {"hid": hotel_id, "ci": check_in, "co": check_out}
+    rt_filter = ""
+    if room_type_ids is not None:
+        ids = list(room_type_ids)
+        if not ids:
+            return None
+        rt_filter = "AND rt.id IN :rtids"
+        params["rtids"] = ids
+    stmt = text(_NIGHTLY_SQL.format(rt_filter=rt_filter))
+    if rt_filter:
+        stmt = stmt.bindparams(bindparam("rtids", expanding=True))
+    return stmt, params
+
+
+def nightly_rows(rows) -> list:
+    """nightly_query result mappings as dicts with `remaining` added."""
+    out = []
+    for r in rows:
+        rec = dict(r)
+        rec["remaining"] = max(rec["capacity"] - rec["booked"], 0)
+        out.append(rec)
+    return out
+
+
+def nightly_inventory(hotel_id: int, check_in, check_out, room_type_ids=None) -> list:
+    """Rows of (room_type_id, night, capacity, booked, remaining) for each night of the stay."""
+    query = nightly_query(hotel_id, check_in, check_out, room_type_ids)
+    if query is None:
+        return []
+    return nightly_rows(db.session.execute(*query).mappings())
+
+
+def min_remaining(nightly: list) -> dict:
+    """Map room type id -> the smallest `remaining` over its nights."""
+    out = {}
+    for r in nightly:
+        rtid = r["room_type_id"]
+        out[rtid] = min(out.get(rtid, r["remaining"]), r["remaining"])
+    return out
+
+
+def remaining_by_room_type(hotel_id: int, check_in, check_out, room_type_ids=None) -> dict:
+    """Map room type id -> rooms free on every night of the stay (the nightly minimum)."""
+    return min_remaining(nightly_inventory(hotel_id, check_in, check_out, room_type_ids))
+
+
+# Room type `rt` fits the party and has an active room free on every night of
+# the stay (no sold-out ledger night in the range)
+_SELLABLE_SQL = """
+    rt.active = TRUE AND rt.capacity >= :guests
+    AND EXISTS (SELECT 1 FROM rooms r
+                WHERE r.hotel_id = rt.hotel_id AND r.room_type_id = rt.id AND r.active = TRUE)
+    AND NOT EXISTS (
+          SELECT 1 FROM room_type_nights l
+          WHERE l.room_type_id = rt.id
+            AND l.night BETWEEN CAST(:ci AS date) AND GREATEST(CAST(:co AS date) - 1, CAST(:ci AS date))
+            AND l.booked_count >= l.capacity
+    )"""
+
+# Hotels with at least one sellable room type, with the cheapest such base
+# price. One statement: candidate room types come from the hotel filters,
+# sold-out nights from a ledger range probe per candidate, so cost tracks the
+# candidate set rather than booking history. The page's sellable room types
+# are listed again per hotel after the LIMIT, for pricing (app/pricing.py).
+_HOTELS_SQL = f"""
+    WITH nights AS (
+        SELECT CAST(d AS date) AS night FROM {NIGHTS_SQL.format(ci=":ci", co=":co")} AS d
+    ),
+    sellable AS (
+        SELECT rt.hotel_id, rt.id AS room_type_id, rt.base_price
+        FROM hotels h
+        JOIN room_types rt ON rt.hotel_id = h.id
+        WHERE {{hotel_filter}} AND {_SELLABLE_SQL}
+    ),
+    best AS (
+        SELECT hotel_id, MIN(base_price) AS min_price, COUNT(*) AS room_types_available
+        FROM sellable GROUP BY hotel_id
+    ),
+    page AS (
+        SELECT h.id, h.name, h.city, h.country, h.address, h.description, h.amenities,
+               best.min_price, best.room_types_available,
+               (SELECT COUNT(*) FROM nights) AS nights
+        FROM best JOIN hotels h ON h.id = best.hotel_id
+        {{after}}
+        ORDER BY best.min_price, h.id
+        LIMIT :limit
+    )
+    SELECT page.*, rts.room_type_ids, rts.base_prices
+    FROM page
+    CROSS JOIN LATERAL (
+        SELECT array_agg(rt.id) AS room_type_ids, array_agg(rt.base_price) AS base_prices
+        FROM room_types rt WHERE rt.hotel_id = page.id AND {_SELLABLE_SQL}
+    ) rts
+    ORDER BY page.min_price, page.id
+"""
+
+
+def available_hotels(check_in, check_out, guests: int = 1, city: str = "", match=None,
+                     amenities=(), limit: int = 20, cursor=None, params=None) -> list:
+    """Hotels bookable for the stay, cheapest first, paged on (min_price, id).
+
+    `match` is an optional predicate on hotels alias `h` (see search.match_filter)
+    whose bind values are already in `params`; `amenities` are hotel amenity keys
+    that must be true.
+    """
+    params = dict(params or {}, ci=check_in, co=check_out, guests=guests, limit=limit)
+    where = ["TRUE"]
+    if city:
+        where.append("lower(h.city) = :city")
+        params["city"] = city.lower()
+    if match:
+        where.append(match)
+    for i, key in enumerate(amenities):
+        where.append(f"(h.amenities ->> :amenity_{i}) = 'true'")
+        params[f"amenity_{i}"] = key
+    after = ""
+    if cursor:
+        after = "WHERE (best.min_price, h.id) > (:after_price, :after_id)"
+        params.update(after_price=cursor[0], after_id=cursor[1])
+    stmt = text(_HOTELS_SQL.format(hotel_filter=" AND ".join(where), after=after))
+    return [dict(r) for r in db.session.execute(stmt, params).mappings()]
@@ -0,0 +1,227 @@
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, request
+from .metrics import metrics
+
+# Response cache for public, read-mostly catalog endpoints.
+#
+# Entries are keyed on endpoint + normalized query args + a namespace version.
+# Writes invalidate by bumping the version (invalidate_hotel), so stale entries
+# are never read again and simply age out; this works the same for the
+# in-process LRU and a shared Redis, and a request that raced a write stores
+# its result under the old version where nobody looks for it.
+#
+# Backends implement get(key) -> str | None, set(key, value, ttl),
+# delete(key) and incr(key) -> int: the subset of the redis-py client API used
+# here, so RedisCache wraps a real client or any fake with those methods.
+
+
+class LRUCache:
+    """In-process LRU with per-entry TTL (the default backend)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # Namespace versions must outlive entries: evicting one would resurrect
+        # entries written under an earlier value.
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key])
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def incr(self, key) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize,
+                "evictions": self.evictions, "expirations": self.expirations}
+
+
+class RedisCache:
+    """Backend over a redis-py compatible client (shared across workers)."""
+
+    def __init__(self, client, ttl: float = 60, prefix: str = "hotel-app:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, value, ex=int(ttl) or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key) -> int:
+        return int(self.client.incr(self.prefix + key))
+
+    def stats(self) -> dict:
+        # Redis evicts on its own (maxmemory-policy); see INFO stats evicted_keys
+        return {}
+
+
+class NullCache:
+    """Backend that stores nothing (CACHE_BACKEND=none)."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {}
+
+
+def _backend_from_config(config):
+    kind = config.get("CACHE_BACKEND", "memory")
+    ttl = config.get("CACHE_TTL", 60)
+    if kind == "none":
+        return NullCache()
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis needs the 'redis' package (pip install redis)")
+        return RedisCache(redis.Redis.from_url(config["CACHE_REDIS_URL"]), ttl=ttl)
+    if kind == "memory":
+        return LRUCache(maxsize=config.get("CACHE_MAXSIZE", 1024), ttl=ttl)
+    raise RuntimeError(f"Unknown CACHE_BACKEND {kind!r}")
+
+
+def normalized_args() -> str:
+    # Order-insensitive, blank values dropped: ?a=1&b= and ?b=&a=1 share an entry
+    items = sorted((k, v.strip()) for k, vs in request.args.lists() for v in vs if v.strip())
+    return json.dumps(items, separators=(",", ":"))
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, backend=None):
+        self.backend = backend or _backend_from_config(app.config)
+        app.extensions["response_cache"] = self
+
+    def _count(self, hit: bool):
+        metrics.inc("cache_requests_total", cache="response", result="hit" if hit else "miss")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def version(self, namespace: str) -> str:
+        return self.backend.get(f"v:{namespace}") or "0"
+
+    def invalidate(self, *namespaces):
+        for ns in namespaces:
+            self.backend.incr(f"v:{ns}")
+
+    def cached(self, namespace, ttl=None):
+        """Cache a view's 200 responses (body + headers) per normalized query string.
+
+        `namespace` is a string or a function of the view kwargs returning one;
+        invalidate(namespace) drops every entry stored under it.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None or isinstance(self.backend, NullCache):
+                    return view(*args, **kwargs)
+                ns = namespace(**kwargs) if callable(namespace) else namespace
+                # g.etag (set by conditional()) ties the entry to the data version it was built from
+                key = f"r:{ns}:{self.version(ns)}:{g.get('etag', '')}:{request.path}:{normalized_args()}"
+                raw = self.backend.get(key)
+                if raw is not None:
+                    self._count(True)
+                    entry = json.loads(raw)
+                    resp = current_app.response_class(entry["body"], mimetype=entry["mimetype"])
+                    resp.headers.extend(entry["headers"])
+                    return resp
+                self._count(False)
+                resp = current_app.make_response(view(*args, **kwargs))
+                if resp.status_code == 200 and not resp.direct_passthrough:
+                    self.backend.set(key, json.dumps({
+                        "body": resp.get_data(as_text=True),
+                        "mimetype": resp.mimetype,
+                        "headers": [(k, v) for k, v in resp.headers
+                                    if k not in ("Content-Type", "Content-Length")],
+                    }), ttl)
+                return resp
+            return wrapper
+        return decorator
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return dict(self.backend.stats() if self.backend else {},
+                    backend=type(self.backend).__name__, hits=self.hits, misses=self.misses,
+                    hit_ratio=round(self.hits / total, 4) if total else None)
+
+
+response_cache = ResponseCache()
+
+
+def hotel_namespace(hotel_id: int) -> str:
+    return f"hotel:{hotel_id}"
+
+
+def invalidate_hotel(hotel_id: int):
+    """Drop cached catalog responses after a write to a hotel, its room types or images.
+
+    Call after the write commits.
+    """
+    response_cache.invalidate("hotels", hotel_namespace(hotel_id))
@@ -0,0 +1,55 @@
+import functools
+import hashlib
+import json
+from flask import current_app, g, request
+from .cache import normalized_args
+
+# Conditional GETs. A view's validator runs one cheap query (max(updated_at),
+# counts, ids) and returns (last_modified, version); the ETag hashes the
+# version with the path and normalized query args. If the client's
+# If-None-Match / If-Modified-Since still matches, the view never runs and the
+# response is an empty 304.
+
+
+def _etag(version) -> str:
+    raw = json.dumps([request.path, normalized_args(), version], default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()[:32]
+
+
+def _not_modified(etag: str, last_modified) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(validator, private: bool = False):
+    """Add ETag/Last-Modified to a GET view and answer 304 when the client is current.
+
+    `validator(**view_kwargs)` returns (last_modified datetime or None, JSON-able
+    version) or None to skip validation (e.g. not found). The ETag is kept in
+    g.etag so the response cache can key on it.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            state = validator(**kwargs)
+            if state is None:
+                return view(*args, **kwargs)
+            last_modified, version = state
+            g.etag = etag = _etag([last_modified, version])
+            if _not_modified(etag, last_modified):
+                resp = current_app.response_class(status=304)
+            else:
+                resp = current_app.make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(etag, weak=True)
+            if last_modified is not None:
+                resp.last_modified = last_modified
+            # Clients may store the body but must revalidate before reuse
+            resp.headers["Cache-Control"] = "private, no-cache" if private else "no-cache"
+            return resp
+        return wrapper
+    return decorator
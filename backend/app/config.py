@@ -22,9 +22,86 @@ class Config:
         "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
     }
 
+    # Attempts for transactions that hit serialization failures / deadlocks
+    DB_TX_RETRIES = int(os.getenv("DB_TX_RETRIES", "3"))
+
+    # Most bookings accepted by one POST /api/bookings/batch
+    BOOKING_BATCH_MAX = int(os.getenv("BOOKING_BATCH_MAX", "200"))
+    # Status log rows buffered per INSERT (and bookings per chunk in bulk transitions)
+    BOOKING_STATUS_LOG_BATCH = int(os.getenv("BOOKING_STATUS_LOG_BATCH", "1000"))
+    # Confirmed bookings this many hours past check-in become no_show (scripts.no_shows)
+    NO_SHOW_GRACE_HOURS = int(os.getenv("NO_SHOW_GRACE_HOURS", "24"))
+    # Seconds a POST /api/bookings/hold keeps its stay before the sweeper cancels it
+    BOOKING_HOLD_SECONDS = int(os.getenv("BOOKING_HOLD_SECONDS", "600"))
+    # In-process hold sweeper thread (app/holds.py), opt-in per deployment: every
+    # process with it on sweeps, so enable it on one process at most, or run
+    # scripts.holds --watch as a dedicated process (or scripts.holds from cron).
+    # It sleeps until the next expiry, at most HOLD_SWEEP_SECONDS.
+    HOLD_SWEEPER = os.getenv("HOLD_SWEEPER", "0").lower() in ("1", "true", "yes")
+    HOLD_SWEEP_SECONDS = float(os.getenv("HOLD_SWEEP_SECONDS", "30"))
+    # Rows fetched from the server-side cursor per chunk of an admin export
+    EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+    # Response cache for public catalog endpoints: memory (per-process LRU), redis or none
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").strip().lower()
+    CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))  # seconds
+    CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "1024"))  # entries (memory backend)
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+    # Password hashing: werkzeug method string (cost parameters) and the size of
+    # the process pool it runs in (0 = hash on the request thread). Existing
+    # hashes are upgraded on the next successful login when this changes.
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "30"))  # seconds
+
     # JWT
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", SECRET_KEY)
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.getenv("JWT_EXPIRES_H", "12")))
+    # Short-lived access tokens renewed with a refresh token (POST /api/auth/refresh).
+    # JWT_EXPIRES_H still overrides the access lifetime for older deployments.
+    JWT_ACCESS_TOKEN_EXPIRES = (timedelta(hours=int(os.environ["JWT_EXPIRES_H"])) if os.getenv("JWT_EXPIRES_H")
+                                else timedelta(minutes=int(os.getenv("JWT_ACCESS_MINUTES", "15"))))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv("JWT_REFRESH_DAYS", "30")))
+    # Revoked token ids (logout, refresh rotation): memory (per process) or redis (shared)
+    TOKEN_DENYLIST_BACKEND = os.getenv("TOKEN_DENYLIST_BACKEND", "memory").strip().lower()
+    TOKEN_DENYLIST_REDIS_URL = os.getenv("TOKEN_DENYLIST_REDIS_URL", CACHE_REDIS_URL)
+    # Cached role/active lookups used by authorization; role changes and
+    # deactivation reach other workers within this many seconds (0 = no cache)
+    AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+    AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+
+    # Per-request SQL profiling: Server-Timing header plus a JSON log line
+    # ("app.sql" logger) for requests with slow statements or N+1 patterns
+    SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "0").lower() in ("1", "true", "yes")
+    SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "100"))
+    SQL_N_PLUS_ONE = int(os.getenv("SQL_N_PLUS_ONE", "5"))  # same statement this often in one request
+    SQL_EXPLAIN_SAMPLE = float(os.getenv("SQL_EXPLAIN_SAMPLE", "0"))  # share of slow requests to EXPLAIN ANALYZE
+    SQL_LOG_REQUESTS = os.getenv("SQL_LOG_REQUESTS", "0").lower() in ("1", "true", "yes")  # log every request
+
+    # Readiness probe (GET /api/health/ready): database round-trip timeout and
+    # whether the schema must be at the migration head of this code
+    READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+    READY_CHECK_MIGRATIONS = os.getenv("READY_CHECK_MIGRATIONS", "1").lower() in ("1", "true", "yes")
+    # Open pool_size connections and request WARMUP_PATHS once in create_app,
+    # before the worker takes traffic (not with gunicorn --preload: the
+    # connections would be opened in the master and shared by the forks)
+    WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0").lower() in ("1", "true", "yes")
+    WARMUP_PATHS = [p.strip() for p in os.getenv("WARMUP_PATHS", "/api/hotels,/api/hotels?limit=20").split(",")
+                    if p.strip()]
+
+    # Prometheus metrics at GET /api/metrics. METRICS_TOKEN must be sent as
+    # "Authorization: Bearer <token>"; without one the endpoint only answers in
+    # debug (metrics are still recorded). Under gunicorn point METRICS_DIR
+    # at a directory shared by the workers (emptied on deploy) so one scrape
+    # covers them all; each worker writes its snapshot at most this often.
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    METRICS_DIR = os.getenv("METRICS_DIR", "")
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+    # ASGI mode (asgi.py): threads running the Flask app for the routes
+    # without an async handler
+    ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "10"))
 
     # CORS
     # Comma-separated list of allowed origins. Use * for dev only.
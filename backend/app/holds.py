@@ -0,0 +1,90 @@
+import threading
+import time
+from sqlalchemy import text
+from . import db
+from . import lifecycle
+from .metrics import metrics
+
+# Booking holds: POST /api/bookings/hold reserves a stay like a booking but
+# leaves it pending with an expires_at; POST /api/bookings/<id>/confirm makes it
+# a booking. A hold nobody confirms is cancelled by the sweeper, which gives its
+# nights back to the ledger and its room back to allocation.
+#
+# The sweeper runs in one dedicated process (python -m scripts.holds --watch),
+# or as a daemon thread in the serving processes that set HOLD_SWEEPER=1,
+# started by their first request. It is off by default: one sweeper is enough,
+# and every extra one only adds index probes. It expires what is due in chunks
+# (lifecycle.expire_holds: SKIP LOCKED, so sweepers running at once split the
+# work), then sleeps until the earliest remaining expires_at, but never longer
+# than HOLD_SWEEP_SECONDS, so holds taken by other processes are not missed for
+# long. Both the expiry walk and
+# the "what is next" probe are ranges over the partial ix_bookings_hold_expires
+# index of pending holds, so an idle sweep costs one index probe however many
+# holds are active. Confirming checks expires_at itself, so a late sweep
+# never lets an expired hold through. Without a sweeper, run
+# python -m scripts.holds from cron.
+
+
+def next_expiry() -> float | None:
+    """Seconds (by the database clock) until the earliest active hold expires, or None."""
+    return db.session.execute(text("""
+        SELECT EXTRACT(EPOCH FROM MIN(expires_at) - now())
+        FROM bookings WHERE status = 'pending' AND expires_at IS NOT NULL
+    """)).scalar()
+
+
+def sweep(batch_size: int | None = None) -> int:
+    """Expire every hold that is due; returns how many."""
+    n = lifecycle.expire_holds(batch_size)
+    if n:
+        metrics.inc("booking_holds_expired_total", n)
+    return n
+
+
+class HoldSweeper:
+    def __init__(self):
+        self._app = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions["hold_sweeper"] = self
+        if not app.config.get("HOLD_SWEEPER", False):
+            return
+        self._app = app
+        # Started by a request, so it runs in the serving process (after a
+        # gunicorn fork), not in scripts that only build the app
+        app.before_request(self.start)
+
+    def start(self):
+        """Start the thread if it is enabled and not running yet (the ASGI app calls this at startup)."""
+        if self._thread is not None or self._app is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="hold-sweeper", daemon=True)
+                self._thread.start()
+
+    def run(self, app):
+        """Sweep in the calling thread until interrupted (python -m scripts.holds --watch)."""
+        self._app = app
+        self._run()
+
+    def _run(self):
+        interval = self._app.config.get("HOLD_SWEEP_SECONDS", 30)
+        while True:
+            wait = interval
+            try:
+                with self._app.app_context():
+                    sweep()
+                    due = next_expiry()
+                    if due is not None:
+                        # Just past the expiry, so the hold is due when we look; a
+                        # hold still due now is locked by its confirm, retry soon
+                        wait = min(interval, max(float(due) + 0.05, 0.5))
+            except Exception:
+                self._app.logger.exception("Hold sweep failed")
+            time.sleep(wait)
+
+
+sweeper = HoldSweeper()
@@ -0,0 +1,52 @@
+from sqlalchemy import text, bindparam
+from . import db
+
+# One round trip per page: rank images per hotel and keep the first of each.
+PRIMARY_IMAGES_SQL = text("""
+    SELECT hotel_id, url, alt_text FROM (
+        SELECT hotel_id, url, alt_text,
+               ROW_NUMBER() OVER (
+                   PARTITION BY hotel_id
+                   ORDER BY is_primary DESC, id
+               ) AS rn
+        FROM hotel_images
+        WHERE hotel_id IN :ids
+    ) ranked
+    WHERE rn = 1
+""").bindparams(bindparam("ids", expanding=True))
+
+HOTEL_IMAGES_SQL = text("""
+    SELECT hotel_id, url, alt_text, is_primary FROM hotel_images
+    WHERE hotel_id IN :ids
+    ORDER BY hotel_id, is_primary DESC, id
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def primary_images(hotel_ids) -> dict:
+    """Map hotel id -> primary image row ({url, alt_text}) for all ids in one query."""
+    ids = list(dict.fromkeys(hotel_ids))
+    if not ids:
+        return {}
+    rows = db.session.execute(PRIMARY_IMAGES_SQL, {"ids": ids}).mappings().all()
+    return {r["hotel_id"]: {"url": r["url"], "alt_text": r["alt_text"]} for r in rows}
+
+
+def hotel_images(hotel_ids) -> dict:
+    """Map hotel id -> ordered list of images (primary first) for all ids in one query."""
+    ids = list(dict.fromkeys(hotel_ids))
+    out = {hid: [] for hid in ids}
+    if not ids:
+        return out
+    rows = db.session.execute(HOTEL_IMAGES_SQL, {"ids": ids}).mappings().all()
+    for r in rows:
+        out[r["hotel_id"]].append({"url": r["url"], "alt_text": r["alt_text"], "is_primary": r["is_primary"]})
+    return out
+
+
+def attach_primary_images(records: list) -> list:
+    """Set `primary_image` (url or None) on each hotel dict using a single batched lookup."""
+    imgs = primary_images(r["id"] for r in records)
+    for rec in records:
+        img = imgs.get(rec["id"])
+        rec["primary_image"] = img["url"] if img else None
+    return records
@@ -0,0 +1,131 @@
+import json
+import logging
+import random
+import re
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from . import db
+
+# Opt-in per-request SQL profiling (SQL_INSTRUMENTATION=1). Engine events
+# count each statement and its time against the current request; the totals
+# go out as a Server-Timing header and, for requests worth a look, one JSON
+# log line on the "app.sql" logger: slow statements, the same statement run
+# over and over with different parameters (N+1), and optionally an EXPLAIN
+# ANALYZE of a sample of slow SELECTs. When disabled nothing is registered,
+# so there is no per-query or per-request cost at all.
+
+log = logging.getLogger("app.sql")
+
+# Statements that must not be executed a second time for EXPLAIN ANALYZE
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+UPDATE|FOR\s+SHARE|NEXTVAL|SETVAL)\b", re.I)
+
+
+class _RequestStats:
+    __slots__ = ("started", "count", "seconds", "slowest", "slowest_statement", "statements", "slow")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.statements = {}   # statement -> executions
+        self.slow = []         # (seconds, statement, parameters) over the threshold
+
+
+def _short(statement: str, limit: int = 300) -> str:
+    flat = " ".join(statement.split())
+    return flat if len(flat) <= limit else flat[:limit] + "..."
+
+
+class Instrumentation:
+    def init_app(self, app):
+        self.enabled = app.config.get("SQL_INSTRUMENTATION", False)
+        if not self.enabled:
+            return
+        self.slow_seconds = app.config.get("SQL_SLOW_MS", 100) / 1000
+        self.n_plus_one = app.config.get("SQL_N_PLUS_ONE", 5)
+        self.explain_rate = app.config.get("SQL_EXPLAIN_SAMPLE", 0.0)
+        self.log_all = app.config.get("SQL_LOG_REQUESTS", False)
+        log.setLevel(logging.INFO)
+        with app.app_context():
+            engine = db.engine
+        self.dialect = engine.dialect.name
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions["sql_instrumentation"] = self
+
+    # engine events
+
+    @staticmethod
+    def _before(_conn, _cursor, _statement, _parameters, context, _executemany):
+        context._sql_started = time.perf_counter()
+
+    def _after(self, _conn, _cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._sql_started
+        stats = g.get("_sql_stats") if has_request_context() else None
+        if stats is None:
+            return
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+        if elapsed > stats.slowest:
+            stats.slowest, stats.slowest_statement = elapsed, statement
+        if elapsed >= self.slow_seconds and not executemany and not context.execution_options.get("stream_results"):
+            stats.slow.append((elapsed, statement, parameters))
+
+    # request hooks
+
+    @staticmethod
+    def _start():
+        g._sql_stats = _RequestStats()
+
+    def _finish(self, response):
+        stats = g.pop("_sql_stats", None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.started
+        timing = [f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"',
+                  f"app;dur={(total - stats.seconds) * 1000:.1f}"]
+        if stats.count:
+            timing.append(f"db-slowest;dur={stats.slowest * 1000:.1f}")
+        response.headers.add("Server-Timing", ", ".join(timing))
+
+        repeated = [{"count": n, "statement": _short(s)} for s, n in stats.statements.items() if n >= self.n_plus_one]
+        if not (self.log_all or stats.slow or repeated):
+            return response
+        record = {
+            "event": "request", "method": request.method, "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint, "status": response.status_code,
+            "ms": round(total * 1000, 1), "queries": stats.count, "db_ms": round(stats.seconds * 1000, 1),
+            "slowest_ms": round(stats.slowest * 1000, 1),
+            "slowest": _short(stats.slowest_statement) if stats.slowest_statement else None,
+        }
+        if stats.slow:
+            record["slow_queries"] = [{"ms": round(sec * 1000, 1), "statement": _short(s)} for sec, s, _ in stats.slow]
+        if repeated:
+            record["n_plus_one"] = repeated
+        log.log(logging.WARNING if stats.slow or repeated else logging.INFO, json.dumps(record))
+        if stats.slow and self.explain_rate and random.random() < self.explain_rate:
+            self._explain(max(stats.slow, key=lambda s: s[0]))
+        return response
+
+    def _explain(self, slow):
+        elapsed, statement, parameters = slow
+        if self.dialect != "postgresql" or _WRITES.search(statement):
+            return
+        try:
+            # Own connection and transaction, rolled back: the plan sees committed data only
+            with db.engine.connect() as conn:
+                plan = conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters).scalars().all()
+        except Exception as e:  # profiling must never fail the request
+            log.info(json.dumps({"event": "explain_failed", "error": str(e), "statement": _short(statement)}))
+            return
+        log.warning(json.dumps({"event": "slow_query_plan", "path": request.path, "ms": round(elapsed * 1000, 1),
+                                "statement": _short(statement, 2000), "plan": plan}))
+
+
+instrumentation = Instrumentation()
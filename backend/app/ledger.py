@@ -0,0 +1,241 @@
+from sqlalchemy import event, text
+from . import db
+
+# Nights occupied by a stay, derived in SQL so incremental writes, rebuilds and
+# availability reads agree on date boundaries: [check_in date, check_out date),
+# at least one night. CAST(timestamptz AS date) takes the session's calendar
+# date, so sessions are pinned to UTC (utc_sessions); pricing._day counts the
+# same UTC dates in Python.
+NIGHTS_SQL = """generate_series(
+    CAST({ci} AS date),
+    GREATEST(CAST({co} AS date) - 1, CAST({ci} AS date)),
+    interval '1 day')"""
+
+def utc_sessions(engine):
+    """Set TIME ZONE 'UTC' on every new PostgreSQL connection of engine (sync or an async engine's sync_engine)."""
+    if engine.dialect.name != "postgresql":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _utc(dbapi_connection, _record):
+        # Outside a transaction, or the pool's reset-on-return rolls it back
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute("SET TIME ZONE 'UTC'")
+        cursor.close()
+        dbapi_connection.autocommit = autocommit
+
+
+# Ledger rows recomputed from the source of truth (bookings + active rooms)
+_SOURCE_SQL = f"""
+    SELECT b.hotel_id, b.room_type_id, CAST(d AS date) AS night,
+           COUNT(*) AS booked_count, COALESCE(MAX(inv.rooms), 0) AS capacity
+    FROM bookings b
+    CROSS JOIN LATERAL {NIGHTS_SQL.format(ci="b.check_in", co="b.check_out")} AS d
+    LEFT JOIN (
+        SELECT room_type_id, COUNT(*) AS rooms FROM rooms
+        WHERE active = TRUE GROUP BY room_type_id
+    ) inv ON inv.room_type_id = b.room_type_id
+    WHERE b.status <> 'cancelled' {{where}}
+    GROUP BY b.hotel_id, b.room_type_id, CAST(d AS date)
+"""
+
+
+def apply_booking(hotel_id: int, room_type_id: int, check_in, check_out, delta: int = 1):
+    """Add `delta` to booked_count on every night of a stay, in the caller's transaction."""
+    db.session.execute(text(f"""
+        INSERT INTO room_type_nights AS l (hotel_id, room_type_id, night, booked_count, capacity)
+        SELECT :hid, :rtid, CAST(d AS date), :delta,
+               (SELECT COUNT(*) FROM rooms WHERE room_type_id = :rtid AND active = TRUE)
+        FROM {NIGHTS_SQL.format(ci=":ci", co=":co")} AS d
+        ON CONFLICT (room_type_id, night)
+        DO UPDATE SET booked_count = l.booked_count + EXCLUDED.booked_count
+    """), {"hid": hotel_id, "rtid": room_type_id, "ci": check_in, "co": check_out, "delta": delta})
+
+
+def reserve(hotel_id: int, room_type_id: int, check_in, check_out, qty: int = 1) -> bool:
+    """Atomically take `qty` rooms on every night of a stay, in the caller's transaction.
+
+    Ledger rows for the stay are created if missing, then locked in night order
+    (SELECT ... FOR UPDATE) so concurrent bookings of the same room type
+    serialize on the ledger instead of racing a check-then-insert. Returns False,
+    without changing anything, if any night lacks capacity; the caller should
+    roll back.
+    """
+    params = {"hid": hotel_id, "rtid": room_type_id, "ci": check_in, "co": check_out, "qty": qty}
+    db.session.execute(text(f"""
+        INSERT INTO room_type_nights (hotel_id, room_type_id, night, booked_count, capacity)
+        SELECT :hid, :rtid, CAST(d AS date), 0,
+               (SELECT COUNT(*) FROM rooms
+                WHERE hotel_id = :hid AND room_type_id = :rtid AND active = TRUE)
+        FROM {NIGHTS_SQL.format(ci=":ci", co=":co")} AS d
+        ON CONFLICT (room_type_id, night) DO NOTHING
+    """), params)
+    rows = db.session.execute(text(f"""
+        SELECT night, hotel_id, booked_count, capacity FROM room_type_nights
+        WHERE room_type_id = :rtid
+          AND night IN (SELECT CAST(d AS date) FROM {NIGHTS_SQL.format(ci=":ci", co=":co")} AS d)
+        ORDER BY night
+        FOR UPDATE
+    """), params).all()
+    if not rows or any(r.hotel_id != hotel_id or r.booked_count + qty > r.capacity for r in rows):
+        return False
+    db.session.execute(text(f"""
+        UPDATE room_type_nights SET booked_count = booked_count + :qty
+        WHERE room_type_id = :rtid
+          AND night IN (SELECT CAST(d AS date) FROM {NIGHTS_SQL.format(ci=":ci", co=":co")} AS d)
+    """), params)
+    return True
+
+
+# (item index, hotel, room type, night) for every night of every stay in a
+# batch, passed as parallel arrays; `valid` says the room type is the hotel's
+_BATCH_NIGHTS_SQL = f"""
+    SELECT CAST(i.ord AS int) - 1 AS idx, i.hid, i.rtid, CAST(d AS date) AS night,
+           rt.id IS NOT NULL AS valid
+    FROM unnest(CAST(:hids AS bigint[]), CAST(:rtids AS bigint[]),
+                CAST(:cis AS timestamptz[]), CAST(:cos AS timestamptz[]))
+         WITH ORDINALITY AS i(hid, rtid, ci, co, ord)
+    CROSS JOIN LATERAL {NIGHTS_SQL.format(ci="i.ci", co="i.co")} AS d
+    LEFT JOIN room_types rt ON rt.id = i.rtid AND rt.hotel_id = i.hid
+"""
+
+
+def reserve_many(items) -> list:
+    """Reserve one room per item of (hotel_id, room_type_id, check_in, check_out), all or nothing.
+
+    Same locking as reserve(), but set-based: a constant number of statements
+    for the whole batch, with ledger rows locked in (room type, night) order.
+    Returns the indexes of items that cannot be satisfied (unknown room type or
+    not enough rooms, counting the batch's own demand); an empty list means
+    every item is reserved. On failure nothing is changed and the caller should
+    roll back.
+    """
+    items = list(items)
+    params = {
+        "hids": [it[0] for it in items], "rtids": [it[1] for it in items],
+        "cis": [it[2] for it in items], "cos": [it[3] for it in items],
+    }
+    nights = db.session.execute(text(_BATCH_NIGHTS_SQL), params).mappings().all()
+    failed = {n["idx"] for n in nights if not n["valid"]}
+    if failed:
+        return sorted(failed)
+
+    db.session.execute(text(f"""
+        INSERT INTO room_type_nights (hotel_id, room_type_id, night, booked_count, capacity)
+        SELECT DISTINCT n.hid, n.rtid, n.night, 0,
+               (SELECT COUNT(*) FROM rooms r
+                WHERE r.hotel_id = n.hid AND r.room_type_id = n.rtid AND r.active = TRUE)
+        FROM ({_BATCH_NIGHTS_SQL}) n
+        ORDER BY n.rtid, n.night
+        ON CONFLICT (room_type_id, night) DO NOTHING
+    """), params)
+    locked = db.session.execute(text(f"""
+        SELECT room_type_id, night, booked_count, capacity FROM room_type_nights
+        WHERE (room_type_id, night) IN (SELECT rtid, night FROM ({_BATCH_NIGHTS_SQL}) n)
+        ORDER BY room_type_id, night
+        FOR UPDATE
+    """), params).all()
+    free = {(r.room_type_id, r.night): r.capacity - r.booked_count for r in locked}
+    need = {}
+    for n in nights:
+        key = (n["rtid"], n["night"])
+        need[key] = need.get(key, 0) + 1
+    short = {key for key, qty in need.items() if qty > free.get(key, 0)}
+    failed = {n["idx"] for n in nights if (n["rtid"], n["night"]) in short}
+    if failed:
+        return sorted(failed)
+
+    db.session.execute(text(f"""
+        UPDATE room_type_nights l SET booked_count = l.booked_count + n.qty
+        FROM (SELECT rtid, night, COUNT(*) AS qty FROM ({_BATCH_NIGHTS_SQL}) b GROUP BY rtid, night) n
+        WHERE l.room_type_id = n.rtid AND l.night = n.night
+    """), params)
+    return []
+
+
+def release_booking(hotel_id: int, room_type_id: int, check_in, check_out):
+    apply_booking(hotel_id, room_type_id, check_in, check_out, delta=-1)
+
+
+def release_many(items):
+    """Give back one room per (hotel_id, room_type_id, check_in, check_out).
+
+    The ledger rows are locked in (room type, night) order first, as reserve()
+    and reserve_many() lock them; an UPDATE ... FROM alone locks them in
+    whatever order its join visits them, which deadlocks against a booking
+    of the same nights.
+    """
+    items = list(items)
+    if not items:
+        return
+    params = {
+        "hids": [it[0] for it in items], "rtids": [it[1] for it in items],
+        "cis": [it[2] for it in items], "cos": [it[3] for it in items],
+    }
+    db.session.execute(text(f"""
+        SELECT room_type_id, night FROM room_type_nights
+        WHERE (room_type_id, night) IN (SELECT rtid, night FROM ({_BATCH_NIGHTS_SQL}) n)
+        ORDER BY room_type_id, night
+        FOR UPDATE
+    """), params)
+    db.session.execute(text(f"""
+        UPDATE room_type_nights l SET booked_count = l.booked_count - n.qty
+        FROM (SELECT rtid, night, COUNT(*) AS qty FROM ({_BATCH_NIGHTS_SQL}) b GROUP BY rtid, night) n
+        WHERE l.room_type_id = n.rtid AND l.night = n.night
+    """), params)
+
+
+def _hotel_ids(hotel_id) -> list:
+    return [hotel_id] if isinstance(hotel_id, int) else list(hotel_id)
+
+
+def rebuild(hotel_id: int | list | None = None, commit: bool = True) -> int:
+    """Recompute the ledger from bookings in bulk (whole table, or one hotel id or a list). Commits unless told not to."""
+    where, params = "", {}
+    if hotel_id is not None:
+        where, params = "AND b.hotel_id = ANY(:hids)", {"hids": _hotel_ids(hotel_id)}
+        db.session.execute(text("DELETE FROM room_type_nights WHERE hotel_id = ANY(:hids)"), params)
+    else:
+        db.session.execute(text("DELETE FROM room_type_nights"))
+    n = db.session.execute(text(f"""
+        INSERT INTO room_type_nights (hotel_id, room_type_id, night, booked_count, capacity)
+        {_SOURCE_SQL.format(where=where)}
+    """), params).rowcount
+    if commit:
+        db.session.commit()
+    return n
+
+
+def diff(hotel_id: int | list | None = None) -> list:
+    """Rows where the ledger disagrees with bookings/rooms. Empty list means consistent."""
+    where, params = "", {}
+    lwhere = ""
+    if hotel_id is not None:
+        where, lwhere = "AND b.hotel_id = ANY(:hids)", "WHERE hotel_id = ANY(:hids)"
+        params = {"hids": _hotel_ids(hotel_id)}
+    rows = db.session.execute(text(f"""
+        WITH src AS ({_SOURCE_SQL.format(where=where)}),
+        led AS (
+            SELECT hotel_id, room_type_id, night, booked_count, capacity
+            FROM room_type_nights {lwhere}
+        ),
+        cap AS (
+            SELECT room_type_id, COUNT(*) AS rooms FROM rooms
+            WHERE active = TRUE GROUP BY room_type_id
+        )
+        SELECT COALESCE(src.hotel_id, led.hotel_id) AS hotel_id,
+               COALESCE(src.room_type_id, led.room_type_id) AS room_type_id,
+               COALESCE(src.night, led.night) AS night,
+               led.booked_count AS ledger_booked, COALESCE(src.booked_count, 0) AS actual_booked,
+               led.capacity AS ledger_capacity,
+               COALESCE(cap.rooms, 0) AS actual_capacity
+        FROM src
+        FULL OUTER JOIN led ON led.room_type_id = src.room_type_id AND led.night = src.night
+        LEFT JOIN cap ON cap.room_type_id = COALESCE(src.room_type_id, led.room_type_id)
+        WHERE COALESCE(led.booked_count, 0) <> COALESCE(src.booked_count, 0)
+           OR (led.capacity IS NOT NULL AND led.capacity <> COALESCE(cap.rooms, 0))
+        ORDER BY 1, 2, 3
+    """), params).mappings().all()
+    return [dict(r) for r in rows]
@@ -0,0 +1,196 @@
+from flask import current_app
+from sqlalchemy import text
+from . import db
+from . import ledger
+
+# Booking lifecycle. Every status change goes through here so the allowed
+# transitions are enforced in one place, cancellations give their nights back
+# to the ledger, and each change is recorded in booking_status_log in the same
+# transaction. Log rows are buffered and written with one multi-row INSERT per
+# flush, so bulk transitions cost a few statements per chunk, not per booking.
+
+STATUSES = ("pending", "confirmed", "checked_in", "checked_out", "cancelled", "no_show")
+
+TRANSITIONS = {
+    "pending": ("confirmed", "cancelled"),
+    "confirmed": ("checked_in", "cancelled", "no_show"),
+    "checked_in": ("checked_out",),
+    # checked_out, cancelled and no_show are final
+}
+
+# Only a cancellation frees the stay's nights; a no-show still holds the room
+RELEASES_INVENTORY = {"cancelled"}
+
+# Status log note of a hold cancelled at its expires_at (see app/holds.py)
+HOLD_EXPIRED_NOTE = "hold expired"
+
+
+class TransitionError(Exception):
+    def __init__(self, from_status: str, to_status: str):
+        super().__init__(f"Cannot change booking from {from_status} to {to_status}")
+        self.from_status = from_status
+        self.to_status = to_status
+
+
+def sources(to_status: str) -> list:
+    """Statuses a booking may be in to move to `to_status`."""
+    return [s for s, targets in TRANSITIONS.items() if to_status in targets]
+
+
+class StatusLog:
+    """Buffer of booking_status_log rows, written in one INSERT per flush."""
+
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = batch_size or current_app.config.get("BOOKING_STATUS_LOG_BATCH", 1000)
+        self.rows = []
+
+    def add(self, booking_id: int, from_status, to_status: str, user_id=None, note=None):
+        self.rows.append((booking_id, user_id, from_status, to_status, note))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        rows, self.rows = self.rows, []
+        if rows:
+            cols = list(zip(*rows))
+            db.session.execute(text("""
+                INSERT INTO booking_status_log (booking_id, changed_by_user_id, from_status, to_status, note)
+                SELECT * FROM unnest(CAST(:ids AS bigint[]), CAST(:users AS bigint[]),
+                                     CAST(:froms AS text[]), CAST(:tos AS text[]), CAST(:notes AS text[]))
+            """), {"ids": list(cols[0]), "users": list(cols[1]), "froms": list(cols[2]),
+                   "tos": list(cols[3]), "notes": list(cols[4])})
+        return len(rows)
+
+
+def record_created(booking_ids, status: str, user_id=None, note=None):
+    """Log newly inserted bookings (from_status NULL), in the caller's transaction."""
+    log = StatusLog()
+    for booking_id in booking_ids:
+        log.add(booking_id, None, status, user_id, note)
+    log.flush()
+
+
+def _move(where: str, params: dict, to_status: str, limit: int | None = None) -> list:
+    # Lock the matching rows that may still make this move (re-checked after
+    # waiting on a concurrent writer), switch them, and report the old status
+    lock = "FOR UPDATE"
+    if limit is not None:
+        lock = "LIMIT :limit FOR UPDATE SKIP LOCKED"
+    rows = db.session.execute(text(f"""
+        WITH old AS (
+            SELECT id, status FROM bookings
+            WHERE {where} AND status = ANY(CAST(:sources AS text[]))
+            {lock}
+        )
+        UPDATE bookings b SET status = :to_status, updated_at = now()
+        FROM old WHERE b.id = old.id
+        RETURNING b.id, old.status AS from_status, b.hotel_id, b.room_type_id, b.check_in, b.check_out
+    """), {**params, "sources": sources(to_status), "to_status": to_status, "limit": limit}).mappings().all()
+    if to_status in RELEASES_INVENTORY and rows:
+        ledger.release_many([(r["hotel_id"], r["room_type_id"], r["check_in"], r["check_out"]) for r in rows])
+    return rows
+
+
+def transition(booking_id: int, to_status: str, user_id=None, note=None, owner_id=None) -> dict | None:
+    """Move one booking to `to_status` in the caller's transaction (the caller commits).
+
+    With `owner_id`, only a booking that user made or is the guest of matches.
+    Returns the changed row (with from_status), the current row with
+    already=True if it is in `to_status` already, or None if no booking matched.
+    Raises TransitionError if the lifecycle does not allow the move.
+    """
+    if to_status not in STATUSES:
+        raise ValueError(f"Unknown status {to_status!r}")
+    where = "id = :id"
+    params = {"id": booking_id}
+    if owner_id is not None:
+        where += " AND (booked_by_user_id = :owner OR guest_user_id = :owner)"
+        params["owner"] = owner_id
+    rows = _move(where, params, to_status)
+    if rows:
+        log = StatusLog()
+        log.add(booking_id, rows[0]["from_status"], to_status, user_id, note)
+        log.flush()
+        return dict(rows[0])
+    return _unmoved(where, params, to_status)
+
+
+def _unmoved(where: str, params: dict, to_status: str) -> dict | None:
+    current = db.session.execute(text(f"SELECT id, status FROM bookings WHERE {where}"), params).mappings().first()
+    if current is None:
+        return None
+    if current["status"] == to_status:
+        return {"id": current["id"], "from_status": current["status"], "already": True}
+    raise TransitionError(current["status"], to_status)
+
+
+def confirm_hold(booking_id: int, user_id=None, owner_id=None) -> dict | None:
+    """Confirm a hold (pending booking) that has not expired, in the caller's transaction.
+
+    Returns like transition(). A hold past its expires_at is cancelled here
+    instead, without waiting for the sweeper, and the result has expired=True;
+    the caller should commit either way.
+    """
+    where = "id = :id"
+    params = {"id": booking_id}
+    if owner_id is not None:
+        where += " AND (booked_by_user_id = :owner OR guest_user_id = :owner)"
+        params["owner"] = owner_id
+    rows = _move(f"{where} AND (expires_at IS NULL OR expires_at > now())", params, "confirmed")
+    if rows:
+        log = StatusLog()
+        log.add(booking_id, rows[0]["from_status"], "confirmed", user_id)
+        log.flush()
+        return dict(rows[0])
+    rows = _move(f"{where} AND status = 'pending' AND expires_at <= now()", params, "cancelled")
+    if rows:
+        log = StatusLog()
+        log.add(booking_id, "pending", "cancelled", None, HOLD_EXPIRED_NOTE)
+        log.flush()
+        return dict(rows[0], expired=True)
+    # Or the sweeper got there first
+    lapsed = db.session.execute(text(f"""
+        SELECT id FROM bookings WHERE {where} AND status = 'cancelled' AND expires_at <= now()
+    """), params).first()
+    if lapsed:
+        return {"id": lapsed[0], "from_status": "cancelled", "expired": True}
+    return _unmoved(where, params, "confirmed")
+
+
+def transition_where(to_status: str, where: str, params: dict | None = None, user_id=None, note=None,
+                     batch_size: int | None = None) -> int:
+    """Move every booking matching the SQL condition `where` that may make the move; returns how many.
+
+    Works in chunks of `batch_size` rows, one transaction (and one log INSERT)
+    per chunk, so a long run neither holds thousands of row locks nor loses
+    finished chunks on failure. Rows locked by concurrent requests are skipped
+    and left for the next run.
+    """
+    batch_size = batch_size or current_app.config.get("BOOKING_STATUS_LOG_BATCH", 1000)
+    total = 0
+    while True:
+        rows = _move(where, params or {}, to_status, limit=batch_size)
+        log = StatusLog(batch_size)
+        for r in rows:
+            log.add(r["id"], r["from_status"], to_status, user_id, note)
+        log.flush()
+        db.session.commit()
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+
+
+def mark_no_shows(grace_hours: int | None = None, batch_size: int | None = None) -> int:
+    """Confirmed bookings whose check-in passed more than `grace_hours` ago become no_show."""
+    if grace_hours is None:
+        grace_hours = current_app.config.get("NO_SHOW_GRACE_HOURS", 24)
+    return transition_where(
+        "no_show", "check_in < now() - make_interval(hours => :grace)", {"grace": grace_hours},
+        note="automatic no-show", batch_size=batch_size)
+
+
+def expire_holds(batch_size: int | None = None) -> int:
+    """Cancel pending bookings whose hold has expired, giving their nights and rooms back."""
+    return transition_where(
+        "cancelled", "status = 'pending' AND expires_at IS NOT NULL AND expires_at <= now()",
+        note=HOLD_EXPIRED_NOTE, batch_size=batch_size)
@@ -0,0 +1,302 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from flask import g, request
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Application metrics in the Prometheus text format (GET /api/metrics).
+#
+# Every thread updates a shard of its own (plain dicts, registered once under a
+# lock), so recording a request takes no lock at all; a scrape merges copies of
+# the shards. Under gunicorn each worker is a separate process with its own
+# shards: with METRICS_DIR set, workers write a JSON snapshot there (at most
+# every METRICS_FLUSH_SECONDS, and whenever they serve a scrape) and the
+# scrape adds up every file. Counters and histograms of exited workers keep
+# counting so totals never go backwards; gauges come from live workers only.
+# The directory is shared state of one deployment: empty it when restarting.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+# Views whose 409 means the rooms were taken or the client's price was stale
+BOOKING_ENDPOINTS = {"bookings.create_booking", "bookings.create_bookings_batch", "bookings.create_hold"}
+
+HELP = {
+    "http_requests_total": ("counter", "Requests served, by route template, method and status."),
+    "http_request_duration_seconds": ("histogram", "Time from routing to the response, by route template."),
+    "http_requests_in_flight": ("gauge", "Requests currently being handled."),
+    "booking_requests_total": ("counter", "Booking create requests."),
+    "booking_conflicts_total": ("counter", "Booking create requests rejected with 409 (no availability or a stale total)."),
+    "booking_holds_expired_total": ("counter", "Booking holds cancelled by the sweeper at their expires_at."),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result (hit/miss)."),
+    "cache_hit_ratio": ("gauge", "Hits over lookups since start, by cache."),
+    "cache_entries": ("gauge", "Entries held by in-process caches."),
+    "cache_evictions_total": ("counter", "Entries evicted from in-process caches to stay under maxsize."),
+    "db_pool_checkout_wait_seconds": ("histogram", "Time spent waiting for a pooled database connection."),
+    "db_pool_checkout_timeouts_total": ("counter", "Connection checkouts that gave up after pool_timeout."),
+    "db_pool_size": ("gauge", "Persistent connections the pool keeps (pool_size)."),
+    "db_pool_max_overflow": ("gauge", "Connections allowed beyond pool_size (max_overflow)."),
+    "db_pool_checked_out": ("gauge", "Connections currently checked out."),
+    "db_pool_overflow": ("gauge", "Overflow connections currently open."),
+}
+
+
+class _Shard:
+    __slots__ = ("counters", "gauges", "histograms")
+
+    def __init__(self):
+        self.counters = {}     # (name, labels) -> number
+        self.gauges = {}       # (name, labels) -> number (added up across shards)
+        self.histograms = {}   # (name, labels) -> [per-bucket counts..., +Inf count, sum]
+
+
+def _histogram(buckets) -> list:
+    return [0] * (len(buckets) + 1) + [0.0]
+
+
+def _add(into: dict, items):
+    for key, value in items:
+        if isinstance(value, list):
+            mine = into.get(key)
+            into[key] = [a + b for a, b in zip(mine, value)] if mine else list(value)
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.buckets = {"http_request_duration_seconds": DURATION_BUCKETS,
+                        "db_pool_checkout_wait_seconds": POOL_WAIT_BUCKETS}
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+
+    def init_app(self, app):
+        """Call before db.init_app: the engine is built with a pool that times checkouts."""
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        app.extensions["metrics"] = self
+        if not self.enabled:
+            return
+        if not app.config.get("METRICS_TOKEN") and not app.debug:
+            app.logger.warning("METRICS_TOKEN is not set: GET /api/metrics answers 404 outside debug")
+        self.directory = app.config.get("METRICS_DIR") or None
+        self.flush_seconds = app.config.get("METRICS_FLUSH_SECONDS", 5)
+        self._app = app
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            # The last requests of a worker that exits between flushes
+            atexit.register(self.flush)
+        uri = str(app.config.get("SQLALCHEMY_DATABASE_URI", ""))
+        opts = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        # An in-memory SQLite database lives in a single connection; leave its pool alone
+        if ":memory:" not in uri and uri != "sqlite://" and "poolclass" not in opts:
+            app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {**opts, "poolclass": TimedQueuePool}
+        self.max_overflow = opts.get("max_overflow", 10)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    # recording (lock-free after a thread's first call)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name: str, value=1, **labels):
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def gauge_add(self, name: str, value, **labels):
+        gauges = self._shard().gauges
+        key = (name, tuple(sorted(labels.items())))
+        gauges[key] = gauges.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        buckets = self.buckets[name]
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        h = histograms.get(key)
+        if h is None:
+            h = histograms[key] = _histogram(buckets)
+        i = 0
+        while i < len(buckets) and seconds > buckets[i]:
+            i += 1
+        h[i] += 1
+        h[-1] += seconds
+
+    # request hooks
+
+    def _start(self):
+        g._metrics_started = time.perf_counter()
+        self.gauge_add("http_requests_in_flight", 1)
+
+    def _finish(self, response):
+        started = g.get("_metrics_started")
+        if started is None:
+            return response
+        # The route template, not the path: /api/hotels/<int:hotel_id> is one series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        status = response.status_code
+        self.inc("http_requests_total", endpoint=route, method=request.method, status=str(status))
+        self.observe("http_request_duration_seconds", time.perf_counter() - started,
+                     endpoint=route, method=request.method)
+        if request.endpoint in BOOKING_ENDPOINTS:
+            self.inc("booking_requests_total", endpoint=request.endpoint)
+            if status == 409:
+                self.inc("booking_conflicts_total", endpoint=request.endpoint)
+        return response
+
+    def _teardown(self, _exc):
+        if g.pop("_metrics_started", None) is None:
+            return
+        self.gauge_add("http_requests_in_flight", -1)
+        if self.directory and time.monotonic() >= self._next_flush:
+            self._next_flush = time.monotonic() + self.flush_seconds
+            self.flush()
+
+    # collection
+
+    def _collect(self) -> _Shard:
+        """This process's values: all thread shards plus the sampled pool and cache state."""
+        total = _Shard()
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            # dict.copy() is atomic under the GIL; the owning thread may keep writing
+            _add(total.counters, shard.counters.copy().items())
+            _add(total.gauges, shard.gauges.copy().items())
+            _add(total.histograms, ((k, list(v)) for k, v in shard.histograms.copy().items()))
+
+        from . import db
+        from .cache import LRUCache, response_cache
+        from .tokens import tokens
+        with self._app.app_context():
+            pool = db.engine.pool
+        if isinstance(pool, QueuePool):
+            total.gauges[("db_pool_size", ())] = pool.size()
+            total.gauges[("db_pool_max_overflow", ())] = self.max_overflow
+            total.gauges[("db_pool_checked_out", ())] = pool.checkedout()
+            total.gauges[("db_pool_overflow", ())] = max(0, pool.overflow())
+        for name, backend in (("response", response_cache.backend), ("auth_users", tokens.users)):
+            if isinstance(backend, LRUCache):
+                total.gauges[("cache_entries", (("cache", name),))] = len(backend._data)
+                total.counters[("cache_evictions_total", (("cache", name),))] = backend.evictions
+        return total
+
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR (replace, never a partial file)."""
+        snap = self._collect()
+        data = {k: [[name, labels, value] for (name, labels), value in getattr(snap, k).items()]
+                for k in _Shard.__slots__}
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def _gather(self) -> _Shard:
+        if not self.directory:
+            return self._collect()
+        self.flush()
+        total = _Shard()
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                pid = int(os.path.basename(path)[:-5])
+            except (OSError, ValueError):
+                continue
+            for kind in _Shard.__slots__:
+                if kind == "gauges" and not _alive(pid):
+                    continue
+                _add(getattr(total, kind), (((name, tuple(map(tuple, labels))), value)
+                                            for name, labels, value in data.get(kind, [])))
+        return total
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        snap = self._gather()
+        # Hit ratios from the merged lookups, so they are right across workers too
+        lookups = {}
+        for (name, labels), value in snap.counters.items():
+            if name == "cache_requests_total":
+                d = dict(labels)
+                hits, count = lookups.get(d["cache"], (0, 0))
+                lookups[d["cache"]] = (hits + (value if d["result"] == "hit" else 0), count + value)
+        for cache, (hits, count) in lookups.items():
+            snap.gauges[("cache_hit_ratio", (("cache", cache),))] = hits / count if count else 0
+
+        series = {}
+        for kind in _Shard.__slots__:
+            for (name, labels), value in getattr(snap, kind).items():
+                series.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(series):
+            kind, text = HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(series[name]):
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for le, count in zip(self.buckets[name] + ("+Inf",), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(le)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.inc("db_pool_checkout_timeouts_total")
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds", time.perf_counter() - started)
+
+
+metrics = Metrics()
@@ -1,5 +1,15 @@
 from . import db
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# Generated tsvector for hotel search (migration 935c35fb0686 uses the same expression)
+SEARCH_VECTOR_SQL = r"""
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(country, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'C') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(amenities::text, ''),
+        '"[^"]*"\s*:\s*(false|null)|\m(true|false|null)\M', ' ', 'g')), 'D')
+"""
 
 class User(db.Model):
     __tablename__ = "users"
@@ -9,6 +19,7 @@ class User(db.Model):
     phone = db.Column(db.Text)
     role = db.Column(db.String(10), nullable=False, default="user")  # 'user' | 'admin'
     password_hash = db.Column(db.Text, nullable=False)
+    active = db.Column(db.Boolean, nullable=False, server_default=db.text("true"))
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -23,6 +34,17 @@ class Hotel(db.Model):
     amenities = db.Column(db.JSON, nullable=False, default=dict)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Weighted full-text document (name > city/country > description > amenity keys); see app/search.py
+    search_vector = db.Column(TSVECTOR().with_variant(db.Text(), "sqlite"), db.Computed(SEARCH_VECTOR_SQL, persisted=True))
+    __table_args__ = (
+        db.Index("ix_hotels_city_lower_id", db.text("lower(city)"), "id"),
+        # max(updated_at) for catalog ETags (app/conditional.py)
+        db.Index("ix_hotels_updated_at", "updated_at"),
+        db.Index("ix_hotels_search_vector", "search_vector", postgresql_using="gin"),
+        # Only created where the pg_trgm extension is available
+        db.Index("ix_hotels_name_city_trgm", db.text("lower(name || ' ' || city) gin_trgm_ops"),
+                 postgresql_using="gin"),
+    )
 
 class HotelImage(db.Model):
     __tablename__ = "hotel_images"
@@ -31,6 +53,11 @@ class HotelImage(db.Model):
     url = db.Column(db.Text, nullable=False)
     alt_text = db.Column(db.Text)
     is_primary = db.Column(db.Boolean, nullable=False, server_default=db.text("false"))
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    __table_args__ = (
+        db.Index("ix_hotel_images_hotel_primary", "hotel_id", db.text("is_primary DESC"), "id"),
+        db.Index("ix_hotel_images_updated_at", "updated_at"),
+    )
 
 class RoomType(db.Model):
     __tablename__ = "room_types"
@@ -42,6 +69,31 @@ class RoomType(db.Model):
     description = db.Column(db.Text)
     amenities = db.Column(db.JSON, nullable=False, default=dict)
     active = db.Column(db.Boolean, nullable=False, server_default=db.text("true"))
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    __table_args__ = (
+        db.Index("ix_room_types_hotel_active_price", "hotel_id", "base_price",
+                 postgresql_where=db.text("active = true")),
+    )
+
+class RateRule(db.Model):
+    # Nightly price adjustment; see app/pricing.py for how rules combine
+    __tablename__ = "rate_rules"
+    id = db.Column(db.BigInteger, primary_key=True)
+    hotel_id = db.Column(db.BigInteger, db.ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False)
+    room_type_id = db.Column(db.BigInteger, db.ForeignKey("room_types.id", ondelete="CASCADE"))  # NULL: all room types
+    name = db.Column(db.Text, nullable=False)
+    percent = db.Column(db.Numeric(6,2), nullable=False)  # +25 = 25% more, -10 = 10% off
+    # Conditions; NULL means "any". A rule applies to a night when all of them hold.
+    start_date = db.Column(db.Date)          # first night (inclusive)
+    end_date = db.Column(db.Date)            # last night (inclusive)
+    weekdays = db.Column(db.Integer)         # bitmask of the night's weekday: Mon=1, Tue=2, ... Sun=64
+    min_nights = db.Column(db.Integer)       # length of the stay
+    min_occupancy = db.Column(db.Numeric(4,3))  # booked/capacity of the room type that night, 0..1
+    active = db.Column(db.Boolean, nullable=False, server_default=db.text("true"))
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    __table_args__ = (
+        db.Index("ix_rate_rules_hotel", "hotel_id", postgresql_where=db.text("active = true")),
+    )
 
 class Room(db.Model):
     __tablename__ = "rooms"
@@ -51,6 +103,10 @@ class Room(db.Model):
     room_number = db.Column(db.Text, nullable=False)
     status = db.Column(db.Text, nullable=False, server_default=db.text("'available'"))
     active = db.Column(db.Boolean, nullable=False, server_default=db.text("true"))
+    __table_args__ = (
+        db.Index("ix_rooms_hotel_type_active", "hotel_id", "room_type_id",
+                 postgresql_where=db.text("active = true")),
+    )
 
 class Booking(db.Model):
     __tablename__ = "bookings"
@@ -60,21 +116,55 @@ class Booking(db.Model):
     guest_name = db.Column(db.Text)
     hotel_id = db.Column(db.BigInteger, db.ForeignKey("hotels.id", ondelete="RESTRICT"), nullable=False)
     room_type_id = db.Column(db.BigInteger, db.ForeignKey("room_types.id", ondelete="RESTRICT"), nullable=False)
+    room_id = db.Column(db.BigInteger, db.ForeignKey("rooms.id", ondelete="SET NULL"))  # assigned by app/allocation.py
     check_in = db.Column(db.DateTime(timezone=True), nullable=False)
     check_out = db.Column(db.DateTime(timezone=True), nullable=False)
-    status = db.Column(db.Text, nullable=False, server_default=db.text("'pending'"))  # pending|confirmed|cancelled
+    status = db.Column(db.Text, nullable=False, server_default=db.text("'pending'"))  # see app/lifecycle.py STATUSES
+    expires_at = db.Column(db.DateTime(timezone=True))  # holds: a pending booking is cancelled after this
     num_guests = db.Column(db.Integer, nullable=False)
     total_amount = db.Column(db.Numeric(12,2), nullable=False)
     currency = db.Column(db.Text, nullable=False, server_default=db.text("'USD'"))
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    __table_args__ = (
+        db.Index("ix_bookings_active_overlap", "hotel_id", "room_type_id", "check_in", "check_out",
+                 postgresql_where=db.text("status <> 'cancelled'")),
+        db.Index("ix_bookings_confirmed_check_in", "check_in",
+                 postgresql_where=db.text("status = 'confirmed'")),
+        db.Index("ix_bookings_guest_created", "guest_user_id", db.text("created_at DESC"), db.text("id DESC")),
+        db.Index("ix_bookings_booked_by_created", "booked_by_user_id", db.text("created_at DESC"), db.text("id DESC")),
+        db.Index("ix_bookings_created", db.text("created_at DESC"), db.text("id DESC")),
+        db.Index("ix_bookings_room_stay", "room_id", "check_in",
+                 postgresql_where=db.text("room_id IS NOT NULL")),
+        # Holds by expiry: what the sweeper (app/holds.py) walks
+        db.Index("ix_bookings_hold_expires", "expires_at",
+                 postgresql_where=db.text("status = 'pending' AND expires_at IS NOT NULL")),
+    )
 
 class BookingStatusLog(db.Model):
     __tablename__ = "booking_status_log"
     id = db.Column(db.BigInteger, primary_key=True)
     booking_id = db.Column(db.BigInteger, db.ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False)
-    changed_by_user_id = db.Column(db.BigInteger, db.ForeignKey("users.id", ondelete="RESTRICT"), nullable=False)
+    changed_by_user_id = db.Column(db.BigInteger, db.ForeignKey("users.id", ondelete="RESTRICT"))  # NULL: system job
     from_status = db.Column(db.Text)
     to_status = db.Column(db.Text, nullable=False)
     note = db.Column(db.Text)
     changed_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    __table_args__ = (
+        db.Index("ix_booking_status_log_booking", "booking_id", "changed_at"),
+    )
+
+class RoomTypeNight(db.Model):
+    # Nightly inventory ledger (read model for availability); maintained by app/ledger.py
+    __tablename__ = "room_type_nights"
+    room_type_id = db.Column(db.BigInteger, db.ForeignKey("room_types.id", ondelete="CASCADE"), primary_key=True)
+    night = db.Column(db.Date, primary_key=True)
+    hotel_id = db.Column(db.BigInteger, db.ForeignKey("hotels.id", ondelete="CASCADE"), nullable=False)
+    booked_count = db.Column(db.Integer, nullable=False, server_default=db.text("0"))
+    capacity = db.Column(db.Integer, nullable=False, server_default=db.text("0"))
+    __table_args__ = (
+        db.Index("ix_room_type_nights_hotel_night", "hotel_id", "night"),
+        # sold-out nights only: /api/search anti-joins against these
+        db.Index("ix_room_type_nights_sold_out", "night", "room_type_id",
+                 postgresql_where=db.text("booked_count >= capacity")),
+    )
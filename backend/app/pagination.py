@@ -0,0 +1,48 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import request
+from werkzeug.exceptions import BadRequest
+
+# Keyset pagination: clients pass back the opaque `cursor` from the previous
+# page's X-Next-Cursor header; it encodes the sort key of that page's last row,
+# so each page is an index range scan no matter how deep the client goes.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values) -> str:
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(raw: str, kinds: tuple) -> list:
+    """Decode a cursor whose values have the given types (int or datetime)."""
+    try:
+        padded = raw + "=" * (-len(raw) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(kinds):
+            raise ValueError(raw)
+        return [datetime.fromisoformat(v) if kind is datetime else kind(v) for kind, v in zip(kinds, values)]
+    except (ValueError, TypeError, ArithmeticError, binascii.Error):
+        raise BadRequest("Invalid cursor")
+
+
+def page_args(kinds: tuple, default: int = 20, maximum: int = 100, args=None):
+    """(limit, cursor values or None) from ?limit=&cursor= (of `args`, default the request's)."""
+    args = request.args if args is None else args
+    try:
+        limit = int(args.get("limit") or default)
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    limit = max(1, min(limit, maximum))
+    raw = (args.get("cursor") or "").strip()
+    return limit, (decode_cursor(raw, kinds) if raw else None)
+
+
+def set_next_cursor(resp, rows: list, limit: int, key):
+    """Attach X-Next-Cursor when the page is full; `key(row)` gives the sort key tuple."""
+    if len(rows) == limit:
+        resp.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+    return resp
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing off the request thread. scrypt/pbkdf2 burn tens of ms of
+# CPU per call; running them in a small process pool keeps that work (and the
+# GIL) away from the worker's request threads. The pool is bounded: at most
+# `workers * QUEUE_FACTOR` hashes are in flight at once (submitted, of which
+# `workers` run and the rest queue in the pool). Further callers wait for a
+# slot; a call that gets no slot or no result within `timeout` seconds in all
+# raises HasherBusy, which the app answers with 503 and Retry-After.
+
+QUEUE_FACTOR = 8
+RETRY_AFTER = 1  # seconds, sent with the 503 when the pool is saturated
+
+
+class HasherBusy(Exception):
+    """The hashing pool had no slot or no result within the timeout."""
+
+
+def _context():
+    # Children are forked from a clean server process, not from a worker that
+    # holds DB connections and threads
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class PasswordHasher:
+    def __init__(self, method: str = "scrypt:32768:8:1", workers: int = 0, timeout: float = 30):
+        self.configure(method, workers, timeout)
+
+    def configure(self, method: str, workers: int = 0, timeout: float = 30):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._prefix = None
+        self._dummy = None
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(max(workers, 1) * QUEUE_FACTOR)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.configure(app.config.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1"),
+                       app.config.get("PASSWORD_HASH_WORKERS", 0),
+                       app.config.get("PASSWORD_HASH_TIMEOUT", 30))
+        app.extensions["password_hasher"] = self
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # One pool per process: gunicorn forks workers after the app is created
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context())
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy()
+        try:
+            future = self._pool().submit(fn, *args)
+            try:
+                return future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeout:
+                future.cancel()
+                raise HasherBusy()
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str | None, password: str) -> bool:
+        """Check a password; with no stored hash, still spend the same time (no user enumeration)."""
+        if not pwhash:
+            if self._dummy is None:
+                self._dummy = self.hash(os.urandom(16).hex())
+            self._run(check_password_hash, self._dummy, password)
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    @property
+    def prefix(self) -> str:
+        # Werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"), so derive
+        # the canonical method string from a real hash once
+        if self._prefix is None:
+            self._prefix = generate_password_hash("", self.method).split("$", 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        return pwhash.split("$", 1)[0] != self.prefix
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+passwords = PasswordHasher()
@@ -0,0 +1,254 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+import numpy as np
+from sqlalchemy import bindparam, text
+from . import db
+
+# Stay pricing from rate rules (the rate_rules table).
+#
+# A night costs the room type's base_price times (1 + percent/100) of every
+# active rule that applies to it, multiplied together, rounded half-up to the
+# cent; a stay costs the sum of its nights. A rule applies to a night when all
+# of its conditions hold: the room type (or any of the hotel's), the night
+# within [start_date, end_date], its weekday in the weekdays mask, the stay at
+# least min_nights long, and the room type at least min_occupancy booked that
+# night (room_type_nights ledger).
+#
+# Prices are computed for many stays at once: rows are (room type, stay),
+# nights a column axis, and each rule is matched against the rows of its
+# hotel with array operations, so a search page of a few hundred room types
+# costs the same handful of numpy calls as a single quote. Money is kept in
+# integer cents, so totals are exact and the same for a quote and the booking
+# that checks it. Percents are kept as integer basis points: the float product
+# of the factors only decides the cent, and a night it puts within rounding
+# error of a half cent is priced again in exact integers.
+
+_EPOCH = date(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+RULE_COLUMNS = ("hotel_id", "room_type_id", "percent", "start_date", "end_date", "weekdays", "min_nights",
+                "min_occupancy")
+
+_RULES_SQL = text(f"""
+    SELECT {", ".join(RULE_COLUMNS)}
+    FROM rate_rules
+    WHERE active = TRUE AND hotel_id IN :hids
+""").bindparams(bindparam("hids", expanding=True))
+
+_OCCUPANCY_SQL = text("""
+    SELECT room_type_id, night, booked_count, capacity
+    FROM room_type_nights
+    WHERE room_type_id IN :rtids AND night BETWEEN :first AND :last
+""").bindparams(bindparam("rtids", expanding=True))
+
+
+def _day(d) -> int:
+    """Days since 1970-01-01 of a date, or of a datetime's UTC calendar date (naive: as given).
+
+    The same night ledger.NIGHTS_SQL derives: CAST(... AS date) in a UTC session.
+    """
+    if isinstance(d, datetime):
+        if d.tzinfo is not None:
+            d = d.astimezone(timezone.utc)
+        d = d.date()
+    return (d - _EPOCH).days
+
+
+def _days(values, default) -> np.ndarray:
+    return np.array([default if v is None else v.toordinal() - _EPOCH_ORDINAL for v in values], dtype=np.int64)
+
+
+def parse_amount(value) -> Decimal:
+    """A money amount from JSON (number or string); ValueError if it is not one."""
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount {value!r}")
+    return amount
+
+
+def _cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+class Rules:
+    """Rate rules as parallel arrays (one element per rule), from tuples in RULE_COLUMNS order."""
+
+    def __init__(self, rows=()):
+        cols = list(zip(*rows)) or [()] * len(RULE_COLUMNS)
+        hotel, room_type, percent, start, end, weekdays, min_nights, min_occupancy = cols
+        big = np.iinfo(np.int64).max
+        self.hotel = np.array(hotel, dtype=np.int64)
+        self.room_type = np.array([v or 0 for v in room_type], dtype=np.int64)
+        # Basis points: percent is NUMERIC(6,2), so exact as an integer
+        self.bp = np.array([_cents(v) for v in percent], dtype=np.int64)
+        self.factor = 1 + self.bp / 10000
+        self.start = _days(start, -big)
+        self.end = _days(end, big)
+        self.weekdays = np.array([127 if v is None else v for v in weekdays], dtype=np.int64)
+        self.min_nights = np.array([v or 0 for v in min_nights], dtype=np.int64)
+        self.min_occupancy = np.array([-1.0 if v is None else v for v in min_occupancy], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.hotel)
+
+    @property
+    def uses_occupancy(self) -> bool:
+        return bool((self.min_occupancy >= 0).any())
+
+
+def nightly_cents(hotel, room_type, base_cents, first, nights, rules: Rules, occupancy=None, stay_nights=None):
+    """(rows x max nights) int64 array of nightly prices in cents; 0 past each stay's end.
+
+    All row arguments are equal-length int arrays: hotel id, room type id,
+    base price in cents, first night (days since epoch) and number of nights.
+    `occupancy` is an optional (rows x max nights) array of booked/capacity.
+    `stay_nights` is the stay length min_nights rules see, if not `nights`.
+    """
+    if stay_nights is None:
+        stay_nights = nights
+    rows = len(hotel)
+    width = int(nights.max()) if rows else 0
+    offset = np.arange(width)
+    day = first[:, None] + offset[None, :]
+    factor = np.ones((rows, width))
+    k = r = np.zeros(0, dtype=np.int64)
+    hit = np.zeros((0, width), dtype=bool)
+    if len(rules) and rows:
+        # (rule, row) pairs for the rows of each rule's hotel: rows sorted by
+        # hotel, each rule's block found by binary search and expanded
+        order = np.argsort(hotel, kind="stable")
+        lo = np.searchsorted(hotel[order], rules.hotel, "left")
+        counts = np.searchsorted(hotel[order], rules.hotel, "right") - lo
+        k = np.repeat(np.arange(len(rules)), counts)
+        r = order[np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+        keep = ((rules.room_type[k] == 0) | (rules.room_type[k] == room_type[r])) & (stay_nights[r] >= rules.min_nights[k])
+        k, r = k[keep], r[keep]
+        d = day[r]
+        hit = (d >= rules.start[k, None]) & (d <= rules.end[k, None])
+        # 1970-01-01 was a Thursday: (day + 3) % 7 is 0 on Mondays
+        hit &= (rules.weekdays[k, None] >> ((d + 3) % 7)) & 1 == 1
+        if occupancy is not None:
+            hit &= occupancy[r] >= rules.min_occupancy[k, None]
+        np.multiply.at(factor, r, np.where(hit, rules.factor[k, None], 1.0))
+    exact = base_cents[:, None] * np.maximum(factor, 0.0)
+    cents = np.floor(exact + 0.5).astype(np.int64)
+    # Half cents the float product may have missed by an ulp: redo those
+    # nights in Python integers, base x (10000 + bp) per hit / 10000 per hit
+    near = np.abs(exact - np.floor(exact) - 0.5) < 1e-6
+    if near.any():
+        ni, nj = np.nonzero(near)
+        cell = np.full(near.shape, -1)
+        cell[ni, nj] = np.arange(len(ni))
+        p, j = np.nonzero(hit & (cell[r] >= 0))
+        num, den = base_cents[ni].astype(object), np.ones(len(ni), dtype=object)
+        np.multiply.at(num, cell[r[p], j], (10000 + rules.bp[k[p]]).astype(object))
+        np.multiply.at(den, cell[r[p], j], 10000)
+        cents[ni, nj] = np.maximum((2 * num + den) // (2 * den), 0).astype(np.int64)
+    cents[offset[None, :] >= nights[:, None]] = 0
+    return cents
+
+
+def _occupancy(room_type, first, nights) -> np.ndarray:
+    """booked/capacity per row and night from the ledger; nights without a row are empty."""
+    last = first + nights - 1
+    found = db.session.execute(_OCCUPANCY_SQL, {
+        "rtids": sorted(set(room_type.tolist())),
+        "first": _EPOCH + timedelta(days=int(first.min())),
+        "last": _EPOCH + timedelta(days=int(last.max())),
+    }).all()
+    width = int(nights.max())
+    if not found:
+        return np.zeros((len(room_type), width))
+    rtids, found_nights, booked, capacity = zip(*found)
+    # Room type and night packed into one sortable key
+    keys = np.array(rtids, dtype=np.int64) << 20 | _days(found_nights, 0)
+    booked, capacity = np.array(booked, dtype=np.float64), np.array(capacity, dtype=np.float64)
+    values = np.divide(booked, capacity, out=np.ones_like(booked), where=capacity > 0)
+    order = np.argsort(keys)
+    keys, values = keys[order], values[order]
+    want = room_type[:, None] << 20 | (first[:, None] + np.arange(width)[None, :])
+    idx = np.minimum(np.searchsorted(keys, want), len(keys) - 1)
+    return np.where(keys[idx] == want, values[idx], 0.0)
+
+
+def price(stays: list, nightly: bool = False) -> list:
+    """Price stays: dicts with hotel_id, room_type_id, base_price, check_in, check_out.
+
+    Returns one dict per stay with `total` (Decimal) and `nights`, plus
+    `nightly` ([{"night", "price"}]) when asked. Costs one query for the rules
+    and, only if a rule depends on occupancy, one for the ledger.
+    """
+    if not stays:
+        return []
+    hotel = np.array([s["hotel_id"] for s in stays], dtype=np.int64)
+    room_type = np.array([s["room_type_id"] for s in stays], dtype=np.int64)
+    base = np.array([_cents(s["base_price"]) for s in stays], dtype=np.int64)
+    first = np.array([_day(s["check_in"]) for s in stays], dtype=np.int64)
+    # Same nights as the ledger (ledger.NIGHTS_SQL): at least one
+    nights = np.maximum(np.array([_day(s["check_out"]) for s in stays], dtype=np.int64) - first, 1)
+
+    rules = Rules(db.session.execute(_RULES_SQL, {"hids": sorted(set(hotel.tolist()))}).all())
+    occupancy = _occupancy(room_type, first, nights) if rules.uses_occupancy else None
+    cents = nightly_cents(hotel, room_type, base, first, nights, rules, occupancy)
+
+    totals = cents.sum(axis=1).tolist()
+    out = [{"total": Decimal(t).scaleb(-2), "nights": int(n)} for t, n in zip(totals, nights.tolist())]
+    if nightly:
+        for rec, row, start, n in zip(out, cents.tolist(), first.tolist(), nights.tolist()):
+            rec["nightly"] = [{"night": (_EPOCH + timedelta(days=start + i)).isoformat(), "price": Decimal(c).scaleb(-2)}
+                              for i, c in enumerate(row[:n])]
+    return out
+
+
+def night_rates(hotel_id: int, room_types, first, nights: int, occupancy=None) -> list:
+    """Price of each night from `first` for each (room_type_id, base_price), as a one-night stay.
+
+    Returns one list of `nights` Decimal prices per room type. `occupancy` is
+    an optional (room types x nights) booked/capacity array the caller
+    already has; without it the ledger is read only if a rule needs it.
+    """
+    if not room_types or nights < 1:
+        return [[] for _ in room_types]
+    n = len(room_types)
+    hotel = np.full(n, hotel_id, dtype=np.int64)
+    room_type = np.array([rtid for rtid, _ in room_types], dtype=np.int64)
+    base = np.array([_cents(b) for _, b in room_types], dtype=np.int64)
+    start = np.full(n, _day(first), dtype=np.int64)
+    width = np.full(n, nights, dtype=np.int64)
+    rules = Rules(db.session.execute(_RULES_SQL, {"hids": [hotel_id]}).all())
+    if occupancy is None and rules.uses_occupancy:
+        occupancy = _occupancy(room_type, start, width)
+    cents = nightly_cents(hotel, room_type, base, start, width, rules, occupancy, stay_nights=np.ones(n, dtype=np.int64))
+    return [[Decimal(c).scaleb(-2) for c in row] for row in cents.tolist()]
+
+
+def same_amount(a, b) -> bool:
+    """Two money amounts equal to the cent."""
+    return _cents(a) == _cents(b)
+
+
+_ROOM_TYPES_SQL = text("""
+    SELECT id, hotel_id, base_price FROM room_types WHERE id IN :ids
+""").bindparams(bindparam("ids", expanding=True))
+
+
+def quote(items) -> list:
+    """Stay totals for (hotel_id, room_type_id, check_in, check_out) items.
+
+    None for an item whose room type is not the hotel's. Two queries for any
+    number of items (three with occupancy rules).
+    """
+    ids = sorted({int(rtid) for _, rtid, _, _ in items})
+    if not ids:
+        return []
+    base = {r.id: r for r in db.session.execute(_ROOM_TYPES_SQL, {"ids": ids})}
+    known = [i for i, (hid, rtid, _, _) in enumerate(items) if rtid in base and base[rtid].hotel_id == hid]
+    priced = price([{"hotel_id": items[i][0], "room_type_id": items[i][1], "base_price": base[items[i][1]].base_price,
+                     "check_in": items[i][2], "check_out": items[i][3]} for i in known])
+    out = [None] * len(items)
+    for i, p in zip(known, priced):
+        out[i] = p["total"]
+    return out
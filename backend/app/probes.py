@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+from . import db
+
+# Readiness checks and startup warmup.
+#
+# Liveness (GET /api/health/live) only says the process serves requests. Readiness
+# (GET /api/health/ready) says it can do useful work: the database answers
+# within READY_TIMEOUT_SECONDS, the schema is at the migration head this code
+# expects, and the pool has a connection to spare. The database check runs on
+# a single background thread so a hung connect cannot hold the probe past its
+# timeout; while a previous check is still stuck, the worker reports not ready
+# without starting another.
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="readiness")
+_lock = threading.Lock()
+_pending = None
+_heads = None
+
+# Tables every hot read path touches; the first query against each one loads
+# its catalog entries into the backend's cache
+WARMUP_TABLES = ("users", "hotels", "hotel_images", "room_types", "bookings", "room_type_nights")
+
+
+def _migration_heads(app) -> list:
+    global _heads
+    if _heads is None:
+        from alembic.script import ScriptDirectory
+        directory = app.extensions["migrate"].directory
+        if not os.path.isabs(directory):
+            directory = os.path.join(os.path.dirname(app.root_path), directory)
+        _heads = sorted(ScriptDirectory(directory).get_heads())
+    return _heads
+
+
+def _pool_check(app) -> dict:
+    pool = db.engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"ok": True}
+    capacity = pool.size() + app.config["SQLALCHEMY_ENGINE_OPTIONS"].get("max_overflow", 10)
+    checked_out = pool.checkedout()
+    return {"ok": checked_out < capacity, "checked_out": checked_out, "capacity": capacity}
+
+
+def _database_check(app, timeout: float) -> dict:
+    with app.app_context():
+        started = time.perf_counter()
+        with db.engine.connect() as conn:
+            if conn.dialect.name == "postgresql":
+                conn.execute(text(f"SET LOCAL statement_timeout = {int(timeout * 1000)}"))
+            conn.execute(text("SELECT 1"))
+            ms = round((time.perf_counter() - started) * 1000, 1)
+            current = sorted(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+        return {"ms": ms, "current": current}
+
+
+def readiness(app) -> tuple[bool, dict]:
+    """(ready, per-check details) for the readiness probe."""
+    global _pending
+    timeout = app.config.get("READY_TIMEOUT_SECONDS", 2)
+    checks = {"pool": _pool_check(app)}
+    with _lock:
+        if _pending is not None and not _pending.done():
+            future, stuck = _pending, True
+        else:
+            future, stuck = _executor.submit(_database_check, app, timeout), False
+            _pending = future
+    try:
+        if stuck:
+            raise FutureTimeout()
+        result = future.result(timeout=timeout)
+    except FutureTimeout:
+        checks["database"] = {"ok": False, "error": f"no answer within {timeout}s"}
+    except Exception as e:
+        checks["database"] = {"ok": False, "error": str(e).splitlines()[0]}
+    else:
+        checks["database"] = {"ok": True, "ms": result["ms"]}
+        if app.config.get("READY_CHECK_MIGRATIONS", True):
+            head = _migration_heads(app)
+            checks["migrations"] = {"ok": result["current"] == head, "current": result["current"], "head": head}
+    return all(c["ok"] for c in checks.values()), checks
+
+
+def warmup(app) -> dict:
+    """Open pool_size connections and prime the app's caches before serving traffic."""
+    started = time.perf_counter()
+    with app.app_context():
+        engine = db.engine
+        n = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+        # Hold them all at once, or the pool would hand back the same connection
+        conns = []
+        try:
+            for _ in range(n):
+                conn = engine.connect()
+                conns.append(conn)
+                for table in WARMUP_TABLES:
+                    conn.execute(text(f"SELECT 1 FROM {table} LIMIT 1"))
+                conn.rollback()
+        finally:
+            for conn in conns:
+                conn.close()
+        opened = time.perf_counter() - started
+    # One pass through the hot routes fills the response cache and the
+    # compiled-SQL caches, and runs any import or setup done on first use
+    client = app.test_client()
+    statuses = {path: client.get(path).status_code for path in app.config.get("WARMUP_PATHS", [])}
+    return {"connections": n, "connect_seconds": round(opened, 3),
+            "seconds": round(time.perf_counter() - started, 3), "paths": statuses}
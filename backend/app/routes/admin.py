@@ -1,8 +1,17 @@
+from datetime import date, datetime
 from flask import Blueprint, request, jsonify
 from sqlalchemy import text
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..authz import role_required
+from ..pagination import page_args, set_next_cursor
+from ..cache import response_cache, invalidate_hotel
+from ..tokens import forget_user
 from .. import db
+from .. import allocation
+from .. import lifecycle
+from .. import pricing
+from ..export import FORMATS, stream_query
+from ..txn import run_with_retry, RetriesExhausted
 
 bp = Blueprint("admin", __name__)
 
@@ -10,40 +19,198 @@ bp = Blueprint("admin", __name__)
 @jwt_required()
 @role_required("admin")
 def users():
-    rows = db.session.execute(text("""
-        SELECT id, full_name, email, phone, role, created_at, updated_at
-        FROM users ORDER BY id LIMIT 500
-    """)).mappings().all()
+    limit, cursor = page_args((int,), default=500, maximum=500)
+    rows = db.session.execute(text(f"""
+        SELECT id, full_name, email, phone, role, active, created_at, updated_at
+        FROM users {"WHERE id > :after_id" if cursor else ""}
+        ORDER BY id LIMIT :limit
+    """), {"limit": limit, "after_id": cursor[0] if cursor else None}).mappings().all()
     out = []
     for r in rows:
         rec = dict(r)
         rec["created_at"] = rec["created_at"].isoformat() if rec.get("created_at") else None
         rec["updated_at"] = rec["updated_at"].isoformat() if rec.get("updated_at") else None
         out.append(rec)
-    return jsonify(out)
+    return set_next_cursor(jsonify(out), rows, limit, lambda r: (r["id"],))
+
+@bp.patch("/admin/users/<int:user_id>")
+@jwt_required()
+@role_required("admin")
+def update_user(user_id: int):
+    """Change a user's role or deactivate them; applies to their existing tokens."""
+    data = request.get_json() or {}
+    fields = []
+    params = {"id": user_id}
+    if "role" in data:
+        if data["role"] not in ("user", "admin"):
+            return jsonify({"error": "role must be 'user' or 'admin'"}), 400
+        fields.append("role=:role")
+        params["role"] = data["role"]
+    if "active" in data:
+        fields.append("active=:active")
+        params["active"] = bool(data["active"])
+    if not fields:
+        return jsonify({"error": "Nothing to update"}), 400
+    row = db.session.execute(text(f"UPDATE users SET {', '.join(fields)}, updated_at=now() WHERE id=:id RETURNING id"),
+                             params).first()
+    if not row:
+        return jsonify({"error": "Not found"}), 404
+    db.session.commit()
+    forget_user(user_id)
+    return jsonify({"ok": True})
 
 @bp.get("/admin/bookings")
 @jwt_required()
 @role_required("admin")
 def bookings():
-    rows = db.session.execute(text("""
+    limit, cursor = page_args((datetime, int), default=500, maximum=500)
+    params = {"limit": limit}
+    where = ""
+    if cursor:
+        where = "WHERE (b.created_at, b.id) < (:after_at, :after_id)"
+        params.update(after_at=cursor[0], after_id=cursor[1])
+    rows = db.session.execute(text(f"""
         SELECT b.id, b.status, b.check_in, b.check_out, b.num_guests, b.total_amount, b.currency,
-               u.email AS booked_by, COALESCE(gu.email,'') AS guest_email,
-               h.name AS hotel_name, rt.name AS room_type_name
+               b.created_at, u.email AS booked_by, COALESCE(gu.email,'') AS guest_email,
+               h.name AS hotel_name, rt.name AS room_type_name, rm.room_number
         FROM bookings b
         JOIN users u ON u.id = b.booked_by_user_id
         LEFT JOIN users gu ON gu.id = b.guest_user_id
         JOIN hotels h ON h.id = b.hotel_id
         JOIN room_types rt ON rt.id = b.room_type_id
-        ORDER BY b.created_at DESC
-        LIMIT 500
-    """)).mappings().all()
+        LEFT JOIN rooms rm ON rm.id = b.room_id
+        {where}
+        ORDER BY b.created_at DESC, b.id DESC
+        LIMIT :limit
+    """), params).mappings().all()
     out = []
     for r in rows:
         rec = dict(r)
-        for k in ("check_in","check_out"):
+        for k in ("check_in","check_out","created_at"):
             rec[k] = rec[k].isoformat() if rec[k] else None
         out.append(rec)
+    return set_next_cursor(jsonify(out), rows, limit, lambda r: (r["created_at"], r["id"]))
+
+
+def _export_args():
+    """(format, where clause on created_at, params) from ?format=&from=&to=; raises ValueError."""
+    fmt = request.args.get("format", "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    conds, params = [], {}
+    for name, op in (("from", ">="), ("to", "<")):
+        if request.args.get(name):
+            try:
+                params[name] = datetime.fromisoformat(request.args[name])
+            except ValueError:
+                raise ValueError(f"Invalid {name} date")
+            conds.append(f"{{t}}created_at {op} :{name}")
+    return fmt, ("WHERE " + " AND ".join(conds)) if conds else "", params
+
+
+@bp.get("/admin/users/export")
+@jwt_required()
+@role_required("admin")
+def export_users():
+    try:
+        fmt, where, params = _export_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return stream_query(f"""
+        SELECT id, full_name, email, phone, role, active, created_at, updated_at
+        FROM users {where.format(t="")}
+        ORDER BY id
+    """, params, fmt, "users")
+
+
+@bp.get("/admin/bookings/export")
+@jwt_required()
+@role_required("admin")
+def export_bookings():
+    try:
+        fmt, where, params = _export_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return stream_query(f"""
+        SELECT b.id, b.status, b.check_in, b.check_out, b.num_guests, b.total_amount, b.currency,
+               b.created_at, u.email AS booked_by, COALESCE(gu.email,'') AS guest_email,
+               b.hotel_id, h.name AS hotel_name, b.room_type_id, rt.name AS room_type_name
+        FROM bookings b
+        JOIN users u ON u.id = b.booked_by_user_id
+        LEFT JOIN users gu ON gu.id = b.guest_user_id
+        JOIN hotels h ON h.id = b.hotel_id
+        JOIN room_types rt ON rt.id = b.room_type_id
+        {where.format(t="b.")}
+        ORDER BY b.created_at, b.id
+    """, params, fmt, "bookings")
+
+
+@bp.patch("/admin/bookings/<int:booking_id>/status")
+@jwt_required()
+@role_required("admin")
+def update_booking_status(booking_id: int):
+    """Move a booking through its lifecycle (check in, check out, no-show, ...)."""
+    data = request.get_json() or {}
+    status = data.get("status")
+    if status not in lifecycle.STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(lifecycle.STATUSES)}"}), 400
+
+    def _move():
+        row = lifecycle.transition(booking_id, status, int(get_jwt_identity()), note=data.get("note"))
+        if row is not None:
+            db.session.commit()
+        return row
+
+    try:
+        row = run_with_retry(_move)
+    except lifecycle.TransitionError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    except RetriesExhausted:
+        return jsonify({"error": "Booking conflict, please retry"}), 409
+    if row is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify({"ok": True, "from_status": row["from_status"], "status": status,
+                    "already": bool(row.get("already"))})
+
+
+@bp.post("/admin/hotels/<int:hotel_id>/rooms/optimize")
+@jwt_required()
+@role_required("admin")
+def optimize_rooms(hotel_id: int):
+    """Re-pack the hotel's upcoming room assignments; ?repack=1 also moves stays that fit where they are."""
+    if not db.session.execute(text("SELECT 1 FROM hotels WHERE id = :id"), {"id": hotel_id}).first():
+        return jsonify({"error": "Not found"}), 404
+    stable = request.args.get("repack") != "1"
+    try:
+        result = run_with_retry(lambda: _optimize(hotel_id, stable))
+    except RetriesExhausted:
+        return jsonify({"error": "Assignment conflict, please retry"}), 409
+    return jsonify(result)
+
+
+def _optimize(hotel_id: int, stable: bool) -> dict:
+    result = allocation.optimize(hotel_id, stable)
+    db.session.commit()
+    return result
+
+
+@bp.get("/admin/bookings/<int:booking_id>/status-log")
+@jwt_required()
+@role_required("admin")
+def booking_status_log(booking_id: int):
+    rows = db.session.execute(text("""
+        SELECT l.from_status, l.to_status, l.note, l.changed_at, u.email AS changed_by
+        FROM booking_status_log l
+        LEFT JOIN users u ON u.id = l.changed_by_user_id
+        WHERE l.booking_id = :id
+        ORDER BY l.changed_at, l.id
+    """), {"id": booking_id}).mappings().all()
+    out = []
+    for r in rows:
+        rec = dict(r)
+        rec["changed_at"] = rec["changed_at"].isoformat() if rec["changed_at"] else None
+        out.append(rec)
     return jsonify(out)
 
 
@@ -61,6 +228,99 @@ def update_hotel(hotel_id: int):
             params[f] = data[f]
     if not fields:
         return jsonify({"error": "Nothing to update"}), 400
-    db.session.execute(text(f"UPDATE hotels SET {', '.join(fields)} WHERE id=:id"), params)
+    db.session.execute(text(f"UPDATE hotels SET {', '.join(fields)}, updated_at=now() WHERE id=:id"), params)
+    db.session.commit()
+    invalidate_hotel(hotel_id)
+    return jsonify({"ok": True})
+
+
+_RULE_FIELDS = ("room_type_id", "name", "percent", "start_date", "end_date", "weekdays", "min_nights",
+                "min_occupancy")
+
+
+def _rate_rule(data) -> dict:
+    """Validated rate rule fields from JSON; raises ValueError."""
+    rule = {f: data.get(f) for f in _RULE_FIELDS}
+    if not rule["name"] or rule["percent"] is None:
+        raise ValueError("name and percent are required")
+    rule["percent"] = pricing.parse_amount(rule["percent"])
+    if rule["percent"] <= -100:
+        raise ValueError("percent must be greater than -100")
+    for f in ("start_date", "end_date"):
+        if rule[f]:
+            rule[f] = date.fromisoformat(rule[f])
+    if rule["start_date"] and rule["end_date"] and rule["end_date"] < rule["start_date"]:
+        raise ValueError("end_date must not be before start_date")
+    # Stored as given, so anything that is not a number must fail here (400), not in the INSERT
+    for f, kind in (("room_type_id", int), ("weekdays", int), ("min_nights", int), ("min_occupancy", float)):
+        if rule[f] is not None:
+            try:
+                rule[f] = kind(rule[f])
+            except (TypeError, ValueError):
+                raise ValueError(f"{f} must be {'an integer' if kind is int else 'a number'}")
+    if rule["weekdays"] is not None and not 0 < rule["weekdays"] < 128:
+        raise ValueError("weekdays is a bitmask from 1 (Monday) to 127 (every day)")
+    if rule["min_nights"] is not None and rule["min_nights"] < 1:
+        raise ValueError("min_nights must be at least 1")
+    if rule["min_occupancy"] is not None and not 0 <= rule["min_occupancy"] <= 1:
+        raise ValueError("min_occupancy must be between 0 and 1")
+    return rule
+
+
+@bp.get("/admin/hotels/<int:hotel_id>/rate-rules")
+@jwt_required()
+@role_required("admin")
+def rate_rules(hotel_id: int):
+    rows = db.session.execute(text(f"""
+        SELECT id, {", ".join(_RULE_FIELDS)}, active, updated_at
+        FROM rate_rules WHERE hotel_id = :hid ORDER BY id
+    """), {"hid": hotel_id}).mappings().all()
+    out = []
+    for r in rows:
+        rec = dict(r)
+        for k in ("start_date", "end_date", "updated_at"):
+            rec[k] = rec[k].isoformat() if rec[k] else None
+        out.append(rec)
+    return jsonify(out)
+
+
+@bp.post("/admin/hotels/<int:hotel_id>/rate-rules")
+@jwt_required()
+@role_required("admin")
+def create_rate_rule(hotel_id: int):
+    """Add a rate rule; it prices every quote and booking from now on (see app/pricing.py)."""
+    try:
+        rule = _rate_rule(request.get_json() or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if rule["room_type_id"] is not None and not db.session.execute(text(
+            "SELECT 1 FROM room_types WHERE id = :rtid AND hotel_id = :hid"),
+            {"rtid": rule["room_type_id"], "hid": hotel_id}).first():
+        return jsonify({"error": "room_type_id is not a room type of this hotel"}), 400
+    row = db.session.execute(text(f"""
+        INSERT INTO rate_rules (hotel_id, {", ".join(_RULE_FIELDS)})
+        SELECT id, {", ".join(":" + f for f in _RULE_FIELDS)} FROM hotels WHERE id = :hid
+        RETURNING id
+    """), dict(rule, hid=hotel_id)).first()
+    if not row:
+        return jsonify({"error": "Not found"}), 404
+    db.session.commit()
+    return jsonify({"ok": True, "id": row[0]}), 201
+
+
+@bp.delete("/admin/rate-rules/<int:rule_id>")
+@jwt_required()
+@role_required("admin")
+def delete_rate_rule(rule_id: int):
+    row = db.session.execute(text("DELETE FROM rate_rules WHERE id = :id RETURNING id"), {"id": rule_id}).first()
+    if not row:
+        return jsonify({"error": "Not found"}), 404
     db.session.commit()
     return jsonify({"ok": True})
+
+
+@bp.get("/admin/cache")
+@jwt_required()
+@role_required("admin")
+def cache_stats():
+    return jsonify(response_cache.stats())
@@ -1,11 +1,24 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import create_access_token
+from jwt.exceptions import PyJWTError
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_jwt_extended import (
+    create_access_token, create_refresh_token, decode_token, get_jwt, get_jwt_identity, jwt_required,
+)
 from .. import db
 from ..models import User
+from ..passwords import passwords
+from ..tokens import revoke
 
 bp = Blueprint("auth", __name__)
 
+def _issue(u) -> dict:
+    # role/email claims are for display only; authorization re-reads the user
+    claims = {"role": u.role, "email": u.email}
+    return {
+        "access_token": create_access_token(identity=str(u.id), additional_claims=claims),
+        "refresh_token": create_refresh_token(identity=str(u.id)),
+    }
+
 @bp.post("/register")
 def register():
     data = request.get_json() or {}
@@ -21,7 +34,7 @@ def register():
         full_name=data["full_name"],
         email=data["email"],
         role="user",
-        password_hash=generate_password_hash(data["password"]),
+        password_hash=passwords.hash(data["password"]),
     )
     db.session.add(u)
     db.session.commit()
@@ -34,8 +47,37 @@ def login():
     password = data.get("password") or ""
 
     u = db.session.execute(db.select(User).filter_by(email=email)).scalar()
-    if not u or not check_password_hash(u.password_hash, password):
+    if not passwords.verify(u.password_hash if u else None, password) or not u.active:
         return jsonify({"error": "Invalid credentials"}), 401
 
-    token = create_access_token(identity=str(u.id), additional_claims={"role": u.role, "email": u.email})
-    return jsonify({"access_token": token})
+    # Upgrade hashes made with older cost settings while we have the plaintext
+    if passwords.needs_rehash(u.password_hash):
+        u.password_hash = passwords.hash(password)
+        db.session.commit()
+
+    return jsonify(_issue(u))
+
+@bp.post("/refresh")
+@jwt_required(refresh=True)
+def refresh():
+    # Rotate: the presented refresh token is spent, a new pair is issued with
+    # the user's current role
+    u = db.session.get(User, int(get_jwt_identity()))
+    if not u or not u.active:
+        return jsonify({"error": "Token has been revoked"}), 401
+    revoke(get_jwt())
+    return jsonify(_issue(u))
+
+@bp.post("/logout")
+@jwt_required(verify_type=False)
+def logout():
+    revoke(get_jwt())
+    raw = (request.get_json(silent=True) or {}).get("refresh_token")
+    if raw:
+        try:
+            decoded = decode_token(raw)
+        except (PyJWTError, JWTExtendedException):
+            decoded = None
+        if decoded and decoded.get("sub") == get_jwt_identity():
+            revoke(decoded)
+    return jsonify({"ok": True})
@@ -1,104 +1,296 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from datetime import datetime
+from flask import Blueprint, current_app, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import text
 from .. import db
 from ..authz import role_required
+from ..tokens import current_role
+from .. import allocation
+from .. import ledger
+from .. import lifecycle
+from .. import pricing
+from ..txn import run_with_retry, RetriesExhausted
+from ..pagination import page_args, set_next_cursor
+from ..conditional import conditional
 
 bp = Blueprint("bookings", __name__)
 
 def _uid() -> int:
     return int(get_jwt_identity())
 
+def _my_bookings_version():
+    if current_role() == "admin" and request.args.get("all") == "1":
+        return None
+    uid = _uid()
+    # Guest OR booker as two index-backed branches, as in my_bookings_query; the
+    # booker branch skips rows the guest branch already has, so nothing counts
+    # twice. The listing shows hotel and room type names, so their edits count too.
+    row = db.session.execute(text("""
+        SELECT GREATEST(MAX(b.updated_at), MAX(h.updated_at), MAX(rt.updated_at)) AS last_modified,
+               COUNT(*) AS n
+        FROM (
+            SELECT hotel_id, room_type_id, updated_at FROM bookings WHERE guest_user_id = :uid
+            UNION ALL
+            SELECT hotel_id, room_type_id, updated_at FROM bookings
+            WHERE booked_by_user_id = :uid AND guest_user_id IS DISTINCT FROM :uid
+        ) b
+        JOIN hotels h ON h.id = b.hotel_id
+        JOIN room_types rt ON rt.id = b.room_type_id
+    """), {"uid": uid}).mappings().first()
+    return row["last_modified"], [uid, row["n"]]
+
 @bp.get("/bookings")
 @jwt_required()
+@conditional(_my_bookings_version, private=True)
 def my_bookings():
-    claims = get_jwt()
-    is_admin = (claims or {}).get("role") == "admin"
-    uid = _uid()
-    params = {"uid": uid}
-    where = "WHERE b.guest_user_id = :uid OR b.booked_by_user_id = :uid"
-    if is_admin and request.args.get("all") == "1":
-        where = "WHERE 1=1"
-        params = {}
-    rows = db.session.execute(text(f"""
+    everyone = current_role() == "admin" and request.args.get("all") == "1"
+    limit, cursor = page_args((datetime, int), default=100, maximum=100)
+    rows = db.session.execute(*my_bookings_query(_uid(), everyone, limit, cursor)).mappings().all()
+    out = [booking_record(r) for r in rows]
+    return set_next_cursor(jsonify(out), rows, limit, lambda r: (r["created_at"], r["id"]))
+
+def my_bookings_query(uid: int, everyone: bool, limit: int, cursor=None):
+    """(statement, params) for a page of a user's bookings (every booking if `everyone`), newest first."""
+    params = {"uid": uid, "limit": limit}
+    after = ""
+    if cursor:
+        after = "AND ({t}created_at, {t}id) < (:after_at, :after_id)"
+        params.update(after_at=cursor[0], after_id=cursor[1])
+    # Guest OR booker: union two bounded walks over the per-user (created_at, id)
+    # indexes instead of an OR that forces a scan + sort.
+    where = f"""WHERE b.id IN (
+            (SELECT id FROM bookings WHERE guest_user_id = :uid {after.format(t="")}
+             ORDER BY created_at DESC, id DESC LIMIT :limit)
+            UNION
+            (SELECT id FROM bookings WHERE booked_by_user_id = :uid {after.format(t="")}
+             ORDER BY created_at DESC, id DESC LIMIT :limit)
+        )"""
+    if everyone:
+        where = "WHERE 1=1 " + after.format(t="b.")
+        params.pop("uid")
+    return text(f"""
         SELECT b.id, b.status, b.check_in, b.check_out, b.num_guests, b.total_amount, b.currency,
-               h.name AS hotel_name, rt.name AS room_type_name
+               b.created_at, h.name AS hotel_name, rt.name AS room_type_name
         FROM bookings b
         JOIN hotels h ON h.id = b.hotel_id
         JOIN room_types rt ON rt.id = b.room_type_id
         {where}
-        ORDER BY b.created_at DESC
-        LIMIT 100
-    """), params).mappings().all()
-    out = []
-    for r in rows:
-        rec = dict(r)
-        for k in ("check_in","check_out"):
-            rec[k] = rec[k].isoformat() if rec[k] else None
-        out.append(rec)
-    return jsonify(out)
+        ORDER BY b.created_at DESC, b.id DESC
+        LIMIT :limit
+    """), params
+
+def booking_record(row) -> dict:
+    rec = dict(row)
+    for k in ("check_in","check_out","created_at"):
+        rec[k] = rec[k].isoformat() if rec[k] else None
+    return rec
 
 @bp.post("/bookings")
 @jwt_required()
 def create_booking():
-    data = request.get_json() or {}
-    required = ("hotel_id","room_type_id","check_in","check_out","num_guests","total_amount","currency")
+    return _create(request.get_json() or {})
+
+@bp.post("/bookings/hold")
+@jwt_required()
+def create_hold():
+    """Reserve a stay for BOOKING_HOLD_SECONDS while the client checks out; confirm it to book."""
+    return _create(request.get_json() or {}, hold_seconds=current_app.config.get("BOOKING_HOLD_SECONDS", 600))
+
+def _create(data: dict, hold_seconds=None):
+    # total_amount is optional: the server prices the stay, and a total sent
+    # by the client (the quote it showed) must match that price
+    required = ("hotel_id","room_type_id","check_in","check_out","num_guests")
     for f in required:
         if data.get(f) in (None, ""):
             return jsonify({"error": f"Missing {f}"}), 400
-    from datetime import datetime
     ci = datetime.fromisoformat(data["check_in"])
     co = datetime.fromisoformat(data["check_out"])
     if co <= ci:
         return jsonify({"error": "check_out must be after check_in"}), 400
 
-    # Ensure availability
-    overlap = db.session.execute(text("""
-        SELECT 1 FROM bookings
-        WHERE hotel_id=:hid AND room_type_id=:rtid AND status <> 'cancelled'
-          AND check_in < :co AND check_out > :ci
-        LIMIT 1
-    """), {"hid": data["hotel_id"], "rtid": data["room_type_id"], "ci": ci, "co": co}).first()
-    if overlap:
+    hid = int(data["hotel_id"])
+    rtid = int(data["room_type_id"])
+    uid = _uid()
+    sent = data.get("total_amount")
+    try:
+        sent = None if sent in (None, "") else pricing.parse_amount(sent)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    total = pricing.quote([(hid, rtid, ci, co)])[0]
+    if total is None:
+        return jsonify({"error": "Selected room type is not available for the given dates"}), 409
+    if sent is not None and not pricing.same_amount(sent, total):
+        return jsonify({"error": "total_amount does not match the price for these dates", "total_amount": total}), 409
+    # A hold is a pending booking with an expiry; a booking is confirmed at once
+    status = "confirmed" if hold_seconds is None else "pending"
+
+    def _book():
+        # Lock the stay's ledger nights first; concurrent bookings of this room
+        # type queue here, so the capacity check and the insert cannot race.
+        if not ledger.reserve(hid, rtid, ci, co):
+            db.session.rollback()
+            return None
+        row = db.session.execute(text("""
+            INSERT INTO bookings (booked_by_user_id, guest_user_id, guest_name, hotel_id, room_type_id,
+                                  check_in, check_out, status, num_guests, total_amount, currency, expires_at)
+            VALUES (:booked_by, :guest_user, :guest_name, :hid, :rtid, :ci, :co, :status, :guests, :total, :cur,
+                    now() + make_interval(secs => :hold))
+            RETURNING id, expires_at
+        """), {
+            "booked_by": uid,
+            "guest_user": uid,
+            "guest_name": None,
+            "hid": hid,
+            "rtid": rtid,
+            "ci": ci, "co": co,
+            "status": status,
+            "guests": int(data["num_guests"]),
+            "total": total,
+            "cur": data.get("currency","USD"),
+            "hold": hold_seconds,
+        }).first()
+        allocation.assign([row[0]])
+        lifecycle.record_created([row[0]], status, uid)
+        db.session.commit()
+        return row
+
+    try:
+        row = run_with_retry(_book)
+    except RetriesExhausted:
+        return jsonify({"error": "Booking conflict, please retry"}), 409
+    if row is None:
         return jsonify({"error": "Selected room type is not available for the given dates"}), 409
+    if hold_seconds is None:
+        return jsonify({"ok": True, "booking_id": row[0]})
+    return jsonify({"ok": True, "hold_id": row[0], "expires_at": row[1].isoformat(), "ttl_seconds": hold_seconds,
+                    "total_amount": total})
 
+@bp.post("/bookings/<int:booking_id>/confirm")
+@jwt_required()
+def confirm_hold(booking_id: int):
+    """Turn a hold into a confirmed booking, if it has not expired."""
     uid = _uid()
-    row = db.session.execute(text("""
-        INSERT INTO bookings (booked_by_user_id, guest_user_id, guest_name, hotel_id, room_type_id,
-                              check_in, check_out, status, num_guests, total_amount, currency)
-        VALUES (:booked_by, :guest_user, :guest_name, :hid, :rtid, :ci, :co, 'confirmed', :guests, :total, :cur)
-        RETURNING id
-    """), {
-        "booked_by": uid,
-        "guest_user": uid,
-        "guest_name": None,
-        "hid": data["hotel_id"],
-        "rtid": data["room_type_id"],
-        "ci": ci, "co": co,
-        "guests": int(data["num_guests"]),
-        "total": float(data["total_amount"]),
-        "cur": data.get("currency","USD")
-    }).first()
+    owner = None if current_role() == "admin" else uid
+    try:
+        row = lifecycle.confirm_hold(booking_id, uid, owner_id=owner)
+    except lifecycle.TransitionError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    if row is None:
+        return jsonify({"error": "Not found"}), 404
     db.session.commit()
-    return jsonify({"ok": True, "booking_id": row[0]})
+    if row.get("expired"):
+        return jsonify({"error": "Hold expired"}), 409
+    if row.get("already"):
+        return jsonify({"ok": True, "already": True, "booking_id": booking_id})
+    return jsonify({"ok": True, "booking_id": booking_id})
+
+def _batch_item(data) -> tuple:
+    required = ("hotel_id","room_type_id","check_in","check_out","num_guests")
+    for f in required:
+        if data.get(f) in (None, ""):
+            raise ValueError(f"Missing {f}")
+    ci = datetime.fromisoformat(data["check_in"])
+    co = datetime.fromisoformat(data["check_out"])
+    if co <= ci:
+        raise ValueError("check_out must be after check_in")
+    total = data.get("total_amount")
+    return (int(data["hotel_id"]), int(data["room_type_id"]), ci, co, int(data["num_guests"]),
+            None if total in (None, "") else pricing.parse_amount(total), data.get("currency","USD"))
+
+@bp.post("/bookings/batch")
+@jwt_required()
+def create_bookings_batch():
+    """Book several stays at once, all or nothing.
+
+    Availability for the whole batch is checked and reserved set-based, and the
+    bookings go in with one multi-row INSERT, so the statement count does not
+    grow with the number of items.
+    """
+    items = (request.get_json() or {}).get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    limit = current_app.config.get("BOOKING_BATCH_MAX", 200)
+    if len(items) > limit:
+        return jsonify({"error": f"At most {limit} items per batch"}), 400
+    parsed = []
+    for i, data in enumerate(items):
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("must be an object")
+            parsed.append(_batch_item(data))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Item {i}: {e}"}), 400
+    uid = _uid()
+    # Priced in one pass; sent totals must match, missing ones are filled in.
+    # Unpriced items (room type not the hotel's) fail the reservation below.
+    quoted = pricing.quote([p[:4] for p in parsed])
+    changed = [i for i, (p, q) in enumerate(zip(parsed, quoted))
+               if q is not None and p[5] is not None and not pricing.same_amount(p[5], q)]
+    if changed:
+        return jsonify({"error": "total_amount of some items does not match the price for their dates", "price_changed": changed,
+                        "total_amounts": [quoted[i] for i in changed]}), 409
+    parsed = [p[:5] + (q or 0,) + p[6:] for p, q in zip(parsed, quoted)]
+    cols = list(zip(*parsed))
+
+    def _book():
+        unavailable = ledger.reserve_many([p[:4] for p in parsed])
+        if unavailable:
+            db.session.rollback()
+            return unavailable, None
+        rows = db.session.execute(text("""
+            INSERT INTO bookings (booked_by_user_id, guest_user_id, guest_name, hotel_id, room_type_id,
+                                  check_in, check_out, status, num_guests, total_amount, currency)
+            SELECT :uid, :uid, NULL, i.hid, i.rtid, i.ci, i.co, 'confirmed', i.guests, i.total, i.cur
+            FROM unnest(CAST(:hids AS bigint[]), CAST(:rtids AS bigint[]),
+                        CAST(:cis AS timestamptz[]), CAST(:cos AS timestamptz[]),
+                        CAST(:guests AS int[]), CAST(:totals AS numeric[]), CAST(:curs AS text[]))
+                 WITH ORDINALITY AS i(hid, rtid, ci, co, guests, total, cur, ord)
+            ORDER BY i.ord
+            RETURNING id
+        """), {
+            "uid": uid,
+            "hids": list(cols[0]), "rtids": list(cols[1]),
+            "cis": list(cols[2]), "cos": list(cols[3]),
+            "guests": list(cols[4]), "totals": list(cols[5]), "curs": list(cols[6]),
+        }).scalars().all()
+        allocation.assign(rows)
+        lifecycle.record_created(rows, "confirmed", uid)
+        db.session.commit()
+        # Ids come from the sequence in insert order
+        return [], sorted(rows)
+
+    try:
+        unavailable, booking_ids = run_with_retry(_book)
+    except RetriesExhausted:
+        return jsonify({"error": "Booking conflict, please retry"}), 409
+    if unavailable:
+        return jsonify({"error": "Some items are not available for the given dates",
+                        "unavailable": unavailable}), 409
+    return jsonify({"ok": True, "booking_ids": booking_ids})
 
 @bp.patch("/bookings/<int:booking_id>/cancel")
 @jwt_required()
 def cancel_booking(booking_id: int):
     uid = _uid()
     # Allow cancel if owns booking or admin
-    claims = get_jwt()
-    is_admin = (claims or {}).get("role") == "admin"
-    cond = "id=:id AND (booked_by_user_id=:uid OR guest_user_id=:uid)"
-    params = {"id": booking_id, "uid": uid}
-    if is_admin:
-        cond = "id=:id"
-        params = {"id": booking_id}
-    row = db.session.execute(text(f"SELECT status FROM bookings WHERE {cond}"), params).first()
-    if not row:
+    owner = None if current_role() == "admin" else uid
+
+    def _cancel():
+        row = lifecycle.transition(booking_id, "cancelled", uid, owner_id=owner)
+        if row is not None:
+            db.session.commit()
+        return row
+
+    try:
+        row = run_with_retry(_cancel)
+    except lifecycle.TransitionError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 409
+    except RetriesExhausted:
+        return jsonify({"error": "Booking conflict, please retry"}), 409
+    if row is None:
         return jsonify({"error": "Not found"}), 404
-    if row[0] == "cancelled":
+    if row.get("already"):
         return jsonify({"ok": True, "already": True})
-    db.session.execute(text("UPDATE bookings SET status='cancelled' WHERE id=:id"), {"id": booking_id})
-    db.session.commit()
     return jsonify({"ok": True})
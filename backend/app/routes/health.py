@@ -1,7 +1,34 @@
-from flask import Blueprint, jsonify
+import hmac
+from flask import Blueprint, current_app, jsonify, request
+from ..metrics import metrics
+from ..probes import readiness
 
 bp = Blueprint("health", __name__)
 
 @bp.get("/health")
 def health():
     return jsonify({"ok": True, "service": "hotel-app", "version": 1})
+
+# Liveness: the process answers. Never touches the database, so a database
+# outage does not get every worker restarted.
+@bp.get("/health/live")
+def live():
+    return jsonify({"ok": True})
+
+# Readiness: take this worker out of rotation (503) until it can serve
+@bp.get("/health/ready")
+def ready():
+    ok, checks = readiness(current_app._get_current_object())
+    return jsonify({"ready": ok, "checks": checks}), 200 if ok else 503
+
+@bp.get("/metrics")
+def prometheus_metrics():
+    if not metrics.enabled:
+        return jsonify({"error": "Not found"}), 404
+    token = current_app.config.get("METRICS_TOKEN")
+    if not token and not current_app.debug:
+        # Outside debug the endpoint is never public: no token, no endpoint
+        return jsonify({"error": "Not found"}), 404
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return current_app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -1,68 +1,114 @@
+from datetime import date, datetime
+import numpy as np
 from flask import Blueprint, jsonify, request
 from sqlalchemy import text
 from .. import db
+from ..images import attach_primary_images, hotel_images
+from ..availability import nightly_inventory, remaining_by_room_type
+from ..pricing import night_rates, price
+from ..cache import response_cache, hotel_namespace
+from ..conditional import conditional
+from ..pagination import page_args, set_next_cursor
+from ..search import search_hotels
 
 bp = Blueprint("hotels", __name__)
 
-def _map_hotel(row):
-    rec = dict(row)
-    # Attach primary image if available
-    img = db.session.execute(text("""
-        SELECT url, alt_text FROM hotel_images
-        WHERE hotel_id=:hid
-        ORDER BY CASE WHEN is_primary THEN 0 ELSE 1 END, id
-        LIMIT 1
-    """), {"hid": rec["id"]}).mappings().first()
-    rec["primary_image"] = img["url"] if img else None
-    return rec
+def _catalog_version():
+    # Index-only max() probes; any hotel or image write moves one of these
+    row = db.session.execute(text("""
+        SELECT GREATEST((SELECT MAX(updated_at) FROM hotels),
+                        (SELECT MAX(updated_at) FROM hotel_images)) AS last_modified,
+               (SELECT MAX(id) FROM hotels) AS hotels,
+               (SELECT MAX(id) FROM hotel_images) AS images
+    """)).mappings().first()
+    return row["last_modified"], [row["hotels"], row["images"]]
+
+def _hotel_version(hotel_id: int):
+    row = db.session.execute(text("""
+        SELECT GREATEST(h.updated_at,
+                        (SELECT MAX(updated_at) FROM room_types WHERE hotel_id = h.id AND active = TRUE),
+                        (SELECT MAX(updated_at) FROM hotel_images WHERE hotel_id = h.id)) AS last_modified,
+               (SELECT COUNT(*) FROM room_types WHERE hotel_id = h.id AND active = TRUE) AS room_types,
+               (SELECT COUNT(*) FROM hotel_images WHERE hotel_id = h.id) AS images
+        FROM hotels h WHERE h.id = :id
+    """), {"id": hotel_id}).mappings().first()
+    if not row:
+        return None
+    return row["last_modified"], [row["room_types"], row["images"]]
 
 @bp.get("/hotels")
+@conditional(_catalog_version)
+@response_cache.cached("hotels")
 def list_hotels():
     q = (request.args.get("q") or "").strip()
     city = (request.args.get("city") or "").strip()
-    limit = int(request.args.get("limit") or 20)
-    offset = int(request.args.get("offset") or 0)
 
-    where = []
-    params = {}
     if q:
-        where.append("(LOWER(name) LIKE :q OR LOWER(city) LIKE :q)")
-        params["q"] = f"%{q.lower()}%"
+        # Ranked full-text / fuzzy search, paged on (rank, id)
+        limit, cursor = page_args((float, int), default=20, maximum=100)
+        out = attach_primary_images(search_hotels(q, city, limit, cursor))
+        return set_next_cursor(jsonify(out), out, limit, lambda r: (r["rank"], r["id"]))
+
+    limit, cursor = page_args((int,), default=20, maximum=100)
+    rows = db.session.execute(*hotels_query(city, limit, cursor)).mappings().all()
+
+    # Primary images for the whole page come from one batched query
+    out = attach_primary_images([dict(r) for r in rows])
+    return set_next_cursor(jsonify(out), out, limit, lambda r: (r["id"],))
+
+def hotels_query(city: str, limit: int, cursor=None):
+    """(statement, params) for a page of the unsearched hotel list, in id order."""
+    where = []
+    params = {"limit": limit}
+    if cursor:
+        where.append("id > :after_id")
+        params["after_id"] = cursor[0]
     if city:
         where.append("LOWER(city)=:city")
         params["city"] = city.lower()
     clause = "WHERE " + " AND ".join(where) if where else ""
-
-    rows = db.session.execute(text(f"""
+    return text(f"""
         SELECT id, name, city, country, address, description, amenities
         FROM hotels {clause}
         ORDER BY id
-        LIMIT :limit OFFSET :offset
-    """), dict(params, limit=limit, offset=offset)).mappings().all()
+        LIMIT :limit
+    """), params
 
-    return jsonify([_map_hotel(r) for r in rows])
+# Shared with the async handlers (app/asgi.py)
+HOTEL_SQL = text("""
+    SELECT id, name, city, country, address, description, amenities
+    FROM hotels WHERE id=:id
+""")
+
+ROOM_TYPES_SQL = text("""
+    SELECT id, name, capacity, base_price, description, amenities
+    FROM room_types WHERE hotel_id=:hid AND active = TRUE
+    ORDER BY base_price
+""")
+
+FITTING_ROOM_TYPES_SQL = text("""
+    SELECT rt.id, rt.name, rt.capacity, rt.base_price, rt.description, rt.amenities
+    FROM room_types rt
+    WHERE rt.hotel_id = :hid
+      AND rt.active = TRUE
+      AND rt.capacity >= :guests
+    ORDER BY rt.base_price
+""")
 
 @bp.get("/hotels/<int:hotel_id>")
+@conditional(_hotel_version)
+@response_cache.cached(hotel_namespace)
 def hotel_detail(hotel_id: int):
-    row = db.session.execute(text("""
-        SELECT id, name, city, country, address, description, amenities
-        FROM hotels WHERE id=:id
-    """), {"id": hotel_id}).mappings().first()
+    row = db.session.execute(HOTEL_SQL, {"id": hotel_id}).mappings().first()
     if not row:
         return jsonify({"error": "Not found"}), 404
     rec = dict(row)
 
-    images = db.session.execute(text("""
-        SELECT url, alt_text, is_primary FROM hotel_images
-        WHERE hotel_id=:hid ORDER BY is_primary DESC, id
-    """), {"hid": hotel_id}).mappings().all()
-    rec["images"] = [dict(i) for i in images]
+    images = hotel_images([hotel_id])[hotel_id]
+    rec["images"] = images
+    rec["primary_image"] = images[0]["url"] if images else None
 
-    room_types = db.session.execute(text("""
-        SELECT id, name, capacity, base_price, description, amenities
-        FROM room_types WHERE hotel_id=:hid AND active = TRUE
-        ORDER BY base_price
-    """), {"hid": hotel_id}).mappings().all()
+    room_types = db.session.execute(ROOM_TYPES_SQL, {"hid": hotel_id}).mappings().all()
     rec["room_types"] = [dict(r) for r in room_types]
 
     return jsonify(rec)
@@ -80,21 +126,88 @@ def hotel_availability(hotel_id: int):
     ci_dt = tzaware(ci)
     co_dt = tzaware(co)
 
-    # Available room types = capacity ok AND no overlapping bookings in range
+    # Available room types = capacity ok AND at least one room free every night
+    rows = db.session.execute(FITTING_ROOM_TYPES_SQL, {"hid": hotel_id, "guests": guests}).mappings().all()
+    if not rows:
+        return jsonify([])
+
+    remaining = remaining_by_room_type(hotel_id, ci_dt, co_dt, [r["id"] for r in rows])
+    out = []
+    for r in rows:
+        left = remaining.get(r["id"], 0)
+        if left > 0:
+            out.append(dict(r, available_rooms=left))
+    return jsonify(out)
+
+@bp.get("/hotels/<int:hotel_id>/quote")
+def hotel_quote(hotel_id: int):
+    """Price a stay for each of the hotel's room types (or one, with ?room_type_id=), cheapest first."""
+    try:
+        ci = datetime.fromisoformat(request.args.get("check_in") or "")
+        co = datetime.fromisoformat(request.args.get("check_out") or "")
+        guests = int(request.args.get("guests") or 1)
+        rtid = int(request.args["room_type_id"]) if request.args.get("room_type_id") else None
+    except ValueError:
+        return jsonify({"error": "check_in and check_out (ISO8601) are required; guests and room_type_id must be integers"}), 400
+    if co <= ci:
+        return jsonify({"error": "check_out must be after check_in"}), 400
+
+    rows = db.session.execute(text(f"""
+        SELECT id, hotel_id, name, capacity, base_price
+        FROM room_types
+        WHERE hotel_id = :hid AND active = TRUE AND capacity >= :guests
+          {"AND id = :rtid" if rtid else ""}
+    """), {"hid": hotel_id, "guests": guests, "rtid": rtid}).mappings().all()
+    if not rows:
+        return jsonify({"error": "Not found"}), 404
+    priced = price([{"hotel_id": r["hotel_id"], "room_type_id": r["id"], "base_price": r["base_price"],
+                     "check_in": ci, "check_out": co} for r in rows], nightly=True)
+    out = [{"room_type_id": r["id"], "name": r["name"], "capacity": r["capacity"], "base_price": r["base_price"],
+            "currency": "USD", **p} for r, p in zip(rows, priced)]
+    out.sort(key=lambda q: (q["total"], q["room_type_id"]))
+    return jsonify(out)
+
+CALENDAR_MAX_NIGHTS = 365
+
+@bp.get("/hotels/<int:hotel_id>/calendar")
+def hotel_calendar(hotel_id: int):
+    """Rooms left and nightly price of each room type for every night in [from, to).
+
+    One ledger query covers the whole range (up to a year), so a date picker
+    can shade a month or more without an availability probe per date range.
+    Prices are what a one-night stay pays; quotes for a longer stay may add
+    length-of-stay rules.
+    """
+    try:
+        first = date.fromisoformat(request.args.get("from") or "")
+        end = date.fromisoformat(request.args.get("to") or "")
+    except ValueError:
+        return jsonify({"error": "from and to (YYYY-MM-DD) are required"}), 400
+    nights = (end - first).days
+    if not 1 <= nights <= CALENDAR_MAX_NIGHTS:
+        return jsonify({"error": f"to must be 1 to {CALENDAR_MAX_NIGHTS} days after from"}), 400
+
     rows = db.session.execute(text("""
-        SELECT rt.id, rt.name, rt.capacity, rt.base_price, rt.description, rt.amenities
-        FROM room_types rt
-        WHERE rt.hotel_id = :hid
-          AND rt.active = TRUE
-          AND rt.capacity >= :guests
-          AND NOT EXISTS (
-                SELECT 1 FROM bookings b
-                WHERE b.hotel_id = rt.hotel_id
-                  AND b.room_type_id = rt.id
-                  AND b.status <> 'cancelled'
-                  AND b.check_in < :co AND b.check_out > :ci
-          )
-        ORDER BY rt.base_price
-    """), {"hid": hotel_id, "guests": guests, "ci": ci_dt, "co": co_dt}).mappings().all()
-
-    return jsonify([dict(r) for r in rows])
+        SELECT id, name, capacity, base_price
+        FROM room_types WHERE hotel_id = :hid AND active = TRUE
+        ORDER BY base_price, id
+    """), {"hid": hotel_id}).mappings().all()
+    if not rows:
+        return jsonify({"error": "Not found"}), 404
+
+    # Rows come back room type by room type, every night of the range in order
+    inventory = nightly_inventory(hotel_id, first, end, [r["id"] for r in rows])
+    by_type = {}
+    for rec in inventory:
+        by_type.setdefault(rec["room_type_id"], []).append(rec)
+    booked = np.array([[n["booked"] for n in by_type[r["id"]]] for r in rows], dtype=np.float64)
+    capacity = np.array([[n["capacity"] for n in by_type[r["id"]]] for r in rows], dtype=np.float64)
+    occupancy = np.divide(booked, capacity, out=np.ones_like(booked), where=capacity > 0)
+    rates = night_rates(hotel_id, [(r["id"], r["base_price"]) for r in rows], first, nights, occupancy)
+
+    out = []
+    for r, rate in zip(rows, rates):
+        out.append(dict(r, nights=[{"night": n["night"].isoformat(), "remaining": n["remaining"], "price": p}
+                                   for n, p in zip(by_type[r["id"]], rate)]))
+    return jsonify({"hotel_id": hotel_id, "from": first.isoformat(), "to": end.isoformat(),
+                    "currency": "USD", "room_types": out})
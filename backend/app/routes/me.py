@@ -2,14 +2,24 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import text
 from .. import db
+from ..conditional import conditional
+from ..passwords import passwords
 
 bp = Blueprint("me", __name__)
 
 def _me_id() -> int:
     return int(get_jwt_identity())
 
+def _me_version():
+    uid = _me_id()
+    updated_at = db.session.execute(text("SELECT updated_at FROM users WHERE id=:id"), {"id": uid}).scalar()
+    if updated_at is None:
+        return None
+    return updated_at, [uid]
+
 @bp.get("/me")
 @jwt_required()
+@conditional(_me_version, private=True)
 def me_get():
     uid = _me_id()
     row = db.session.execute(text("""
@@ -36,14 +46,13 @@ def me_update():
             params[f] = data[f]
     if not fields:
         return jsonify({"error": "Nothing to update"}), 400
-    db.session.execute(text(f"UPDATE users SET {', '.join(fields)} WHERE id=:id"), params)
+    db.session.execute(text(f"UPDATE users SET {', '.join(fields)}, updated_at=now() WHERE id=:id"), params)
     db.session.commit()
     return jsonify({"ok": True})
 
 @bp.patch("/me/password")
 @jwt_required()
 def me_change_password():
-    from werkzeug.security import check_password_hash, generate_password_hash
     uid = _me_id()
     data = request.get_json() or {}
     cur = data.get("current_password") or ""
@@ -52,11 +61,11 @@ def me_change_password():
         return jsonify({"error": "New password too short"}), 400
 
     row = db.session.execute(text("SELECT password_hash FROM users WHERE id=:id"), {"id": uid}).first()
-    if not row or not check_password_hash(row[0], cur):
+    if not passwords.verify(row[0] if row else None, cur):
         return jsonify({"error": "Current password invalid"}), 400
 
-    new_hash = generate_password_hash(new)
-    db.session.execute(text("UPDATE users SET password_hash=:ph WHERE id=:id"), {"ph": new_hash, "id": uid})
+    new_hash = passwords.hash(new)
+    db.session.execute(text("UPDATE users SET password_hash=:ph, updated_at=now() WHERE id=:id"), {"ph": new_hash, "id": uid})
     db.session.commit()
     return jsonify({"ok": True})
 
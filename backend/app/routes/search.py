@@ -0,0 +1,46 @@
+from datetime import datetime
+from decimal import Decimal
+from flask import Blueprint, jsonify, request
+from ..availability import available_hotels
+from ..images import attach_primary_images
+from ..pagination import page_args, set_next_cursor
+from ..pricing import price
+from ..search import match_filter
+
+bp = Blueprint("search", __name__)
+
+@bp.get("/search")
+def search():
+    """Hotels with an available room type for the stay, cheapest first, in one query."""
+    try:
+        ci = datetime.fromisoformat(request.args.get("check_in") or "")
+        co = datetime.fromisoformat(request.args.get("check_out") or "")
+        guests = int(request.args.get("guests") or 1)
+    except ValueError:
+        return jsonify({"error": "check_in and check_out (ISO8601) are required; guests must be an integer"}), 400
+    if co <= ci:
+        return jsonify({"error": "check_out must be after check_in"}), 400
+
+    params = {}
+    match = match_filter(request.args.get("q") or "", params)
+    if (request.args.get("q") or "").strip() and match is None:
+        return jsonify([])
+    amenities = [a.strip() for a in (request.args.get("amenities") or "").split(",") if a.strip()]
+    limit, cursor = page_args((Decimal, int), default=20, maximum=100)
+
+    rows = available_hotels(
+        ci, co, guests,
+        city=(request.args.get("city") or "").strip(),
+        match=match, amenities=amenities,
+        limit=limit, cursor=cursor, params=params,
+    )
+    # Every sellable room type of the page priced for the stay in one pass;
+    # min_total is the cheapest (the page itself is ordered by base price)
+    offered = [list(zip(r.pop("room_type_ids"), r.pop("base_prices"))) for r in rows]
+    stays = [{"hotel_id": r["id"], "room_type_id": rtid, "base_price": base, "check_in": ci, "check_out": co}
+             for r, pairs in zip(rows, offered) for rtid, base in pairs]
+    totals = iter(p["total"] for p in price(stays))
+    for r, pairs in zip(rows, offered):
+        r["min_total"] = min(next(totals) for _ in pairs)
+    out = attach_primary_images(rows)
+    return set_next_cursor(jsonify(out), out, limit, lambda r: (str(r["min_price"]), r["id"]))
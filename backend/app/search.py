@@ -0,0 +1,120 @@
+import re
+from sqlalchemy import text
+from . import db
+
+# Ranked hotel search. PostgreSQL: prefix full-text match on hotels.search_vector
+# (GIN) OR'd with pg_trgm word similarity for typos when the extension is
+# installed. SQLite (dev): the hotels_fts FTS5 table with bm25 ranking.
+# Results page by keyset on (rank DESC, id).
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+_trgm_available = {}
+
+HOTEL_COLUMNS = "h.id, h.name, h.city, h.country, h.address, h.description, h.amenities"
+
+
+def _terms(q: str) -> list:
+    return _TOKEN.findall(q.lower())[:MAX_TERMS]
+
+
+def has_trigram() -> bool:
+    """Whether pg_trgm is installed in the current database (checked once per engine)."""
+    key = str(db.engine.url)
+    if key not in _trgm_available:
+        _trgm_available[key] = bool(db.session.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first())
+    return _trgm_available[key]
+
+
+def _pg_match(terms, params) -> tuple:
+    """(match predicate, rank expression) over hotels alias `h`; fills params."""
+    params["tsq"] = " & ".join(f"{t}:*" for t in terms)
+    match = "h.search_vector @@ to_tsquery('simple', :tsq)"
+    rank = "ts_rank_cd(h.search_vector, to_tsquery('simple', :tsq))"
+    if has_trigram():
+        # %> is indexable (ix_hotels_name_city_trgm) and tolerates misspellings
+        params["ql"] = " ".join(terms)
+        match = f"({match} OR lower(h.name || ' ' || h.city) %> :ql)"
+        rank = f"{rank} + word_similarity(:ql, lower(h.name || ' ' || h.city))"
+    return match, rank
+
+
+def _postgresql(terms, city, limit, cursor):
+    params = {"limit": limit}
+    match, rank = _pg_match(terms, params)
+    where = [match]
+    if city:
+        where.append("lower(h.city) = :city")
+        params["city"] = city.lower()
+    after = ""
+    if cursor:
+        after = "WHERE rank < :after_rank OR (rank = :after_rank AND id > :after_id)"
+        params.update(after_rank=cursor[0], after_id=cursor[1])
+    return text(f"""
+        SELECT * FROM (
+            SELECT {HOTEL_COLUMNS}, CAST({rank} AS double precision) AS rank
+            FROM hotels h
+            WHERE {" AND ".join(where)}
+        ) s
+        {after}
+        ORDER BY rank DESC, id
+        LIMIT :limit
+    """), params
+
+
+def _sqlite(terms, city, limit, cursor):
+    params = {"match": " ".join(f'"{t}"*' for t in terms), "limit": limit}
+    where = ["hotels_fts MATCH :match"]
+    if city:
+        where.append("lower(h.city) = :city")
+        params["city"] = city.lower()
+    after = ""
+    if cursor:
+        after = "WHERE rank < :after_rank OR (rank = :after_rank AND id > :after_id)"
+        params.update(after_rank=cursor[0], after_id=cursor[1])
+    # bm25 is "lower is better"; negate so both backends sort rank DESC
+    return text(f"""
+        SELECT * FROM (
+            SELECT {HOTEL_COLUMNS}, -bm25(hotels_fts, 10.0, 5.0, 5.0, 1.0, 1.0) AS rank
+            FROM hotels_fts JOIN hotels h ON h.id = hotels_fts.rowid
+            WHERE {" AND ".join(where)}
+        ) s
+        {after}
+        ORDER BY rank DESC, id
+        LIMIT :limit
+    """), params
+
+
+def match_filter(q: str, params: dict):
+    """SQL predicate on hotels alias `h` matching `q` (unranked), or None if `q` has no terms.
+
+    For composing search into other hotel queries; bind values are added to `params`.
+    """
+    terms = _terms(q)
+    if not terms:
+        return None
+    if db.engine.dialect.name == "sqlite":
+        params["match"] = " ".join(f'"{t}"*' for t in terms)
+        return "h.id IN (SELECT rowid FROM hotels_fts WHERE hotels_fts MATCH :match)"
+    return _pg_match(terms, params)[0]
+
+
+def search_query(q: str, city: str = "", limit: int = 20, cursor=None):
+    """(statement, params) for search_hotels, or None if `q` has no terms."""
+    terms = _terms(q)
+    if not terms:
+        return None
+    build = _sqlite if db.engine.dialect.name == "sqlite" else _postgresql
+    return build(terms, city, limit, cursor)
+
+
+def search_hotels(q: str, city: str = "", limit: int = 20, cursor=None) -> list:
+    """Hotels matching `q`, best first, as dicts including `rank`.
+
+    `cursor` is the (rank, id) of the last row of the previous page.
+    """
+    query = search_query(q, city, limit, cursor)
+    if query is None:
+        return []
+    return [dict(r) for r in db.session.execute(*query).mappings()]
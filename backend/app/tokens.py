@@ -0,0 +1,129 @@
+import threading
+import time
+from flask import current_app, g, jsonify
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import text
+from . import db, jwt
+from .cache import LRUCache
+from .metrics import metrics
+
+# Token verification fast path. Access tokens are short-lived and carry the
+# role only for the UI; authorization reads the user's current role and
+# active flag from a small TTL cache in front of the users table, and every
+# verify checks the token's jti against a denylist (logout, refresh rotation).
+# Both are in-memory dict lookups on the hot path.
+
+
+class MemoryDenylist:
+    """Revoked jti -> expiry (epoch seconds); entries drop once the token would have expired anyway."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def add(self, jti: str, expires_at: float):
+        now = time.time()
+        with self._lock:
+            self._entries[jti] = expires_at
+            if now >= self._next_sweep:
+                self._entries = {k: exp for k, exp in self._entries.items() if exp > now}
+                self._next_sweep = now + 60
+
+    def __contains__(self, jti: str) -> bool:
+        exp = self._entries.get(jti)
+        return exp is not None and exp > time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisDenylist:
+    """Denylist shared by all workers, over a redis-py compatible client."""
+
+    def __init__(self, client, prefix: str = "hotel-app:jti:"):
+        self.client = client
+        self.prefix = prefix
+
+    def add(self, jti: str, expires_at: float):
+        ttl = int(expires_at - time.time()) + 1
+        if ttl > 0:
+            self.client.set(self.prefix + jti, "1", ex=ttl)
+
+    def __contains__(self, jti: str) -> bool:
+        return bool(self.client.get(self.prefix + jti))
+
+
+class TokenState:
+    def __init__(self):
+        self.denylist = MemoryDenylist()
+        self.users = LRUCache(maxsize=10000, ttl=30)
+
+    def init_app(self, app):
+        kind = app.config.get("TOKEN_DENYLIST_BACKEND", "memory")
+        if kind == "redis":
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("TOKEN_DENYLIST_BACKEND=redis needs the 'redis' package (pip install redis)")
+            self.denylist = RedisDenylist(redis.Redis.from_url(app.config["TOKEN_DENYLIST_REDIS_URL"]))
+        elif kind == "memory":
+            self.denylist = MemoryDenylist()
+        else:
+            raise RuntimeError(f"Unknown TOKEN_DENYLIST_BACKEND {kind!r}")
+        self.users = LRUCache(maxsize=app.config.get("AUTH_USER_CACHE_SIZE", 10000),
+                              ttl=app.config.get("AUTH_USER_CACHE_TTL", 30))
+        app.extensions["token_state"] = self
+
+
+tokens = TokenState()
+
+USER_SQL = text("SELECT role, active FROM users WHERE id=:id")
+
+
+def lookup_user(user_id: int) -> dict | None:
+    """{"role", "active"} for a user id, from the TTL cache or one primary-key read."""
+    key = str(user_id)
+    # jwt_required + role_required verify twice per request; look up once
+    seen = g.setdefault("_auth_users", {})
+    if key in seen:
+        return seen[key]
+    cached = current_app.config.get("AUTH_USER_CACHE_TTL", 30) > 0
+    rec = tokens.users.get(key) if cached else None
+    if cached:
+        metrics.inc("cache_requests_total", cache="auth_users", result="miss" if rec is None else "hit")
+    if rec is None:
+        row = db.session.execute(USER_SQL, {"id": user_id}).mappings().first()
+        rec = dict(row) if row else {}
+        if cached:
+            tokens.users.set(key, rec)
+    seen[key] = rec or None
+    return seen[key]
+
+
+def forget_user(user_id: int):
+    """Drop a cached lookup after changing the user's role or active flag."""
+    tokens.users.delete(str(user_id))
+
+
+def revoke(decoded: dict):
+    """Deny a decoded token (its jti) until it expires."""
+    tokens.denylist.add(decoded["jti"], decoded.get("exp") or time.time() + 86400)
+
+
+def current_role() -> str | None:
+    user = lookup_user(int(get_jwt_identity()))
+    return user["role"] if user else None
+
+
+@jwt.token_in_blocklist_loader
+def _token_revoked(_header, payload) -> bool:
+    if payload.get("jti") in tokens.denylist:
+        return True
+    user = lookup_user(int(payload["sub"]))
+    return not user or not user["active"]
+
+
+@jwt.revoked_token_loader
+def _revoked_response(_header, _payload):
+    return jsonify({"error": "Token has been revoked"}), 401
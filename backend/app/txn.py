@@ -0,0 +1,36 @@
+import random
+import time
+from flask import current_app
+from sqlalchemy.exc import DBAPIError
+from . import db
+
+# SQLSTATEs that mean "the transaction lost a race; running it again is safe"
+RETRYABLE_SQLSTATES = {"40001", "40P01"}  # serialization_failure, deadlock_detected
+
+
+class RetriesExhausted(Exception):
+    """A transaction kept failing with serialization/deadlock errors."""
+
+
+def is_retryable(exc: DBAPIError) -> bool:
+    return getattr(exc.orig, "pgcode", None) in RETRYABLE_SQLSTATES
+
+
+def run_with_retry(fn, attempts: int | None = None):
+    """Run `fn` (which does its own commit) and retry it on serialization failures.
+
+    The session is rolled back before each retry, with a short jittered backoff.
+    Raises RetriesExhausted once attempts are used up; other errors propagate.
+    """
+    if attempts is None:
+        attempts = current_app.config.get("DB_TX_RETRIES", 3)
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except DBAPIError as e:
+            db.session.rollback()
+            if not is_retryable(e):
+                raise
+            current_app.logger.info("Retrying transaction after %s (attempt %d)", e.orig.pgcode, attempt + 1)
+            time.sleep(random.uniform(0, 0.01 * (2 ** attempt)))
+    raise RetriesExhausted()
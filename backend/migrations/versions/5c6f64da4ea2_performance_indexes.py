@@ -0,0 +1,60 @@
+"""performance indexes
+
+Revision ID: 5c6f64da4ea2
+Revises: 03b6dd928c55
+Create Date: 2026-10-18 20:05:12.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c6f64da4ea2'
+down_revision = '03b6dd928c55'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns/expressions, partial predicate)
+INDEXES = [
+    # list_hotels ?city= filter
+    ('ix_hotels_city_lower', 'hotels', [sa.text('lower(city)')], None),
+    # batched primary-image lookup (app/images.py)
+    ('ix_hotel_images_hotel_primary', 'hotel_images', ['hotel_id', sa.text('is_primary DESC'), 'id'], None),
+    # hotel_detail / availability room type lists
+    ('ix_room_types_hotel_active_price', 'room_types', ['hotel_id', 'base_price'], 'active = true'),
+    # per-hotel room counts for inventory
+    ('ix_rooms_hotel_type_active', 'rooms', ['hotel_id', 'room_type_id'], 'active = true'),
+    # overlap scans (ledger rebuild / checks) over live bookings only
+    ('ix_bookings_active_overlap', 'bookings', ['hotel_id', 'room_type_id', 'check_in', 'check_out'],
+     "status <> 'cancelled'"),
+    # my_bookings: guest OR booker, newest first
+    ('ix_bookings_guest_created', 'bookings', ['guest_user_id', sa.text('created_at DESC'), sa.text('id DESC')], None),
+    ('ix_bookings_booked_by_created', 'bookings',
+     ['booked_by_user_id', sa.text('created_at DESC'), sa.text('id DESC')], None),
+    # admin bookings, newest first
+    ('ix_bookings_created', 'bookings', [sa.text('created_at DESC'), sa.text('id DESC')], None),
+    ('ix_booking_status_log_booking', 'booking_status_log', ['booking_id', 'changed_at'], None),
+]
+
+
+def upgrade():
+    # Build without blocking writes on live Postgres tables
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, table, cols, where in INDEXES:
+            kw = {}
+            if where:
+                kw['postgresql_where'] = sa.text(where)
+            if concurrently:
+                kw['postgresql_concurrently'] = True
+            op.create_index(name, table, cols, unique=False, if_not_exists=True, **kw)
+
+
+def downgrade():
+    concurrently = op.get_bind().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, table, _cols, _where in reversed(INDEXES):
+            kw = {'postgresql_concurrently': True} if concurrently else {}
+            op.drop_index(name, table_name=table, if_exists=True, **kw)
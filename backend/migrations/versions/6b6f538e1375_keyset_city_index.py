@@ -0,0 +1,34 @@
+"""keyset city index
+
+Revision ID: 6b6f538e1375
+Revises: 5c6f64da4ea2
+Create Date: 2026-10-18 20:41:37.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b6f538e1375'
+down_revision = '5c6f64da4ea2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ?city= pages are keyset-paginated on id: (lower(city), id) serves both
+    # the filter and the `id > :after_id ORDER BY id` range.
+    kw = {'postgresql_concurrently': True} if op.get_bind().dialect.name == 'postgresql' else {}
+    with op.get_context().autocommit_block():
+        op.create_index('ix_hotels_city_lower_id', 'hotels', [sa.text('lower(city)'), 'id'],
+                        unique=False, if_not_exists=True, **kw)
+        op.drop_index('ix_hotels_city_lower', table_name='hotels', if_exists=True, **kw)
+
+
+def downgrade():
+    kw = {'postgresql_concurrently': True} if op.get_bind().dialect.name == 'postgresql' else {}
+    with op.get_context().autocommit_block():
+        op.create_index('ix_hotels_city_lower', 'hotels', [sa.text('lower(city)')],
+                        unique=False, if_not_exists=True, **kw)
+        op.drop_index('ix_hotels_city_lower_id', table_name='hotels', if_exists=True, **kw)
@@ -0,0 +1,98 @@
+"""hotel search
+
+Revision ID: 935c35fb0686
+Revises: 6b6f538e1375
+Create Date: 2026-10-18 21:02:44.173905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '935c35fb0686'
+down_revision = '6b6f538e1375'
+branch_labels = None
+depends_on = None
+
+
+# Keep in sync with Hotel.search_vector in app/models.py
+SEARCH_VECTOR_SQL = r"""
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(country, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(description, '')), 'C') ||
+    setweight(to_tsvector('simple', regexp_replace(coalesce(amenities::text, ''),
+        '"[^"]*"\s*:\s*(false|null)|\m(true|false|null)\M', ' ', 'g')), 'D')
+"""
+
+
+def _upgrade_postgresql():
+    op.add_column('hotels', sa.Column(
+        'search_vector', postgresql.TSVECTOR(),
+        sa.Computed(SEARCH_VECTOR_SQL, persisted=True), nullable=True))
+    op.create_index('ix_hotels_search_vector', 'hotels', ['search_vector'], postgresql_using='gin')
+
+    # Typo tolerance needs pg_trgm (trusted since PG 13); skip quietly where the
+    # contrib package is not installed -- search then runs full-text only.
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                CREATE INDEX IF NOT EXISTS ix_hotels_name_city_trgm ON hotels
+                    USING gin (lower(name || ' ' || city) gin_trgm_ops);
+            END IF;
+        END
+        $$;
+    """)
+
+
+def _upgrade_sqlite():
+    # Dev fallback: external-content FTS5 table kept in sync by triggers
+    op.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS hotels_fts USING fts5(
+            name, city, country, description, amenities,
+            content='hotels', content_rowid='id')
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS hotels_fts_ai AFTER INSERT ON hotels BEGIN
+            INSERT INTO hotels_fts(rowid, name, city, country, description, amenities)
+            VALUES (new.id, new.name, new.city, new.country, new.description, new.amenities);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS hotels_fts_ad AFTER DELETE ON hotels BEGIN
+            INSERT INTO hotels_fts(hotels_fts, rowid, name, city, country, description, amenities)
+            VALUES ('delete', old.id, old.name, old.city, old.country, old.description, old.amenities);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER IF NOT EXISTS hotels_fts_au AFTER UPDATE ON hotels BEGIN
+            INSERT INTO hotels_fts(hotels_fts, rowid, name, city, country, description, amenities)
+            VALUES ('delete', old.id, old.name, old.city, old.country, old.description, old.amenities);
+            INSERT INTO hotels_fts(rowid, name, city, country, description, amenities)
+            VALUES (new.id, new.name, new.city, new.country, new.description, new.amenities);
+        END
+    """)
+    op.execute("INSERT INTO hotels_fts(hotels_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        _upgrade_postgresql()
+    elif dialect == 'sqlite':
+        _upgrade_sqlite()
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_hotels_name_city_trgm")
+        op.drop_index('ix_hotels_search_vector', table_name='hotels')
+        op.drop_column('hotels', 'search_vector')
+    elif dialect == 'sqlite':
+        for trigger in ('hotels_fts_ai', 'hotels_fts_ad', 'hotels_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS hotels_fts")
@@ -0,0 +1,35 @@
+"""room type nights sold out index
+
+Revision ID: accc4c64909a
+Revises: 935c35fb0686
+Create Date: 2026-10-18 20:04:31.072491
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'accc4c64909a'
+down_revision = '935c35fb0686'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Partial index over sold-out ledger nights, read by /api/search
+    kw = {}
+    if op.get_bind().dialect.name == 'postgresql':
+        kw['postgresql_concurrently'] = True
+    with op.get_context().autocommit_block():
+        op.create_index('ix_room_type_nights_sold_out', 'room_type_nights', ['night', 'room_type_id'],
+                        unique=False, if_not_exists=True,
+                        postgresql_where=sa.text('booked_count >= capacity'), **kw)
+
+
+def downgrade():
+    kw = {}
+    if op.get_bind().dialect.name == 'postgresql':
+        kw['postgresql_concurrently'] = True
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_room_type_nights_sold_out', table_name='room_type_nights', if_exists=True, **kw)
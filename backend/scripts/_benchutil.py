@@ -0,0 +1,19 @@
+"""Helpers shared by the benchmark scripts."""
+import time
+
+
+def pct(sorted_values, p):
+    """Nearest-rank p-th percentile of already sorted values, or None if there are none."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))]
+
+
+def sample_ms(fn, repeat: int) -> list:
+    """Sorted wall times of `repeat` calls of fn(), in ms."""
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return sorted(samples)
@@ -0,0 +1,437 @@
+"""HTTP benchmark suite: concurrent request mixes over every API blueprint.
+
+    python -m scripts.bench [--mix mixed] [--concurrency 8] [--duration 20] [--warmup 3]
+                            [--out results.json] [--compare baseline.json] [--threshold 0.2]
+                            [--url http://127.0.0.1:8000]
+
+By default the app is built with create_app() against DATABASE_URL (a seeded
+PostgreSQL for realistic numbers, or a SQLite file for a quick smoke run) and
+driven in-process through one Flask test client per worker thread, so SQL
+statements can be counted per request. With --url the same mix is sent over
+HTTP with keep-alive connections to a running server instead (no query
+counts). The database needs the demo accounts from scripts.seed; use
+`scripts.seed --hotels ... --bookings ...` for a realistically sized one.
+
+Each worker repeatedly picks an operation from the mix (weights below) and
+records latency, status and queries for every request it makes. The report
+gives per-route throughput, p50/p95/p99 latency, error count and mean queries
+per request. --out saves it as JSON together with the commit, database and
+dataset size; --compare reads an earlier file and flags routes whose p95
+grew by more than --threshold or that now issue more queries, exiting 1 if
+any did.
+
+Writes: booking operations create bookings on future dates and cancel them
+again, and PATCH /api/me rewrites the demo user's phone number.
+"""
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlsplit
+from sqlalchemy import event, text
+from scripts._benchutil import pct
+
+USER = {"email": "user@example.com", "password": "user123"}
+ADMIN = {"email": "admin@example.com", "password": "admin123"}
+SEARCH_TERMS = ["hotel", "resort", "lodge", "kathmandu", "pokhara", "spa", "lake", "jungle", "grand", "temple"]
+CITIES = ["Kathmandu", "Pokhara", "Chitwan", "Lalitpur", "Bhaktapur"]
+
+
+class _WSGIClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, headers, body):
+        resp = self.client.open(path, method=method, headers=headers, data=body)
+        return resp.status_code, resp.headers, resp.get_data()
+
+
+class _HTTPClient:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        conn = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.conn = conn(parts.hostname, parts.port, timeout=60)
+
+    def request(self, method, path, headers, body):
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection; reconnect once
+            self.conn.close()
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+        return resp.status, resp.headers, resp.read()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.samples = {}    # route -> [(ms, queries)]
+        self.errors = {}     # route -> count
+        self.statuses = {}   # route -> {status: count}
+
+    def add(self, route, ms, queries, status, ok):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.samples.setdefault(route, []).append((ms, queries))
+            by_status = self.statuses.setdefault(route, {})
+            by_status[status] = by_status.get(status, 0) + 1
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+class Session:
+    """One worker: a client, tokens, and a per-thread SQL statement counter."""
+
+    def __init__(self, client, recorder, queries, ctx, rng):
+        self.client = client
+        self.recorder = recorder
+        self.queries = queries
+        self.ctx = ctx
+        self.rng = rng
+        self.user = None
+        self.refresh = None
+        self.admin = None
+
+    def call(self, route, method, path, token=None, json_body=None, headers=None, ok=(200,)):
+        headers = dict(headers or {})
+        body = None
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        if json_body is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(json_body)
+        self.queries.n = 0
+        t = time.perf_counter()
+        status, resp_headers, raw = self.client.request(method, path, headers, body)
+        ms = (time.perf_counter() - t) * 1000
+        self.recorder.add(route, ms, self.queries.n if self.queries.counting else None, status, status in ok)
+        data = None
+        if raw and resp_headers.get("Content-Type", "").startswith("application/json"):
+            data = json.loads(raw)
+        return status, resp_headers, data
+
+    def login(self):
+        _, _, data = self.call("POST /api/auth/login", "POST", "/api/auth/login", json_body=USER)
+        self.user, self.refresh = data["access_token"], data["refresh_token"]
+        _, _, data = self.call("POST /api/auth/login", "POST", "/api/auth/login", json_body=ADMIN)
+        self.admin = data["access_token"]
+
+    # helpers
+    def hotel(self):
+        return self.rng.choice(self.ctx["hotels"])
+
+    def stay(self, nights=None):
+        ci = date.today() + timedelta(days=self.rng.randint(30, 300))
+        return ci, ci + timedelta(days=nights or self.rng.randint(1, 4))
+
+
+# ---- operations ---------------------------------------------------------------
+
+def op_hotels_list(s):
+    s.call("GET /api/hotels", "GET", "/api/hotels?limit=20")
+
+
+def op_hotels_next_page(s):
+    _, headers, _ = s.call("GET /api/hotels", "GET", "/api/hotels?limit=20")
+    cursor = headers.get("X-Next-Cursor")
+    if cursor:
+        s.call("GET /api/hotels?cursor", "GET", f"/api/hotels?limit=20&cursor={cursor}")
+
+
+def op_hotels_city(s):
+    s.call("GET /api/hotels?city", "GET", f"/api/hotels?limit=20&city={s.rng.choice(CITIES)}")
+
+
+def op_hotels_search(s):
+    s.call("GET /api/hotels?q", "GET", f"/api/hotels?limit=20&q={s.rng.choice(SEARCH_TERMS)}")
+
+
+def op_hotel_detail(s):
+    s.call("GET /api/hotels/:id", "GET", f"/api/hotels/{s.hotel()['id']}")
+
+
+def op_hotel_revalidate(s):
+    path = f"/api/hotels/{s.hotel()['id']}"
+    _, headers, _ = s.call("GET /api/hotels/:id", "GET", path)
+    if headers.get("ETag"):
+        s.call("GET /api/hotels/:id (304)", "GET", path, headers={"If-None-Match": headers["ETag"]}, ok=(304,))
+
+
+def op_availability(s):
+    ci, co = s.stay()
+    s.call("GET /api/hotels/:id/availability", "GET",
+           f"/api/hotels/{s.hotel()['id']}/availability?check_in={ci}&check_out={co}")
+
+
+def op_search(s):
+    ci, co = s.stay()
+    extra = s.rng.choice(["", f"&city={s.rng.choice(CITIES)}", "&guests=3", "&amenities=wifi",
+                          f"&q={s.rng.choice(SEARCH_TERMS)}"])
+    s.call("GET /api/search", "GET", f"/api/search?check_in={ci}&check_out={co}{extra}")
+
+
+def op_login(s):
+    s.call("POST /api/auth/login", "POST", "/api/auth/login", json_body=USER)
+
+
+def op_refresh(s):
+    status, _, data = s.call("POST /api/auth/refresh", "POST", "/api/auth/refresh", token=s.refresh)
+    if status == 200:
+        s.user, s.refresh = data["access_token"], data["refresh_token"]
+
+
+def op_me(s):
+    s.call("GET /api/me", "GET", "/api/me", token=s.user)
+
+
+def op_me_update(s):
+    s.call("PATCH /api/me", "PATCH", "/api/me", token=s.user, json_body={"phone": f"98{s.rng.randrange(10**8):08d}"})
+
+
+def op_my_bookings(s):
+    s.call("GET /api/bookings", "GET", "/api/bookings?limit=20", token=s.user)
+
+
+def _booking(s):
+    h = s.hotel()
+    rt = s.rng.choice(h["room_types"])
+    ci, co = s.stay()
+    return {"hotel_id": h["id"], "room_type_id": rt["id"], "check_in": ci.isoformat(), "check_out": co.isoformat(),
+            "num_guests": 1, "currency": "USD"}  # the server prices the stay
+
+
+def op_book_and_cancel(s):
+    status, _, data = s.call("POST /api/bookings", "POST", "/api/bookings", token=s.user,
+                             json_body=_booking(s), ok=(200, 409))
+    if status == 200:
+        s.call("PATCH /api/bookings/:id/cancel", "PATCH", f"/api/bookings/{data['booking_id']}/cancel", token=s.user)
+
+
+def op_batch_and_cancel(s):
+    items = [_booking(s) for _ in range(5)]
+    status, _, data = s.call("POST /api/bookings/batch", "POST", "/api/bookings/batch", token=s.user,
+                             json_body={"items": items}, ok=(200, 409))
+    if status == 200:
+        for bid in data["booking_ids"]:
+            s.call("PATCH /api/bookings/:id/cancel", "PATCH", f"/api/bookings/{bid}/cancel", token=s.user)
+
+
+def op_admin_users(s):
+    s.call("GET /api/admin/users", "GET", "/api/admin/users?limit=100", token=s.admin)
+
+
+def op_admin_bookings(s):
+    s.call("GET /api/admin/bookings", "GET", "/api/admin/bookings?limit=100", token=s.admin)
+
+
+def op_admin_cache(s):
+    s.call("GET /api/admin/cache", "GET", "/api/admin/cache", token=s.admin)
+
+
+def op_admin_export(s):
+    since = (datetime.now(timezone.utc) - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S")
+    s.call("GET /api/admin/bookings/export", "GET", f"/api/admin/bookings/export?format=ndjson&from={since}",
+           token=s.admin)
+
+
+def op_health(s):
+    s.call("GET /api/health", "GET", "/api/health")
+
+
+# mix -> [(operation, weight)]
+MIXES = {
+    "browse": [(op_hotels_list, 20), (op_hotels_next_page, 5), (op_hotels_city, 10), (op_hotels_search, 10),
+               (op_hotel_detail, 20), (op_hotel_revalidate, 5), (op_availability, 15), (op_search, 15)],
+    "guest": [(op_me, 15), (op_me_update, 3), (op_my_bookings, 20), (op_book_and_cancel, 10),
+              (op_batch_and_cancel, 2), (op_availability, 20), (op_search, 20), (op_refresh, 5), (op_login, 2)],
+    "admin": [(op_admin_users, 30), (op_admin_bookings, 30), (op_admin_cache, 20), (op_admin_export, 10),
+              (op_hotel_detail, 10)],
+}
+MIXES["mixed"] = ([(op, w * 7) for op, w in MIXES["browse"]] + [(op, w * 2) for op, w in MIXES["guest"]]
+                  + [(op, w // 2) for op, w in MIXES["admin"]] + [(op_health, 5)])
+
+
+# ---- running ------------------------------------------------------------------
+
+def _summary(recorder, elapsed):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        ms = sorted(m for m, _ in samples)
+        q = [n for _, n in samples if n is not None]
+        routes[route] = {
+            "requests": len(samples),
+            "errors": recorder.errors.get(route, 0),
+            "rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(pct(ms, 50), 2), "p95_ms": round(pct(ms, 95), 2), "p99_ms": round(pct(ms, 99), 2),
+            "queries_per_request": round(sum(q) / len(q), 2) if q else None,
+            "statuses": {str(k): v for k, v in sorted(recorder.statuses[route].items())},
+        }
+    every = sorted(m for samples in recorder.samples.values() for m, _ in samples)
+    total = {
+        "requests": len(every),
+        "errors": sum(recorder.errors.values()),
+        "rps": round(len(every) / elapsed, 2),
+        "p50_ms": round(pct(every, 50) or 0, 2), "p95_ms": round(pct(every, 95) or 0, 2),
+        "p99_ms": round(pct(every, 99) or 0, 2),
+    }
+    return routes, total
+
+
+def _print_report(routes, total):
+    print(f"{'route':<36}{'req':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for route, r in routes.items():
+        q = "-" if r["queries_per_request"] is None else f"{r['queries_per_request']:.1f}"
+        print(f"{route:<36}{r['requests']:>7}{r['errors']:>5}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{q:>9}")
+    print(f"{'total':<36}{total['requests']:>7}{total['errors']:>5}{total['rps']:>9.1f}"
+          f"{total['p50_ms']:>9.1f}{total['p95_ms']:>9.1f}{total['p99_ms']:>9.1f}")
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """Routes that got slower (p95 beyond threshold) or chattier than in baseline."""
+    regressions = []
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'}:")
+    print(f"{'route':<36}{'p95 before':>11}{'p95 now':>9}{'change':>9}{'queries':>14}")
+    for route, now in current["routes"].items():
+        before = baseline["routes"].get(route)
+        if not before:
+            continue
+        change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        qb, qn = before.get("queries_per_request"), now.get("queries_per_request")
+        queries = "-" if qb is None or qn is None else f"{qb:.1f} -> {qn:.1f}"
+        flag = ""
+        if change > threshold or (qb is not None and qn is not None and qn > qb + 0.5):
+            regressions.append(route)
+            flag = "  REGRESSION"
+        print(f"{route:<36}{before['p95_ms']:>11.1f}{now['p95_ms']:>9.1f}{change:>+9.0%}{queries:>14}{flag}")
+    return regressions
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API benchmark suite")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds first")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="benchmark a running server instead of an in-process app")
+    parser.add_argument("--sample-hotels", type=int, default=100, help="hotels the operations pick from")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 growth counted as a regression")
+    args = parser.parse_args(argv)
+
+    recorder = Recorder()
+    queries = threading.local()
+    meta = {"commit": _commit(), "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "mix": args.mix, "concurrency": args.concurrency, "duration": args.duration,
+            "python": sys.version.split()[0]}
+    if args.url:
+        make_client = lambda: _HTTPClient(args.url)  # noqa: E731
+        meta.update(target=args.url)
+    else:
+        from app import create_app, db
+        app = create_app()
+        # Tokens must outlive the run
+        app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=12)
+        with app.app_context():
+            def count(*_args, **_kw):
+                if getattr(queries, "counting", False):
+                    queries.n += 1
+            event.listen(db.engine, "before_cursor_execute", count)
+            meta.update(target="in-process", database=db.engine.dialect.name, dataset={
+                table: db.session.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                for table in ("hotels", "room_types", "users", "bookings")})
+        make_client = lambda: _WSGIClient(app)  # noqa: E731
+
+    def session(rng):
+        queries.counting = not args.url
+        queries.n = 0
+        return Session(make_client(), recorder, queries, ctx, rng)
+
+    # Hotels (with room types) for the operations to pick from
+    ctx = {"hotels": []}
+    setup = session(random.Random(args.seed))
+    status, _, listing = setup.call("setup", "GET", f"/api/hotels?limit={min(args.sample_hotels, 100)}")
+    for h in listing or []:
+        _, _, detail = setup.call("setup", "GET", f"/api/hotels/{h['id']}")
+        if detail and detail.get("room_types"):
+            ctx["hotels"].append(detail)
+    if not ctx["hotels"]:
+        raise SystemExit(f"no hotels with room types (GET /api/hotels -> {status}); run scripts.seed first")
+    try:
+        setup.login()
+    except (TypeError, KeyError):
+        raise SystemExit("login failed; run scripts.seed first")
+
+    ops, weights = zip(*MIXES[args.mix])
+    stop = threading.Event()
+    failures = []
+
+    def worker(i):
+        s = session(random.Random(args.seed * 1000 + i))
+        s.user, s.refresh, s.admin = setup.user, None, setup.admin
+        # Own refresh token: refreshing rotates (revokes) it
+        _, _, data = s.call("setup", "POST", "/api/auth/login", json_body=USER)
+        s.user, s.refresh = data["access_token"], data["refresh_token"]
+        while not stop.is_set():
+            op = s.rng.choices(ops, weights)[0]
+            try:
+                op(s)
+            except Exception as e:  # keep the other workers going; report at the end
+                failures.append(f"{op.__name__}: {e!r}")
+                if len(failures) > 100:
+                    stop.set()
+
+    print(f"{args.mix} mix, {args.concurrency} workers, {args.warmup:.0f}s warm-up + {args.duration:.0f}s "
+          f"against {meta['target']}" + (f" ({meta['database']}, {meta['dataset']})" if "dataset" in meta else ""))
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    time.sleep(args.warmup)
+    recorder.enabled = True
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.enabled = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+
+    routes, total = _summary(recorder, elapsed)
+    _print_report(routes, total)
+    for f in failures[:5]:
+        print(f"worker error: {f}")
+    result = {"meta": meta, "routes": routes, "total": total}
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(result, fh, indent=2)
+        print(f"Saved {args.out}")
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(json.load(fh), result, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} route(s) regressed.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Speed and packing quality of the room assignment engine (app.allocation).
+
+    python -m scripts.bench_allocation [--sizes 10000,20000,40000,80000] [--rooms 200] [--repeat 5]
+
+For each size, generates that many stays (1-14 nights) for one room type
+with --rooms rooms, accepted in arrival order only while every night stays
+within the room count, as the ledger enforces. It then:
+- re-packs them all with allocation.pack and reports time per stay and per
+  n log2 n (flat when the cost grows as n log n);
+- books them one by one in a random (booking-time) order with best fit
+  (allocation.best_fit) and with first fit, and counts stays that found no
+  single room free on all of their nights and would need a re-pack;
+- checks every assignment with allocation.overlaps: no room may hold two
+  stays on one night. Exits 1 if it does or a re-pack leaves a stay out.
+No database needed.
+"""
+import argparse
+import heapq
+import math
+import random
+import statistics
+import time
+from app import allocation
+
+
+def _stays(n, rooms, rng):
+    out = []
+    busy = []   # ends of accepted stays that are still running
+    day = 0
+    while len(out) < n:
+        day += 1
+        for _ in range(rng.randint(rooms // 6, rooms // 2)):
+            nights = min(14, 1 + int(rng.expovariate(1 / 3)))
+            while busy and busy[0] <= day:
+                heapq.heappop(busy)
+            # The ledger's rule: accepted only while the room type has a room left
+            if len(busy) < rooms and len(out) < n:
+                heapq.heappush(busy, day + nights)
+                out.append((len(out) + 1, None, day, day + nights, False))
+    return out
+
+
+def _incremental(room_ids, stays, order, fit):
+    schedules = [allocation.RoomSchedule(rid) for rid in room_ids]
+    placed, failed = [], 0
+    for i in order:
+        bid, _, start, end, _ = stays[i]
+        if fit == "best":
+            s = allocation.best_fit(schedules, start, end)
+        else:
+            s = next((s for s in schedules if s.gap(start, end) is not None), None)
+        if s is None:
+            failed += 1
+            continue
+        s.add(start, end)
+        placed.append((bid, s.room_id, start, end))
+    return placed, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="room assignment benchmark")
+    parser.add_argument("--sizes", default="10000,20000,40000,80000")
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    room_ids = list(range(1, args.rooms + 1))
+    bad = 0
+    print(f"{args.rooms} rooms, one room type")
+    print(f"{'stays':>8}{'pack ms':>10}{'us/stay':>9}{'ns/nlogn':>10}{'best-fit misses':>17}{'first-fit misses':>18}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        stays = _stays(n, args.rooms, rng)
+        samples = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            out = allocation.pack(room_ids, stays, stable=False)
+            samples.append((time.perf_counter() - t) * 1000)
+        ms = statistics.median(samples)
+        packed = [(bid, out[bid], start, end) for bid, _, start, end, _ in stays]
+        unplaced = sum(1 for v in out.values() if v is None)
+
+        order = list(range(len(stays)))
+        rng.shuffle(order)
+        best, best_failed = _incremental(room_ids, stays, order, "best")
+        first, first_failed = _incremental(room_ids, stays, order, "first")
+        problems = len(allocation.overlaps(packed)) + len(allocation.overlaps(best)) + len(allocation.overlaps(first))
+        bad += problems + unplaced
+        print(f"{n:>8}{ms:>10.1f}{ms * 1000 / n:>9.2f}{ms * 1e6 / (n * math.log2(n)):>10.1f}"
+              f"{best_failed:>17}{first_failed:>18}"
+              + (f"  OVERLAPS {problems}" if problems else "") + (f"  UNPLACED {unplaced}" if unplaced else ""))
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,274 @@
+"""Sync (gunicorn sync workers, wsgi.py) against async (uvicorn, asgi.py) serving under I/O-bound load.
+
+    python -m scripts.bench_asgi [--workers 2] [--concurrency 8,32,128] [--duration 10] [--warmup 2]
+                                 [--db-rtt-ms 2] [--pool 20]
+
+Starts each server with --workers processes on a free local port and the same
+app config, then drives the read routes the async mode serves (hotel list,
+city page, hotel detail, availability, my bookings) round-robin from each
+--concurrency level of keep-alive connections. Sync workers close the
+connection after every response, so their clients reconnect; that time counts
+in the latency. --db-rtt-ms puts a TCP proxy between the servers and
+PostgreSQL that delays each direction by half of it, as with a database on
+another host, so requests spend most of their time waiting on the database.
+The async pool holds up to --pool connections per worker.
+
+For each level it reports requests/s, p50/p99 latency and errors, and the
+resident memory of the server's processes sampled while under load: the
+peak, the peak divided by the connections (KB per connection), and the growth
+over the idle server divided by the connections. Linux only (memory is read
+from /proc). Needs gunicorn, uvicorn, a2wsgi, asyncpg and the demo data from
+scripts.seed.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import date, timedelta
+from pathlib import Path
+from scripts._benchutil import pct
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# database latency
+
+async def _pipe(reader, writer, delay):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    async def deliver():
+        while True:
+            due, data = await queue.get()
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+            if not data:
+                writer.close()
+                return
+            writer.write(data)
+            await writer.drain()
+
+    sender = asyncio.create_task(deliver())
+    try:
+        while True:
+            data = await reader.read(65536)
+            queue.put_nowait((loop.time() + delay, data))
+            if not data:
+                break
+    except ConnectionError:
+        queue.put_nowait((loop.time(), b""))
+    await sender
+
+
+def _proxy(port, target, delay):
+    async def handle(reader, writer):
+        if isinstance(target, str):
+            up_reader, up_writer = await asyncio.open_unix_connection(target)
+        else:
+            up_reader, up_writer = await asyncio.open_connection(*target)
+        await asyncio.gather(_pipe(reader, up_writer, delay), _pipe(up_reader, writer, delay),
+                             return_exceptions=True)
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", port)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _via_proxy(database_url: str, rtt_ms: float):
+    """(DATABASE_URL through a delaying proxy, proxy process), or the URL unchanged when rtt_ms is 0."""
+    from sqlalchemy.engine import make_url
+    url = make_url(database_url)
+    if not rtt_ms:
+        return database_url, None
+    query = dict(url.query)
+    host = query.pop("host", None) or url.host or "/var/run/postgresql"
+    pg_port = url.port or 5432
+    target = f"{host}/.s.PGSQL.{pg_port}" if host.startswith("/") else (host, pg_port)
+    port = _free_port()
+    proc = multiprocessing.Process(target=_proxy, args=(port, target, rtt_ms / 2000), daemon=True)
+    proc.start()
+    proxied = url.set(host="127.0.0.1", port=port, query=query)
+    return proxied.render_as_string(hide_password=False), proc
+
+
+# servers
+
+def _start(mode, workers, port, env):
+    if mode == "sync":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", str(workers), "-b", f"127.0.0.1:{port}",
+               "--log-level", "warning", "wsgi:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    proc = subprocess.Popen(cmd, cwd=BACKEND, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/health/live", timeout=1):
+                return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit(f"{mode} server exited with {proc.returncode}")
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit(f"{mode} server did not start")
+
+
+def _rss_kb(root_pid: int) -> int:
+    """Resident memory of a process and all its descendants."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    total, todo = 0, [root_pid]
+    while todo:
+        pid = todo.pop()
+        todo.extend(children.get(pid, ()))
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+# load
+
+async def _client(port, requests, offset, stop_at, record):
+    reader = writer = None
+    i = offset
+    while time.monotonic() < stop_at:
+        request = requests[i % len(requests)]
+        i += 1
+        t = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(request)
+            status = int((await reader.readline()).split()[1])
+            length, close = 0, False
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin1").partition(":")
+                name = name.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "connection":
+                    close = value.strip().lower() == "close"
+            await reader.readexactly(length)
+        except (OSError, IndexError, ValueError, asyncio.IncompleteReadError):
+            status, close = 0, True
+        record(status, time.perf_counter() - t)
+        if close:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(port, requests, concurrency, seconds, pid=None):
+    latencies, errors, peak = [], [0], [0]
+
+    def record(status, seconds):
+        latencies.append(seconds * 1000)
+        if status != 200:
+            errors[0] += 1
+
+    stop_at = time.monotonic() + seconds
+    clients = [asyncio.create_task(_client(port, requests, n, stop_at, record)) for n in range(concurrency)]
+    while pid is not None and time.monotonic() < stop_at:
+        peak[0] = max(peak[0], _rss_kb(pid))
+        await asyncio.sleep(0.25)
+    await asyncio.gather(*clients)
+    return sorted(latencies), errors[0], peak[0]
+
+
+def _requests():
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import text
+    from app import create_app, db
+    app = create_app()
+    with app.app_context():
+        user_id = db.session.execute(text("SELECT id FROM users WHERE email = 'user@example.com'")).scalar()
+        if user_id is None:
+            raise SystemExit("user@example.com not found; run scripts.seed first")
+        hotels = db.session.execute(text("SELECT id, city FROM hotels ORDER BY id LIMIT 20")).all()
+        token = create_access_token(identity=str(user_id), expires_delta=timedelta(hours=2))
+        max_connections = int(db.session.execute(text("SHOW max_connections")).scalar())
+    check_in = date.today() + timedelta(days=30)
+    stay = f"check_in={check_in}&check_out={check_in + timedelta(days=2)}&guests=2"
+    paths = []
+    for hid, city in hotels:
+        paths += [("/api/hotels?limit=20", ""), (f"/api/hotels?limit=20&city={city.replace(' ', '%20')}", ""),
+                  (f"/api/hotels/{hid}", ""), (f"/api/hotels/{hid}/availability?{stay}", ""),
+                  ("/api/bookings?limit=20", f"Authorization: Bearer {token}\r\n")]
+    requests = [f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n{auth}\r\n".encode() for path, auth in paths]
+    return requests, max_connections
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sync vs async serving benchmark")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", default="8,32,128")
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds per level")
+    parser.add_argument("--db-rtt-ms", type=float, default=2, help="added database round trip (0: none)")
+    parser.add_argument("--pool", type=int, default=20, help="database connections per worker")
+    args = parser.parse_args(argv)
+
+    requests, max_connections = _requests()
+    if args.workers * (args.pool + 2) > max_connections - 5:
+        raise SystemExit(f"{args.workers} workers x --pool {args.pool} exceeds max_connections ({max_connections})")
+    database_url, proxy = _via_proxy(os.environ.get("DATABASE_URL", ""), args.db_rtt_ms)
+    env = dict(os.environ, DATABASE_URL=database_url, DB_POOL_SIZE=str(args.pool), DB_MAX_OVERFLOW="0",
+               CACHE_BACKEND="none", PASSWORD_HASH_WORKERS="0", HOLD_SWEEPER="0", WARMUP_ON_START="0",
+               METRICS_DIR="", PYTHONPATH=str(BACKEND))
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    print(f"{args.workers} workers, +{args.db_rtt_ms:g} ms database round trip, {len(requests)} request paths")
+    print(f"{'mode':<7}{'conns':>6}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+          f"{'RSS MB':>9}{'KB/conn':>9}{'+KB/conn':>10}")
+    try:
+        for mode in ("sync", "async"):
+            port = _free_port()
+            server = _start(mode, args.workers, port, env)
+            try:
+                asyncio.run(_load(port, requests, 4, args.warmup))
+                idle = _rss_kb(server.pid)
+                for conns in levels:
+                    asyncio.run(_load(port, requests, conns, args.warmup))
+                    latencies, errors, peak = asyncio.run(_load(port, requests, conns, args.duration, server.pid))
+                    print(f"{mode:<7}{conns:>6}{len(latencies) / args.duration:>9.0f}{pct(latencies, 50):>9.1f}"
+                          f"{pct(latencies, 99):>9.1f}{errors:>8}{peak / 1024:>9.0f}{peak / conns:>9.0f}"
+                          f"{max(peak - idle, 0) / conns:>10.0f}")
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+    finally:
+        if proxy is not None:
+            proxy.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark the per-request cost of authentication and authorization.
+
+    python -m scripts.bench_auth [--requests 2000]
+
+Times requests through the Flask test client against the seeded database
+(needs admin@example.com / admin123 from scripts.seed):
+
+  no auth            GET /api/health
+  claim only         the previous role_required: trusts the token's role claim, no denylist
+  db lookup          role_required reading the user row on every request (AUTH_USER_CACHE_TTL=0)
+  cached lookup      role_required with the TTL user cache and jti denylist (the default)
+
+The protected endpoint is GET /api/admin/cache (jwt_required + role_required),
+which itself does no DB work.
+"""
+import argparse
+import statistics
+import time
+from functools import wraps
+from flask import jsonify
+from flask_jwt_extended import get_jwt, jwt_required, verify_jwt_in_request
+from app import create_app
+from app.cache import response_cache
+
+
+def _claim_role_required(*roles):
+    # role_required as it was: the token's role claim is trusted until expiry
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            verify_jwt_in_request()
+            if (get_jwt() or {}).get("role") not in roles:
+                return jsonify({"error": "forbidden"}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _time(client, path, headers, n):
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        resp = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - t) * 1e6)
+    if resp.status_code != 200:
+        raise SystemExit(f"{path} -> {resp.status_code} {resp.get_data(as_text=True)}")
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="auth overhead benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+
+    @app.get("/api/_bench/cache")
+    @jwt_required()
+    @_claim_role_required("admin")
+    def _claims_only():
+        return jsonify(response_cache.stats())
+
+    client = app.test_client()
+    resp = client.post("/api/auth/login", json={"email": "admin@example.com", "password": "admin123"})
+    if resp.status_code != 200:
+        raise SystemExit("login failed; run scripts.seed first")
+    headers = {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+    manager = app.extensions["flask-jwt-extended"]
+    revoked_check = manager._token_in_blocklist_callback
+    cases = [
+        ("no auth", "/api/health", {}, None),
+        ("claim only", "/api/_bench/cache", headers, None),
+        ("db lookup", "/api/admin/cache", headers, 0),
+        ("cached lookup", "/api/admin/cache", headers, 30),
+    ]
+    print(f"{'case':<16}{'p50 us':>10}{'p95 us':>10}{'req/s':>10}{'overhead us':>13}")
+    base = None
+    for label, path, hdrs, ttl in cases:
+        # Old behaviour had no per-token revocation check at all
+        manager._token_in_blocklist_callback = revoked_check if ttl is not None else (lambda _h, _p: False)
+        if ttl is not None:
+            app.config["AUTH_USER_CACHE_TTL"] = ttl
+        _time(client, path, hdrs, 50)  # warm up
+        samples = _time(client, path, hdrs, args.requests)
+        p50 = statistics.median(samples)
+        base = p50 if base is None else base
+        p95 = sorted(samples)[int(0.95 * (len(samples) - 1))]
+        print(f"{label:<16}{p50:>10.0f}{p95:>10.0f}{1e6 / statistics.mean(samples):>10.0f}{p50 - base:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark GET /api/search (hotels with availability and price) on a large booking set.
+
+    python -m scripts.bench_availability [--hotels 2000] [--bookings 1000000] [--repeat 100]
+
+PostgreSQL only. A synthetic dataset from scripts.seed is inserted inside a
+transaction (the ledger is rebuilt for it), the requests below are timed
+through the Flask test client for a stay a month after the anchor, and the
+transaction is rolled back, so the database is left untouched.
+"""
+import argparse
+import time
+from datetime import timedelta
+from sqlalchemy import event
+from app import create_app, db
+from scripts._benchutil import pct
+from scripts.seed import load_synthetic, synthetic_args
+
+REQUESTS = [
+    ("all hotels", ""),
+    ("city", "&city=pokhara"),
+    ("city + guests", "&city=chitwan&guests=3"),
+    ("amenity", "&amenities=pool,spa"),
+    ("text", "&q=lodge"),
+    ("page 2", None),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="/api/search latency benchmark")
+    parser.add_argument("--hotels", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            raise SystemExit("bench_availability needs PostgreSQL")
+        queries = []
+        event.listen(db.engine, "before_cursor_execute", lambda *a: queries.append(1))
+
+        t0 = time.perf_counter()
+        gen = load_synthetic(synthetic_args(hotels=args.hotels, bookings=args.bookings), commit=False)
+        print(f"{args.hotels:,} hotels, {args.bookings - gen.turned_away:,} bookings "
+              f"(loaded in {time.perf_counter() - t0:.1f}s)")
+        check_in = gen.anchor + timedelta(days=30)
+        stay = f"check_in={check_in}&check_out={check_in + timedelta(days=3)}"
+
+        # The test client shares this app context's session, so requests see the
+        # uncommitted data; the routes themselves never commit on GET.
+        client = app.test_client()
+        print(f"{'request':<16}{'hits':>6}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        cursor = None
+        for label, params in REQUESTS:
+            url = f"/api/search?{stay}" + (params if params is not None else f"&cursor={cursor}")
+            samples = []
+            for _ in range(args.repeat):
+                queries.clear()
+                t = time.perf_counter()
+                resp = client.get(url)
+                samples.append((time.perf_counter() - t) * 1000)
+            if resp.status_code != 200:
+                raise SystemExit(f"{url} -> {resp.status_code} {resp.get_data(as_text=True)}")
+            cursor = cursor or resp.headers.get("X-Next-Cursor")
+            samples.sort()
+            print(f"{label:<16}{len(resp.get_json()):>6}{len(queries):>9}{pct(samples, 50):>10.2f}"
+                  f"{pct(samples, 95):>10.2f}{samples[-1]:>10.2f}")
+        db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark POST /api/bookings/batch against the same bookings made one by one.
+
+    python -m scripts.bench_batch [--sizes 10,50,100] [--repeat 5]
+
+PostgreSQL only; needs user@example.com / user123 from scripts.seed. A
+throwaway hotel from the scripts.seed generator, with enough rooms for every
+stay, is created, each batch size is booked N times via POST /api/bookings and
+via one batch call (through the Flask test client, counting SQL statements),
+and the hotel, its bookings and ledger rows are deleted again at the end.
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from sqlalchemy import event
+from app import create_app, db
+from scripts.seed import delete_hotels, load_synthetic, synthetic_args
+
+def _items(hid, rtids, n, start):
+    out = []
+    for i in range(n):
+        ci = start + timedelta(days=i % 28)
+        out.append({"hotel_id": hid, "room_type_id": rtids[i % len(rtids)],
+                    "check_in": ci.isoformat(), "check_out": (ci + timedelta(days=1 + i % 3)).isoformat(),
+                    "num_guests": 1, "currency": "USD"})
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="batch booking benchmark")
+    parser.add_argument("--sizes", default="10,50,100")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    app = create_app()
+    statements = []
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            raise SystemExit("bench_batch needs PostgreSQL")
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+        # Every stay of every run gets its own room, so nothing is refused
+        gen = load_synthetic(synthetic_args(hotels=1, rooms_per_type=max(sizes) * args.repeat * 2))
+        hid, rtids = gen.hotel_ids[0], gen.type_ids
+    client = app.test_client()
+    resp = client.post("/api/auth/login", json={"email": "user@example.com", "password": "user123"})
+    if resp.status_code != 200:
+        raise SystemExit("login failed; run scripts.seed first")
+    headers = {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+    def run(fn):
+        statements.clear()
+        t = time.perf_counter()
+        fn()
+        return time.perf_counter() - t, len(statements)
+
+    def one_by_one(items):
+        for item in items:
+            r = client.post("/api/bookings", json=item, headers=headers)
+            assert r.status_code == 200, r.get_data(as_text=True)
+
+    def batch(items):
+        r = client.post("/api/bookings/batch", json={"items": items}, headers=headers)
+        assert r.status_code == 200, r.get_data(as_text=True)
+
+    try:
+        print(f"{'items':>6}{'mode':>12}{'ms':>10}{'bookings/s':>12}{'statements':>12}")
+        start = gen.anchor + timedelta(days=60)
+        for n in sizes:
+            for label, fn in (("sequential", one_by_one), ("batch", batch)):
+                times, counts = [], []
+                for _ in range(args.repeat):
+                    elapsed, count = run(lambda: fn(_items(hid, rtids, n, start)))
+                    times.append(elapsed)
+                    counts.append(count)
+                t = statistics.median(times)
+                print(f"{n:>6}{label:>12}{t * 1000:>10.1f}{n / t:>12.0f}{statistics.median(counts):>12.0f}")
+    finally:
+        with app.app_context():
+            delete_hotels([hid])
+
+
+if __name__ == "__main__":
+    main()
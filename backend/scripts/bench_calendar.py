@@ -0,0 +1,84 @@
+"""Benchmark GET /api/hotels/<id>/calendar against per-date-range availability probes.
+
+    python -m scripts.bench_calendar [--rooms-per-type 40] [--bookings 20000] [--repeat 50]
+
+PostgreSQL only. One synthetic hotel from scripts.seed (two to five room types
+of --rooms-per-type rooms) with --bookings stays over the next year, plus a
+few rate rules, is inserted inside a transaction and the ledger is rebuilt for
+it. The calendar for a full year and for one month is timed through the Flask
+test client, then the same month the way a date picker without the calendar
+would ask: one /availability request per night. The transaction is rolled
+back, so the database is left untouched.
+"""
+import argparse
+from datetime import timedelta
+from sqlalchemy import event, text
+from app import create_app, db
+from scripts._benchutil import pct, sample_ms
+from scripts.seed import load_synthetic, synthetic_args
+
+
+def _load(rooms_per_type, bookings):
+    gen = load_synthetic(synthetic_args(hotels=1, bookings=bookings, days_back=0, days_ahead=365,
+                                        rooms_per_type=rooms_per_type), commit=False)
+    hotel_id = gen.hotel_ids[0]
+    start = gen.anchor
+    db.session.execute(text("""
+        INSERT INTO rate_rules (hotel_id, name, percent, start_date, end_date, weekdays, min_nights, min_occupancy)
+        VALUES (:hid, 'season', 25, :season_from, :season_to, NULL, NULL, NULL),
+               (:hid, 'weekend', 15, NULL, NULL, 48, NULL, NULL),
+               (:hid, 'busy', 10, NULL, NULL, NULL, NULL, 0.8)
+    """), {"hid": hotel_id, "season_from": start + timedelta(days=150), "season_to": start + timedelta(days=240)})
+    return gen
+
+
+def _time(client, urls, repeat):
+    def run():
+        for url in urls:
+            resp = client.get(url)
+            if resp.status_code != 200:
+                raise SystemExit(f"{url} -> {resp.status_code} {resp.get_data(as_text=True)}")
+    samples = sample_ms(run, repeat)
+    return pct(samples, 50), samples[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="availability calendar benchmark")
+    parser.add_argument("--rooms-per-type", type=int, default=40)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            raise SystemExit("bench_calendar needs PostgreSQL")
+        queries = []
+        event.listen(db.engine, "before_cursor_execute", lambda *a: queries.append(1))
+        gen = _load(args.rooms_per_type, args.bookings)
+        hotel_id, start = gen.hotel_ids[0], gen.anchor
+        print(f"1 hotel, {len(gen.type_ids)} room types of {args.rooms_per_type} rooms, "
+              f"{args.bookings - gen.turned_away:,} bookings")
+
+        # The test client shares this app context's session, so requests see the
+        # uncommitted data; the routes themselves never commit on GET.
+        client = app.test_client()
+        month_end = start + timedelta(days=31)
+        cases = [
+            ("calendar, 365 nights", [f"/api/hotels/{hotel_id}/calendar?from={start}&to={start + timedelta(days=365)}"]),
+            ("calendar, 31 nights", [f"/api/hotels/{hotel_id}/calendar?from={start}&to={month_end}"]),
+            ("31 availability probes", [f"/api/hotels/{hotel_id}/availability?check_in={start + timedelta(days=i)}"
+                                        f"&check_out={start + timedelta(days=i + 1)}" for i in range(31)]),
+        ]
+        print(f"{'request':<26}{'queries':>9}{'p50 ms':>10}{'max ms':>10}")
+        for label, urls in cases:
+            queries.clear()
+            client.get(urls[0])
+            per_call = len(queries) * len(urls)
+            med, worst = _time(client, urls, args.repeat)
+            print(f"{label:<26}{per_call:>9}{med:>10.2f}{worst:>10.2f}")
+        db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
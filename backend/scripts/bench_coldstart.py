@@ -0,0 +1,104 @@
+"""Latency of the first requests a fresh worker serves, with and without startup warmup.
+
+    python -m scripts.bench_coldstart [--trials 10] [--concurrency 16] [--requests 4]
+
+Each trial starts a new Python process (new connection pool, empty caches),
+builds the app with WARMUP_ON_START off or on, and immediately sends
+--concurrency threads x --requests requests over the catalog, search and
+booking-list routes, the way a worker is hit when a deploy puts it in
+rotation. Reports startup time and p50/p99/max of those first requests per
+mode. Needs the demo data from scripts.seed.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from scripts._benchutil import pct
+
+
+def _paths():
+    check_in = date.today() + timedelta(days=30)
+    stay = f"check_in={check_in}&check_out={check_in + timedelta(days=2)}"
+    return ["/api/hotels", "/api/hotels?limit=20", "/api/hotels/1", f"/api/hotels/1/availability?{stay}",
+            f"/api/search?{stay}&guests=2", "/api/bookings"]
+
+
+def child(args):
+    t = time.perf_counter()
+    from flask_jwt_extended import create_access_token
+    from app import create_app
+    app = create_app()
+    startup = time.perf_counter() - t
+    with app.app_context():
+        token = create_access_token(identity=str(args.user_id), additional_claims={"role": "user"})
+    headers = {"Authorization": f"Bearer {token}"}
+    paths = _paths()
+    latencies, errors = [], []
+    start = threading.Barrier(args.concurrency)
+
+    def worker(n):
+        client = app.test_client()
+        start.wait()
+        for i in range(args.requests):
+            path = paths[(n + i) % len(paths)]
+            t = time.perf_counter()
+            status = client.get(path, headers=headers).status_code
+            latencies.append((time.perf_counter() - t) * 1000)
+            if status >= 400:
+                errors.append(f"{path} {status}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.concurrency)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    print(json.dumps({"startup": startup, "latencies": latencies, "errors": errors}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="cold-start latency with and without warmup")
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4, help="requests per thread")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--user-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return child(args)
+
+    # Looked up here so the measured processes touch the database only through the requests
+    from sqlalchemy import text
+    from app import create_app, db
+    with create_app().app_context():
+        user_id = db.session.execute(text("SELECT id FROM users WHERE email = 'user@example.com'")).scalar()
+    if user_id is None:
+        raise SystemExit("user@example.com not found; run scripts.seed first")
+
+    results = {"cold": {"startup": [], "latencies": []}, "warm": {"startup": [], "latencies": []}}
+    for trial in range(args.trials):
+        # Alternate so drift on the database side hits both modes alike
+        for mode in ("cold", "warm") if trial % 2 == 0 else ("warm", "cold"):
+            env = dict(os.environ, WARMUP_ON_START="1" if mode == "warm" else "0")
+            out = subprocess.run([sys.executable, "-m", "scripts.bench_coldstart", "--child", "--user-id", str(user_id),
+                                  "--concurrency", str(args.concurrency), "--requests", str(args.requests)],
+                                 env=env, capture_output=True, text=True, check=True)
+            run = json.loads(out.stdout.strip().splitlines()[-1])
+            if run["errors"]:
+                raise SystemExit(f"requests failed ({mode}): {run['errors'][:5]}")
+            results[mode]["startup"].append(run["startup"])
+            results[mode]["latencies"].extend(run["latencies"])
+
+    print(f"{args.trials} trials x {args.concurrency} threads x {args.requests} requests")
+    print(f"{'mode':<8}{'startup s':>11}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for mode, r in results.items():
+        ms = sorted(r["latencies"])
+        startup = sum(r["startup"]) / len(r["startup"])
+        print(f"{mode:<8}{startup:>11.2f}{pct(ms, 50):>9.1f}{pct(ms, 99):>9.1f}{ms[-1]:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
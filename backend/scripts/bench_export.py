@@ -0,0 +1,99 @@
+"""Memory profile of the streaming admin exports on a large booking table.
+
+    python -m scripts.bench_export [--bookings 1000000] [--hotels 500] [--format csv] [--compare]
+
+PostgreSQL only; needs admin@example.com / admin123 from scripts.seed.
+--bookings synthetic bookings across --hotels throwaway hotels are generated
+with scripts.seed and committed (the export reads them on its own connection). GET
+/api/admin/bookings/export is then read through the Flask test client chunk
+by chunk. The script reports time to first byte, throughput, and the
+process's peak RSS growth. With --compare it also loads the same rows the way
+the paginated listing does (.mappings().all() into dicts, then jsonify) for
+contrast. The bench hotels and their bookings are deleted at the end.
+"""
+import argparse
+import resource
+import sys
+import time
+from flask import jsonify
+from sqlalchemy import text
+from app import create_app, db
+from scripts.seed import delete_hotels, load_synthetic, synthetic_args
+
+
+def _peak_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="streaming export memory profile")
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--hotels", type=int, default=500)
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--compare", action="store_true", help="also materialize the rows like /api/admin/bookings")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            raise SystemExit("bench_export needs PostgreSQL")
+        t = time.perf_counter()
+        gen = load_synthetic(synthetic_args(hotels=args.hotels, bookings=args.bookings))
+        print(f"loaded {args.bookings - gen.turned_away} bookings in {time.perf_counter() - t:.1f}s")
+        total = db.session.execute(text("SELECT COUNT(*) FROM bookings")).scalar()
+        db.session.remove()
+    try:
+        client = app.test_client()
+        resp = client.post("/api/auth/login", json={"email": "admin@example.com", "password": "admin123"})
+        if resp.status_code != 200:
+            raise SystemExit("login failed; run scripts.seed first")
+        headers = {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+        base = _peak_mb()
+        t = time.perf_counter()
+        resp = client.get(f"/api/admin/bookings/export?format={args.format}", headers=headers, buffered=False)
+        first = None
+        size = lines = 0
+        for chunk in resp.response:
+            if first is None:
+                first = time.perf_counter() - t
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+        resp.close()
+        elapsed = time.perf_counter() - t
+        rows = lines - (1 if args.format == "csv" else 0)
+        print(f"streamed  {rows} rows ({total} in table), {size / 1e6:.0f} MB {args.format}")
+        print(f"  first byte {first * 1000:.0f} ms, total {elapsed:.1f}s, {rows / elapsed:.0f} rows/s")
+        print(f"  peak RSS +{_peak_mb() - base:.0f} MB")
+
+        if args.compare:
+            base = _peak_mb()
+            t = time.perf_counter()
+            with app.test_request_context():
+                found = db.session.execute(text("""
+                    SELECT b.id, b.status, b.check_in, b.check_out, b.num_guests, b.total_amount, b.currency,
+                           b.created_at, u.email AS booked_by, h.name AS hotel_name, rt.name AS room_type_name
+                    FROM bookings b
+                    JOIN users u ON u.id = b.booked_by_user_id
+                    JOIN hotels h ON h.id = b.hotel_id
+                    JOIN room_types rt ON rt.id = b.room_type_id
+                """)).mappings().all()
+                out = []
+                for r in found:
+                    rec = dict(r)
+                    for k in ("check_in", "check_out", "created_at"):
+                        rec[k] = rec[k].isoformat()
+                    out.append(rec)
+                body = jsonify(out).get_data()
+                db.session.remove()
+            print(f"materialized {len(out)} rows, {len(body) / 1e6:.0f} MB json")
+            print(f"  first byte {(time.perf_counter() - t) * 1000:.0f} ms, peak RSS +{_peak_mb() - base:.0f} MB")
+    finally:
+        with app.app_context():
+            delete_hotels(gen.hotel_ids)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cost of the hold sweeper (app.holds) with many active holds.
+
+    python -m scripts.bench_holds [--holds 200000] [--hotels 500] [--due 50000] [--repeat 50]
+
+PostgreSQL only. Generates about --holds future stays across --hotels scratch
+hotels with scripts.seed and turns every live one into a pending hold expiring
+over the next hour. Times an idle sweep
+(nothing due, then the next-expiry probe, as the sweeper thread runs it),
+then makes --due of them expire and times the sweep that cancels them. The
+ledger must match the bookings afterwards. Unlike the other benchmarks this
+commits (the sweep works in its own transactions); the scratch hotels and
+everything under them are deleted at the end.
+"""
+import argparse
+import time
+from sqlalchemy import text
+from app import create_app, db, holds, ledger
+from scripts._benchutil import pct, sample_ms
+from scripts.seed import delete_hotels, load_synthetic, synthetic_args
+
+
+def _load(holds_wanted, hotels):
+    gen = load_synthetic(synthetic_args(hotels=hotels, bookings=holds_wanted, days_back=0, days_ahead=365))
+    # Every live future stay becomes a hold expiring some time in the next hour
+    n = db.session.execute(text("""
+        UPDATE bookings SET status = 'pending', expires_at = now() + (60 + id % 3540) * interval '1 second'
+        WHERE hotel_id = ANY(:hids) AND status IN ('confirmed', 'pending') AND check_in > now()
+    """), {"hids": gen.hotel_ids}).rowcount
+    db.session.commit()
+    db.session.execute(text("ANALYZE bookings"))
+    db.session.commit()
+    return gen.hotel_ids, n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="hold sweeper benchmark")
+    parser.add_argument("--holds", type=int, default=200000, help="stays to generate; the live ones become holds")
+    parser.add_argument("--hotels", type=int, default=500)
+    parser.add_argument("--due", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            raise SystemExit("bench_holds needs PostgreSQL")
+        t = time.perf_counter()
+        hotel_ids, active = _load(args.holds, args.hotels)
+        print(f"{active:,} active holds (loaded in {time.perf_counter() - t:.1f}s)")
+        try:
+            holds.sweep()   # anything already due elsewhere in the database
+            expired = []
+
+            def idle_sweep():
+                expired.append(holds.sweep())
+                holds.next_expiry()
+                db.session.commit()
+            samples = sample_ms(idle_sweep, args.repeat)
+            print(f"idle sweep + next-expiry probe: median {pct(samples, 50):.2f} ms, "
+                  f"max {samples[-1]:.2f} ms ({sum(expired)} expired)")
+
+            plan = db.session.execute(text("""
+                EXPLAIN SELECT id FROM bookings
+                WHERE status = 'pending' AND expires_at IS NOT NULL AND expires_at <= now()
+                LIMIT 1000 FOR UPDATE SKIP LOCKED
+            """)).scalars().all()
+            print("  sweep scan: " + next((p.strip() for p in plan if "Scan" in p), "?"))
+
+            db.session.execute(text("""
+                UPDATE bookings SET expires_at = now() - interval '1 second'
+                WHERE id IN (SELECT id FROM bookings WHERE hotel_id = ANY(:hids) AND status = 'pending'
+                             ORDER BY id LIMIT :due)
+            """), {"hids": hotel_ids, "due": args.due})
+            db.session.commit()
+            t = time.perf_counter()
+            n = holds.sweep()
+            took = time.perf_counter() - t
+            print(f"sweep of {args.due:,} due holds: {n:,} expired in {took:.2f}s ({n / took:,.0f} holds/s)")
+
+            drift = ledger.diff(hotel_ids)
+            left = db.session.execute(text("""
+                SELECT COUNT(*) FROM bookings WHERE hotel_id = ANY(:hids) AND status = 'pending'
+            """), {"hids": hotel_ids}).scalar()
+            print(f"ledger {'consistent' if not drift else f'DRIFT on {len(drift)} nights'}, {left:,} holds still active")
+            return 1 if drift or left != active - min(args.due, active) else 0
+        finally:
+            db.session.rollback()
+            delete_hotels(hotel_ids)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+"""Benchmark password verification (the CPU cost of a login) at several cost settings.
+
+    python -m scripts.bench_passwords [--methods pbkdf2:sha256:600000,scrypt:32768:8:1]
+                                      [--workers 2] [--logins 40]
+
+For each werkzeug method string, reports the time of one verify on the calling
+thread (logins/sec per core) and the throughput of --logins concurrent verifies
+through the same process pool the app uses (PASSWORD_HASH_WORKERS).
+"""
+import argparse
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.passwords import PasswordHasher
+
+METHODS = [
+    "pbkdf2:sha256:260000",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:1000000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+    "scrypt:65536:8:1",
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="password hashing benchmark")
+    parser.add_argument("--methods", default=",".join(METHODS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    cores = min(args.workers, os.cpu_count() or 1)
+    print(f"cpus={os.cpu_count()} pool workers={args.workers}")
+    print(f"{'method':<24}{'verify ms':>11}{'logins/s/core':>15}{'pool logins/s':>15}{'per core':>10}")
+    for method in args.methods.split(","):
+        inline = PasswordHasher(method, workers=0)
+        pwhash = inline.hash("correct horse battery staple")
+        samples = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            inline.verify(pwhash, "correct horse battery staple")
+            samples.append(time.perf_counter() - t)
+        per_call = statistics.median(samples)
+
+        pooled = PasswordHasher(method, workers=args.workers)
+        pooled.verify(pwhash, "warm up")  # start the worker processes
+        with ThreadPoolExecutor(max_workers=args.logins) as clients:
+            t = time.perf_counter()
+            list(clients.map(lambda _: pooled.verify(pwhash, "correct horse battery staple"), range(args.logins)))
+            rate = args.logins / (time.perf_counter() - t)
+        pooled.shutdown()
+        print(f"{method:<24}{per_call * 1000:>11.1f}{1 / per_call:>15.1f}{rate:>15.1f}{rate / cores:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
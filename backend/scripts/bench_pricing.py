@@ -0,0 +1,152 @@
+"""Speed of the vectorized pricing engine (app.pricing) on search-page sized inputs.
+
+    python -m scripts.bench_pricing [--hotels 100] [--room-types 4] [--nights 14] [--rules 6] [--db]
+
+Prices --hotels x --room-types stays of --nights nights against --rules
+random rate rules per hotel (season, weekday, length-of-stay and occupancy
+conditions). It times the array kernel alone, checks every nightly price
+against a plain per-night Python loop and times that loop for contrast.
+With --db it also times pricing.price() end to end (rules and ledger
+queries included) for the first --hotels hotels in DATABASE_URL. The rules
+are inserted in a transaction that is rolled back.
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import date, timedelta
+from fractions import Fraction
+import numpy as np
+from app import pricing
+
+
+def _rules(hotels, room_types, start, rng, per_hotel):
+    rows = []
+    for h in hotels:
+        for _ in range(per_hotel):
+            kind = rng.choice(("season", "weekday", "stay", "occupancy"))
+            first = start + timedelta(days=rng.randint(-10, 20))
+            rows.append({
+                "hotel_id": h,
+                "room_type_id": rng.choice([None, None, rng.choice(room_types[h])]),
+                "percent": rng.choice((-15, -10, -5, 5, 10, 20, 35)),
+                "start_date": first if kind == "season" else None,
+                "end_date": first + timedelta(days=rng.randint(3, 30)) if kind == "season" else None,
+                "weekdays": rng.choice((48, 96, 31)) if kind == "weekday" else None,
+                "min_nights": rng.choice((3, 7, 10)) if kind == "stay" else None,
+                "min_occupancy": rng.choice((0.5, 0.8, 0.9)) if kind == "occupancy" else None,
+            })
+    return rows
+
+
+def _python_cents(stay, rules, occupancy_row):
+    """One stay, one night and one rule at a time, in exact fractions: the reference the kernel must match."""
+    first = stay["check_in"]
+    out = []
+    for i in range(stay["nights"]):
+        night = first + timedelta(days=i)
+        factor = Fraction(1)
+        for r in rules:
+            if r["hotel_id"] != stay["hotel_id"] or r["room_type_id"] not in (None, stay["room_type_id"]):
+                continue
+            if r["start_date"] and night < r["start_date"] or r["end_date"] and night > r["end_date"]:
+                continue
+            if r["weekdays"] is not None and not r["weekdays"] >> night.weekday() & 1:
+                continue
+            if r["min_nights"] and stay["nights"] < r["min_nights"]:
+                continue
+            if r["min_occupancy"] is not None and occupancy_row[i] < r["min_occupancy"]:
+                continue
+            factor *= 1 + Fraction(str(r["percent"])) / 100
+        out.append(math.floor(stay["base_cents"] * max(factor, 0) + Fraction(1, 2)))
+    return out
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def bench_kernel(args):
+    rng = random.Random(args.seed)
+    start = date.today() + timedelta(days=30)
+    hotels = list(range(1, args.hotels + 1))
+    room_types = {h: [h * 100 + i for i in range(args.room_types)] for h in hotels}
+    stays = [{"hotel_id": h, "room_type_id": rt, "base_cents": rng.randint(40, 400) * 100,
+              "check_in": start, "nights": args.nights} for h in hotels for rt in room_types[h]]
+    rule_rows = _rules(hotels, room_types, start, rng, args.rules)
+    rules = pricing.Rules([tuple(r[c] for c in pricing.RULE_COLUMNS) for r in rule_rows])
+    hotel = np.array([s["hotel_id"] for s in stays], dtype=np.int64)
+    rtid = np.array([s["room_type_id"] for s in stays], dtype=np.int64)
+    base = np.array([s["base_cents"] for s in stays], dtype=np.int64)
+    first = np.full(len(stays), (start - date(1970, 1, 1)).days, dtype=np.int64)
+    nights = np.full(len(stays), args.nights, dtype=np.int64)
+    occupancy = np.random.default_rng(args.seed).random((len(stays), args.nights))
+
+    run = lambda: pricing.nightly_cents(hotel, rtid, base, first, nights, rules, occupancy)
+    cents = run()
+    expected = [_python_cents(s, rule_rows, occupancy[i]) for i, s in enumerate(stays)]
+    mismatches = sum(cents[i, :args.nights].tolist() != e for i, e in enumerate(expected))
+
+    med, best = _time(run, args.repeat)
+    py_med, _ = _time(lambda: [_python_cents(s, rule_rows, occupancy[i]) for i, s in enumerate(stays)],
+                      max(3, args.repeat // 20))
+    print(f"{len(stays)} stays x {args.nights} nights, {len(rule_rows)} rules")
+    print(f"  kernel      median {med:.2f} ms  best {best:.2f} ms")
+    print(f"  python loop median {py_med:.1f} ms  ({py_med / med:.0f}x)")
+    print(f"  mismatches vs python loop: {mismatches}")
+    return mismatches
+
+
+def bench_db(args):
+    from sqlalchemy import text
+    from app import create_app, db
+    app = create_app()
+    rng = random.Random(args.seed)
+    start = date.today() + timedelta(days=30)
+    with app.app_context():
+        found = db.session.execute(text("""
+            SELECT rt.hotel_id, rt.id, rt.base_price FROM room_types rt
+            WHERE rt.hotel_id IN (SELECT id FROM hotels ORDER BY id LIMIT :n) AND rt.active = TRUE
+        """), {"n": args.hotels}).all()
+        room_types = {}
+        for hid, rtid, _ in found:
+            room_types.setdefault(hid, []).append(rtid)
+        for r in _rules(sorted(room_types), room_types, start, rng, args.rules):
+            db.session.execute(text("""
+                INSERT INTO rate_rules (hotel_id, room_type_id, name, percent, start_date, end_date,
+                                        weekdays, min_nights, min_occupancy)
+                VALUES (:hotel_id, :room_type_id, 'bench', :percent, :start_date, :end_date,
+                        :weekdays, :min_nights, :min_occupancy)
+            """), r)
+        stays = [{"hotel_id": hid, "room_type_id": rtid, "base_price": base,
+                  "check_in": start, "check_out": start + timedelta(days=args.nights)} for hid, rtid, base in found]
+        med, best = _time(lambda: pricing.price(stays), args.repeat)
+        db.session.rollback()
+    print(f"price() on {len(stays)} room types of {len(room_types)} hotels, with queries")
+    print(f"  median {med:.2f} ms  best {best:.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="pricing engine benchmark")
+    parser.add_argument("--hotels", type=int, default=100)
+    parser.add_argument("--room-types", type=int, default=4)
+    parser.add_argument("--nights", type=int, default=14)
+    parser.add_argument("--rules", type=int, default=6, help="rate rules per hotel")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", action="store_true", help="also time pricing.price() against the database")
+    args = parser.parse_args(argv)
+    mismatches = bench_kernel(args)
+    if args.db:
+        bench_db(args)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+"""Benchmark hotel search latency at several catalog sizes.
+
+    python -m scripts.bench_search [--sizes 10000,100000,1000000] [--repeat 50]
+
+For each size, synthetic hotels from the scripts.seed generator are inserted
+inside a transaction, the queries below are timed through
+app.search.search_hotels, and the transaction is rolled back, so the database
+is left untouched.
+"""
+import argparse
+import time
+from sqlalchemy import text
+from app import create_app, db
+from app.search import search_hotels, has_trigram
+from scripts._benchutil import pct, sample_ms
+from scripts.seed import Generator, insert_hotels, synthetic_args
+
+QUERIES = [
+    ("single term", {"q": "pokhara"}),
+    ("prefix", {"q": "himal"}),
+    ("multi term", {"q": "lakeside resort"}),
+    ("amenity", {"q": "rooftop"}),
+    ("typo", {"q": "kathmandoo"}),
+    ("term + city", {"q": "lodge", "city": "chitwan"}),
+    ("no match", {"q": "zzzzqqq"}),
+]
+
+
+def _load(n):
+    insert_hotels(Generator(synthetic_args(hotels=n)))
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("ANALYZE hotels"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="hotel search latency benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        print(f"backend={dialect} trigram={dialect == 'postgresql' and has_trigram()}")
+        for n in [int(s) for s in args.sizes.split(",")]:
+            t0 = time.perf_counter()
+            _load(n)
+            print(f"\n== {n:,} hotels (loaded in {time.perf_counter() - t0:.1f}s)")
+            print(f"{'query':<14}{'hits':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+            for label, kw in QUERIES:
+                hits = len(search_hotels(limit=args.limit, **kw))
+                samples = sample_ms(lambda: search_hotels(limit=args.limit, **kw), args.repeat)
+                print(f"{label:<14}{hits:>6}{pct(samples, 50):>10.2f}"
+                      f"{pct(samples, 95):>10.2f}{samples[-1]:>10.2f}")
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Cancel booking holds past their expires_at, for deployments without HOLD_SWEEPER.
+
+    python -m scripts.holds [--batch 1000]    # once (cron)
+    python -m scripts.holds --watch           # the sweeper loop, as one dedicated process
+
+Holds are cancelled in chunks of --batch, one transaction per chunk, giving
+their nights back to the ledger (see app.holds and app.lifecycle.expire_holds).
+--watch keeps sweeping, sleeping until the next expiry (at most
+HOLD_SWEEP_SECONDS), like the in-process sweeper thread.
+"""
+import argparse
+import time
+from app import create_app, holds
+from app.holds import sweeper
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="expire booking holds")
+    parser.add_argument("--batch", type=int, default=None, help="holds per chunk (BOOKING_STATUS_LOG_BATCH)")
+    parser.add_argument("--watch", action="store_true", help="keep sweeping until interrupted")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    if args.watch:
+        print(f"Sweeping holds every {app.config['HOLD_SWEEP_SECONDS']:g}s at most (Ctrl-C to stop).")
+        try:
+            sweeper.run(app)
+        except KeyboardInterrupt:
+            return 0
+    with app.app_context():
+        t = time.perf_counter()
+        n = holds.sweep(args.batch)
+        due = holds.next_expiry()
+        nxt = f"; next expires in {float(due):.0f}s" if due is not None else ""
+        print(f"Expired {n} holds in {time.perf_counter() - t:.2f}s{nxt}.")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
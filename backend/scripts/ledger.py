@@ -0,0 +1,40 @@
+"""Maintain the room_type_nights inventory ledger.
+
+    python -m scripts.ledger rebuild [--hotel ID]   # recompute from bookings
+    python -m scripts.ledger check [--hotel ID]     # diff ledger vs. bookings; exit 1 on drift
+"""
+import argparse
+import sys
+from app import create_app, ledger
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="room_type_nights ledger maintenance")
+    parser.add_argument("command", choices=("rebuild", "check"))
+    parser.add_argument("--hotel", type=int, default=None, help="limit to one hotel id")
+    parser.add_argument("--limit", type=int, default=50, help="max mismatches to print (check)")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "rebuild":
+            n = ledger.rebuild(args.hotel)
+            print(f"Rebuilt ledger: {n} room-type nights.")
+            return 0
+
+        rows = ledger.diff(args.hotel)
+        if not rows:
+            print("Ledger consistent with bookings.")
+            return 0
+        print(f"Ledger drift: {len(rows)} room-type nights differ.")
+        for r in rows[:args.limit]:
+            print(
+                f"  hotel={r['hotel_id']} room_type={r['room_type_id']} night={r['night']} "
+                f"booked ledger={r['ledger_booked']} actual={r['actual_booked']} "
+                f"capacity ledger={r['ledger_capacity']} actual={r['actual_capacity']}"
+            )
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
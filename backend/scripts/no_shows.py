@@ -0,0 +1,29 @@
+"""Mark confirmed bookings whose check-in has passed as no_show. Meant to run nightly (cron).
+
+    python -m scripts.no_shows [--grace-hours 24] [--batch 1000]
+
+Bookings are moved in chunks of --batch, one transaction and one
+booking_status_log INSERT per chunk (see app.lifecycle.transition_where).
+"""
+import argparse
+import time
+from app import create_app, lifecycle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="automatic no-show marking")
+    parser.add_argument("--grace-hours", type=int, default=None,
+                        help="hours after check-in before a booking counts as a no-show (NO_SHOW_GRACE_HOURS)")
+    parser.add_argument("--batch", type=int, default=None, help="bookings per chunk (BOOKING_STATUS_LOG_BATCH)")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        t = time.perf_counter()
+        n = lifecycle.mark_no_shows(args.grace_hours, args.batch)
+        print(f"Marked {n} bookings as no_show in {time.perf_counter() - t:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
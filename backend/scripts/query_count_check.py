@@ -0,0 +1,72 @@
+"""Query-count regression check: listing routes must not issue a query per row.
+
+    python -m scripts.query_count_check [--small 5] [--large 100]
+
+Requests every route below through the Flask test client at limit=--small and
+limit=--large, after one unmeasured request, counting the SQL statements
+each one executes (a before_cursor_execute listener, as in scripts.bench),
+with the response cache off. A route whose count grows with the page size loads something per row (an
+N+1). Exits 1 if any does.
+
+Needs more than --small hotels in the database (scripts.seed --hotels ...).
+"""
+import argparse
+import os
+import sys
+from sqlalchemy import event
+
+# (label, path with {limit})
+ROUTES = [
+    ("hotels list", "/api/hotels?limit={limit}"),
+    ("hotels by city", "/api/hotels?city=Kathmandu&limit={limit}"),
+    ("hotels search", "/api/hotels?q=hotel&limit={limit}"),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="fail on listing routes whose query count grows with the page")
+    parser.add_argument("--small", type=int, default=5)
+    parser.add_argument("--large", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    # Every request must reach the database to be counted
+    os.environ["CACHE_BACKEND"] = "none"
+    from app import create_app, db
+    app = create_app()
+    client = app.test_client()
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: statements.append(1))
+
+    failures = checked = 0
+    for label, path in ROUTES:
+        # Once unmeasured: one-off per-process probes (e.g. pg_trgm) are not per row
+        client.get(path.format(limit=args.small))
+        counts, rows = [], []
+        for limit in (args.small, args.large):
+            url = path.format(limit=limit)
+            statements.clear()
+            resp = client.get(url)
+            if resp.status_code != 200:
+                print(f"{url} -> HTTP {resp.status_code}")
+                return 2
+            counts.append(len(statements))
+            rows.append(len(resp.get_json()))
+        if rows[1] <= args.small:
+            print(f"[skip] {label}: only {rows[1]} rows; seed more hotels (scripts.seed --hotels ...)")
+            continue
+        grew = counts[1] != counts[0]
+        checked += 1
+        failures += grew
+        print(f"[{'FAIL' if grew else ' ok '}] {label}: {counts[0]} queries for {rows[0]} rows, "
+              f"{counts[1]} for {rows[1]} rows")
+
+    if not checked:
+        return 2
+    print(f"{failures} route(s) issue more queries for a larger page." if failures
+          else "Query counts do not depend on the page size.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
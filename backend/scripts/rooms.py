@@ -0,0 +1,56 @@
+"""Room assignment maintenance (app/allocation.py).
+
+    python -m scripts.rooms optimize [--hotel ID] [--repack]   # assign / re-pack upcoming stays
+    python -m scripts.rooms check [--hotel ID]                 # no room double-assigned; exit 1 if one is
+"""
+import argparse
+import sys
+import time
+from sqlalchemy import text
+from app import create_app, db, allocation
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="room assignment maintenance")
+    parser.add_argument("command", choices=("optimize", "check"))
+    parser.add_argument("--hotel", type=int, default=None, help="limit to one hotel id")
+    parser.add_argument("--repack", action="store_true",
+                        help="place every stay afresh instead of keeping rooms that still fit (optimize)")
+    parser.add_argument("--limit", type=int, default=50, help="max problems to print (check)")
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "optimize":
+            hotels = [args.hotel] if args.hotel is not None else \
+                db.session.execute(text("SELECT id FROM hotels ORDER BY id")).scalars().all()
+            stays = moved = 0
+            unassigned = []
+            started = time.perf_counter()
+            # One transaction per hotel, so a long run holds few locks at a time
+            for hid in hotels:
+                result = allocation.optimize(hid, stable=not args.repack)
+                db.session.commit()
+                stays += result["stays"]
+                moved += result["moved"]
+                unassigned += result["unassigned"]
+            print(f"{len(hotels)} hotel(s), {stays} upcoming stays, {moved} (re)assigned, "
+                  f"{len(unassigned)} without a room, {time.perf_counter() - started:.1f}s")
+            for bid in unassigned[:args.limit]:
+                print(f"  booking {bid}: no room free on every night")
+            return 0
+
+        problems = allocation.conflicts(args.hotel, limit=args.limit)
+        waiting = allocation.unassigned_count(args.hotel)
+        if not problems:
+            print(f"Room assignments consistent; {waiting} upcoming stays without a room.")
+            return 0
+        print(f"Room assignment problems: {len(problems)}{'+' if len(problems) == args.limit else ''}.")
+        for p in problems:
+            other = f" and booking {p['other_id']}" if p["other_id"] else ""
+            print(f"  {p['problem']}: hotel={p['hotel_id']} room={p['room_id']} booking {p['booking_id']}{other}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
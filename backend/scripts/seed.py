@@ -1,11 +1,32 @@
+"""Seed demo data, optionally followed by a large synthetic dataset for performance work.
+
+    python -m scripts.seed                       # demo: 2 users, 5 hotels, one booking
+    python -m scripts.seed --hotels 50000 --bookings 5000000 --users 1000000 [--seed 42]
+
+The synthetic rows are generated deterministically from --seed, relative to
+--anchor (default today), and bulk loaded with COPY on PostgreSQL or batched
+executemany elsewhere. Hotel popularity and cities are skewed, stays follow
+seasonal check-in dates and a short-stay length distribution, and rooms are
+sized for --occupancy so popular hotels sell out on peak nights without ever
+exceeding capacity. Synthetic users all share the password "password123".
+"""
+import argparse
+import bisect
+import csv
+import io
+import itertools
 import json
-from datetime import datetime, timedelta, timezone
+import math
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
 from sqlalchemy import text
-from werkzeug.security import generate_password_hash
 from app import create_app, db
 from app.models import User
-
-app = create_app()
+from app import ledger
+from app import lifecycle
+from app.cache import invalidate_hotel, response_cache
+from app.passwords import passwords
 
 # Hotels and images (Wikimedia/official gallery URLs)
 HOTELS = [
@@ -99,7 +120,7 @@ def upsert_user(full_name, email, role, password):
         full_name=full_name,
         email=email,
         role=role,
-        password_hash=generate_password_hash(password),
+        password_hash=passwords.hash(password),
     )
     db.session.add(u)
     db.session.commit()
@@ -136,6 +157,7 @@ def ensure_hotel_image(hotel_id, url, alt, primary=False):
         RETURNING id
     """), {"hid": hotel_id, "url": url, "alt": alt, "primary": bool(primary)}).first()
     db.session.commit()
+    invalidate_hotel(hotel_id)
     return row[0]
 
 def get_or_create_room_type(hotel_id, rt):
@@ -157,6 +179,7 @@ def get_or_create_room_type(hotel_id, rt):
         "amenities": json.dumps(rt[4]),
     }).first()
     db.session.commit()
+    invalidate_hotel(hotel_id)
     return row[0]
 
 def ensure_room(hotel_id, room_type_id, room_number):
@@ -173,63 +196,389 @@ def ensure_room(hotel_id, room_type_id, room_number):
     db.session.commit()
     return row[0]
 
-with app.app_context():
-    # 1) Users
-    admin_id = upsert_user("Admin", "admin@example.com", "admin", "admin123")
-    user_id  = upsert_user("Test User", "user@example.com", "user", "user123")
-    print("Users ready. (admin and user)")
-
-    # 2) Hotels, images, room types, rooms
-    hotel_ids = []
-    for h in HOTELS:
-        hid = get_or_create_hotel(h)
-        hotel_ids.append(hid)
-
-        # images
-        for idx, img in enumerate(h.get("images", [])):
-            ensure_hotel_image(hid, img["url"], img.get("alt") or "", primary=bool(img.get("primary") and idx == 0))
-
-        # two room types
-        rt_ids = [get_or_create_room_type(hid, rt) for rt in ROOM_TYPES]
-
-        # rooms: 2 for Deluxe, 1 for Twin
-        if len(rt_ids) >= 2:
-            ensure_room(hid, rt_ids[0], "101")
-            ensure_room(hid, rt_ids[0], "102")
-            ensure_room(hid, rt_ids[1], "201")
-
-    print(f"Seeded {len(hotel_ids)} hotels with images, room types & rooms.")
-
-    # 3) Sample booking (hotel 1, Deluxe if exists)
-    if hotel_ids:
-        rt_row = db.session.execute(text("""
-            SELECT id FROM room_types
-            WHERE hotel_id=:hid AND name='Deluxe King' ORDER BY id LIMIT 1
-        """), {"hid": hotel_ids[0]}).first()
-
-        if rt_row:
-            now = datetime.now(timezone.utc)
-            check_in = now + timedelta(days=7)
-            check_out = now + timedelta(days=9)
-
-            bid = db.session.execute(text("""
-                INSERT INTO bookings (booked_by_user_id, guest_user_id, guest_name, hotel_id, room_type_id,
-                                      check_in, check_out, status, num_guests, total_amount, currency)
-                VALUES (:booked_by, :guest_user, :guest_name, :hotel, :room_type, :cin, :cout,
-                        'confirmed', :guests, :total, :cur)
-                RETURNING id
-            """), {
-                "booked_by": admin_id,
-                "guest_user": user_id,
-                "guest_name": None,
-                "hotel": hotel_ids[0],
-                "room_type": rt_row[0],
-                "cin": check_in, "cout": check_out,
-                "guests": 2,
-                "total": 240.00,
-                "cur": "USD"
-            }).scalar()
+def seed_demo(app):
+    with app.app_context():
+        # 1) Users
+        admin_id = upsert_user("Admin", "admin@example.com", "admin", "admin123")
+        user_id  = upsert_user("Test User", "user@example.com", "user", "user123")
+        print("Users ready. (admin and user)")
+
+        # 2) Hotels, images, room types, rooms
+        hotel_ids = []
+        for h in HOTELS:
+            hid = get_or_create_hotel(h)
+            hotel_ids.append(hid)
+
+            # images
+            for idx, img in enumerate(h.get("images", [])):
+                ensure_hotel_image(hid, img["url"], img.get("alt") or "", primary=bool(img.get("primary") and idx == 0))
+
+            # two room types
+            rt_ids = [get_or_create_room_type(hid, rt) for rt in ROOM_TYPES]
+
+            # rooms: 2 for Deluxe, 1 for Twin
+            if len(rt_ids) >= 2:
+                ensure_room(hid, rt_ids[0], "101")
+                ensure_room(hid, rt_ids[0], "102")
+                ensure_room(hid, rt_ids[1], "201")
+
+        print(f"Seeded {len(hotel_ids)} hotels with images, room types & rooms.")
+
+        # 3) Sample booking (hotel 1, Deluxe if exists)
+        if hotel_ids:
+            rt_row = db.session.execute(text("""
+                SELECT id FROM room_types
+                WHERE hotel_id=:hid AND name='Deluxe King' ORDER BY id LIMIT 1
+            """), {"hid": hotel_ids[0]}).first()
+
+            if rt_row:
+                now = datetime.now(timezone.utc)
+                check_in = now + timedelta(days=7)
+                check_out = now + timedelta(days=9)
+
+                bid = db.session.execute(text("""
+                    INSERT INTO bookings (booked_by_user_id, guest_user_id, guest_name, hotel_id, room_type_id,
+                                          check_in, check_out, status, num_guests, total_amount, currency)
+                    VALUES (:booked_by, :guest_user, :guest_name, :hotel, :room_type, :cin, :cout,
+                            'confirmed', :guests, :total, :cur)
+                    RETURNING id
+                """), {
+                    "booked_by": admin_id,
+                    "guest_user": user_id,
+                    "guest_name": None,
+                    "hotel": hotel_ids[0],
+                    "room_type": rt_row[0],
+                    "cin": check_in, "cout": check_out,
+                    "guests": 2,
+                    "total": 240.00,
+                    "cur": "USD"
+                }).scalar()
+                ledger.apply_booking(hotel_ids[0], rt_row[0], check_in, check_out)
+                lifecycle.record_created([bid], "confirmed", admin_id)
+                db.session.commit()
+                print("Created booking id:", bid)
+            else:
+                print("Skipped sample booking (no Deluxe room type found).")
+
+
+# ---- Synthetic dataset -------------------------------------------------------
+
+# (city, relative share of hotels)
+CITIES = [
+    ("Kathmandu", 30), ("Pokhara", 18), ("Chitwan", 10), ("Lalitpur", 8), ("Bhaktapur", 6),
+    ("Lumbini", 4), ("Nagarkot", 4), ("Bandipur", 3), ("Dhulikhel", 3), ("Janakpur", 3),
+    ("Biratnagar", 3), ("Birgunj", 2), ("Dharan", 2), ("Ilam", 2), ("Mustang", 2),
+    ("Gorkha", 2), ("Butwal", 2), ("Hetauda", 1), ("Tansen", 1), ("Palpa", 1),
+]
+NAME_WORDS = ["Grand", "Royal", "Himalayan", "Everest", "Lakeside", "Heritage", "Summit", "Mountain",
+              "Garden", "River", "Temple", "Jungle", "Peace", "Lotus", "Yak", "Annapurna", "Valley", "Sunrise"]
+NAME_KINDS = ["Hotel", "Resort", "Lodge", "Inn", "Guest House", "Retreat", "Suites", "Boutique Hotel"]
+# amenity -> share of hotels that have it
+AMENITY_ODDS = {"wifi": .95, "parking": .6, "breakfast": .55, "restaurant": .5, "ac": .5, "airport_shuttle": .2,
+                "gym": .2, "rooftop": .15, "pool": .15, "spa": .12, "safari": .05}
+# (name, guests, price multiplier)
+ROOM_TEMPLATES = [("Standard Double", 2, 1.0), ("Twin Standard", 2, 0.95), ("Deluxe King", 2, 1.4),
+                  ("Family Room", 4, 1.8), ("Single", 1, 0.7), ("Suite", 3, 2.6)]
+# P(stay of n nights), n = 1..14
+STAY_WEIGHTS = [30, 25, 15, 10, 6, 4, 3, 2, 1.5, 1, .8, .6, .5, .6]
+MEAN_NIGHTS = sum((i + 1) * w for i, w in enumerate(STAY_WEIGHTS)) / sum(STAY_WEIGHTS)
+# Relative demand per month (trekking seasons peak in spring and autumn)
+MONTH_DEMAND = [0.8, 0.8, 1.2, 1.3, 1.0, 0.6, 0.5, 0.6, 0.9, 1.4, 1.4, 1.0]
+SYNTHETIC_PASSWORD = "password123"
+CHUNK_ROWS = 50000
+
+
+def _bulk_insert(table: str, columns: list, rows) -> int:
+    """Insert an iterable of row tuples: COPY on PostgreSQL, executemany batches elsewhere."""
+    n = 0
+    cols = ", ".join(columns)
+    if db.engine.dialect.name == "postgresql":
+        cursor = db.session.connection().connection.cursor()
+        for batch in iter(lambda: list(itertools.islice(rows, CHUNK_ROWS)), []):
+            buf = io.StringIO()
+            csv.writer(buf).writerows(batch)
+            buf.seek(0)
+            cursor.copy_expert(f"COPY {table} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+            n += len(batch)
+        return n
+    sql = text(f"INSERT INTO {table} ({cols}) VALUES ({', '.join(':' + c for c in columns)})")
+    for batch in iter(lambda: list(itertools.islice(rows, CHUNK_ROWS)), []):
+        db.session.execute(sql, [dict(zip(columns, row)) for row in batch])
+        n += len(batch)
+    return n
+
+
+def _new_ids(table: str, after: int) -> list:
+    # Rows of one bulk insert get ascending ids in insertion order
+    return db.session.execute(text(f"SELECT id FROM {table} WHERE id > :after ORDER BY id"),
+                              {"after": after}).scalars().all()
+
+
+def _max_id(table: str) -> int:
+    return db.session.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table}")).scalar()
+
+
+def _timed(label: str, fn, *args):
+    t = time.perf_counter()
+    n = fn(*args)
+    elapsed = time.perf_counter() - t
+    print(f"  {label:<12}{n:>11} rows {elapsed:>8.1f}s {n / max(elapsed, 1e-9):>10.0f} rows/s")
+    return n
+
+
+class Generator:
+    """Deterministic synthetic catalog, users and bookings for one --seed."""
+
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.anchor = args.anchor
+        self.start = self.anchor - timedelta(days=args.days_back)
+        self.days = args.days_back + args.days_ahead
+        self.now = datetime.combine(self.anchor, datetime.min.time(), timezone.utc) + timedelta(hours=12)
+
+    # -- catalog
+
+    def _hotel_weights(self):
+        # Zipf-like popularity in random order: a few hotels get most bookings
+        n = self.args.hotels
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(n)]
+        self.rng.shuffle(weights)
+        total = sum(weights)
+        return [w / total for w in weights]
+
+    def hotels(self):
+        city_cum = list(itertools.accumulate(w for _, w in CITIES))
+        rng = self.rng
+        for i in range(self.args.hotels):
+            city = CITIES[bisect.bisect_right(city_cum, rng.random() * city_cum[-1])][0]
+            amenities = {k: True for k, p in AMENITY_ODDS.items() if rng.random() < p}
+            name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {rng.choice(NAME_KINDS)} {i + 1}"
+            yield (name, city, "Nepal", f"{rng.randint(1, 400)} {rng.choice(NAME_WORDS)} Marg, {city}",
+                   f"{rng.choice(NAME_KINDS)} in {city} with {', '.join(sorted(amenities)) or 'basic facilities'}.",
+                   json.dumps(amenities))
+
+    def room_types(self, hotel_ids, weights):
+        """Yield room type rows; remember (hotel id, guests, price, rooms) per type for bookings."""
+        rng = self.rng
+        bookings = self.args.bookings
+        self.types = []         # per room type: (hotel_id, guests, price, rooms)
+        self.hotel_types = []   # per hotel: (first type index, count)
+        for hid, weight in zip(hotel_ids, weights):
+            templates = rng.sample(ROOM_TEMPLATES, rng.randint(2, 5))
+            tier = min(max(rng.lognormvariate(math.log(60), 0.6), 15), 800)
+            # Rooms so this hotel's expected demand fills --occupancy of its nights
+            demand = bookings * weight * MEAN_NIGHTS / len(templates) / self.days
+            self.hotel_types.append((len(self.types), len(templates)))
+            for name, guests, mult in templates:
+                rooms = (self.args.rooms_per_type
+                         or max(1, min(60, round(demand / self.args.occupancy * rng.uniform(0.7, 1.3)))))
+                price = round(tier * mult, 2)
+                self.types.append((hid, guests, price, rooms))
+                yield (hid, name, guests, price, f"{name} for up to {guests}", "{}", True)
+
+    def rooms(self, type_ids):
+        for rtid, (hid, _guests, _price, rooms) in zip(type_ids, self.types):
+            for n in range(rooms):
+                yield (hid, rtid, f"{rtid}-{n + 1}", "available", True)
+
+    def images(self, hotel_ids):
+        for hid in hotel_ids:
+            yield (hid, f"https://picsum.photos/seed/hotel-{hid}/800/600", "Hotel photo", True)
+
+    # -- users and bookings
+
+    def users(self, first: int, pwhash: str):
+        rng = self.rng
+        for i in range(first, first + self.args.users):
+            created = self.now - timedelta(days=rng.uniform(0, 3 * 365))
+            yield (f"Guest {i}", f"user{i}@seed.example.com", None, "user", pwhash, True, created, created)
+
+    def _day_cum(self):
+        weights = []
+        for d in range(self.days):
+            day = self.start + timedelta(days=d)
+            w = MONTH_DEMAND[day.month - 1] * (1.25 if day.weekday() >= 4 else 1.0)
+            if day > self.anchor:
+                # Fewer stays are booked the further ahead they are
+                w *= math.exp(-(day - self.anchor).days / 90)
+            weights.append(w)
+        return list(itertools.accumulate(weights))
+
+    def bookings(self, hotel_ids, hotel_weights, type_ids, user_ids):
+        rng = self.rng
+        hotel_cum = list(itertools.accumulate(hotel_weights))
+        day_cum = self._day_cum()
+        stay_cum = list(itertools.accumulate(STAY_WEIGHTS))
+        today = (self.anchor - self.start).days
+        days = self.days
+        # Booked rooms per (room type, night), bounded by the type's room count
+        occupied = bytearray(len(self.types) * days)
+        # Timestamps are written as text (cheaper than datetime objects per row);
+        # day index i is self.start + i days, from a year before the window
+        day_strs = [(self.start + timedelta(days=d)).isoformat() for d in range(-366, days + 1)]
+        now_s = (self.anchor - self.start).days * 86400 + 12 * 3600
+        self.turned_away = 0
+        for _ in range(self.args.bookings):
+            for _attempt in range(4):
+                h = bisect.bisect_right(hotel_cum, rng.random() * hotel_cum[-1])
+                h = min(h, len(hotel_ids) - 1)
+                first, count = self.hotel_types[h]
+                t = first + rng.randrange(count)
+                day = min(bisect.bisect_right(day_cum, rng.random() * day_cum[-1]), days - 1)
+                nights = min(bisect.bisect_right(stay_cum, rng.random() * stay_cum[-1]) + 1, days - day)
+                end = day + nights
+                if end <= today:
+                    status = rng.choices(("checked_out", "cancelled", "no_show"), (88, 9, 3))[0]
+                elif day <= today:
+                    status = "checked_in"
+                else:
+                    status = rng.choices(("confirmed", "pending", "cancelled"), (85, 5, 10))[0]
+                if status == "cancelled":
+                    break
+                hid, guests, price, rooms = self.types[t]
+                cells = range(t * days + day, t * days + end)
+                if all(occupied[c] < rooms for c in cells):
+                    for c in cells:
+                        occupied[c] += 1
+                    break
+            else:
+                self.turned_away += 1
+                continue
+            hid, guests, price, rooms = self.types[t]
+            # Booked on average a month ahead, never after "now"
+            lead = int(min(rng.expovariate(1 / 30), 365) * 86400) + rng.randrange(86400)
+            c = min(day * 86400 + 14 * 3600 - lead, now_s)
+            cd, cs = divmod(c, 86400)
+            created = f"{day_strs[cd + 366]} {cs // 3600:02d}:{cs // 60 % 60:02d}:{cs % 60:02d}+00"
+            user = user_ids[int(len(user_ids) * rng.random() ** 2)]
+            total = round(price * nights * rng.uniform(0.85, 1.25), 2)
+            yield (user, user, None, hid, type_ids[t], f"{day_strs[day + 366]} 14:00:00+00",
+                   f"{day_strs[end + 366]} 11:00:00+00", status, rng.randint(1, guests), total, "USD",
+                   created, created)
+
+
+def insert_hotels(gen) -> list:
+    """Bulk insert just the generator's hotels; returns their ids in generation order."""
+    before = _max_id("hotels")
+    _timed("hotels", _bulk_insert, "hotels",
+           ["name", "city", "country", "address", "description", "amenities"], gen.hotels())
+    return _new_ids("hotels", before)
+
+
+def load_synthetic(args, commit: bool = True) -> Generator:
+    """Generate and insert the synthetic dataset for args in the current app context.
+
+    Returns the Generator, with the new ids in .hotel_ids and .type_ids. With
+    commit=False everything stays in the current transaction, so a benchmark
+    can roll it back; the ledger is rebuilt for the new hotels either way.
+    """
+    gen = Generator(args)
+    pg = db.engine.dialect.name == "postgresql"
+    if pg and commit:
+        # Bulk load: nothing is lost on a crash that a re-run cannot redo
+        db.session.execute(text("SET synchronous_commit = off"))
+    print(f"Synthetic data (seed {args.seed}, anchor {args.anchor}, {args.days_back}d back / {args.days_ahead}d ahead):")
+    hotel_ids, hotel_weights, type_ids = [], [], []
+    if args.hotels:
+        hotel_ids = insert_hotels(gen)
+        hotel_weights = gen._hotel_weights()
+        _timed("images", _bulk_insert, "hotel_images", ["hotel_id", "url", "alt_text", "is_primary"],
+               gen.images(hotel_ids))
+        before = _max_id("room_types")
+        _timed("room types", _bulk_insert, "room_types",
+               ["hotel_id", "name", "capacity", "base_price", "description", "amenities", "active"],
+               gen.room_types(hotel_ids, hotel_weights))
+        type_ids = _new_ids("room_types", before)
+        _timed("rooms", _bulk_insert, "rooms", ["hotel_id", "room_type_id", "room_number", "status", "active"],
+               gen.rooms(type_ids))
+        if commit:
+            db.session.commit()
+    gen.hotel_ids, gen.type_ids = hotel_ids, type_ids
+    if args.users:
+        before = _max_id("users")
+        _timed("users", _bulk_insert, "users",
+               ["full_name", "email", "phone", "role", "password_hash", "active", "created_at", "updated_at"],
+               gen.users(before + 1, passwords.hash(SYNTHETIC_PASSWORD)))
+        if commit:
+            db.session.commit()
+    if args.bookings:
+        if not hotel_ids:
+            raise SystemExit("--bookings needs --hotels (bookings go to the generated hotels)")
+        user_ids = db.session.execute(text("SELECT id FROM users ORDER BY id")).scalars().all()
+        if not user_ids:
+            raise SystemExit("--bookings needs users; run scripts.seed first")
+        _timed("bookings", _bulk_insert, "bookings",
+               ["booked_by_user_id", "guest_user_id", "guest_name", "hotel_id", "room_type_id", "check_in",
+                "check_out", "status", "num_guests", "total_amount", "currency", "created_at", "updated_at"],
+               gen.bookings(hotel_ids, hotel_weights, type_ids, user_ids))
+        if gen.turned_away:
+            print(f"  ({gen.turned_away} stays found no free room and were dropped)")
+        if commit:
             db.session.commit()
-            print("Created booking id:", bid)
-        else:
-            print("Skipped sample booking (no Deluxe room type found).")
+        if pg:
+            # Fresh statistics, or the ledger rebuild is planned for empty tables
+            db.session.execute(text("ANALYZE bookings; ANALYZE rooms; ANALYZE room_types"))
+        # Only the new hotels: the rest of the ledger is kept up to date by the app
+        _timed("ledger", ledger.rebuild, hotel_ids, commit)
+    if pg:
+        db.session.execute(text("ANALYZE"))
+        if commit:
+            db.session.commit()
+    response_cache.invalidate("hotels")
+    return gen
+
+
+def delete_hotels(hotel_ids):
+    """Delete generated hotels and everything under them, bookings included, and commit (PostgreSQL)."""
+    params = {"hids": list(hotel_ids)}
+    # Bookings restrict hotel deletes; the rest cascades
+    db.session.execute(text("DELETE FROM bookings WHERE hotel_id = ANY(:hids)"), params)
+    db.session.execute(text("DELETE FROM hotels WHERE id = ANY(:hids)"), params)
+    db.session.commit()
+    response_cache.invalidate("hotels")
+
+
+def synthetic_args(**overrides) -> argparse.Namespace:
+    """The seed command line's defaults with overrides, e.g. synthetic_args(hotels=100, bookings=10000)."""
+    args = _parser().parse_args([])
+    for name, value in overrides.items():
+        if not hasattr(args, name):
+            raise TypeError(f"unknown seed option {name!r}")
+        setattr(args, name, value)
+    return args
+
+
+def seed_synthetic(app, args):
+    with app.app_context():
+        t = time.perf_counter()
+        load_synthetic(args)
+        print(f"Done in {time.perf_counter() - t:.1f}s.")
+
+
+def _parser():
+    parser = argparse.ArgumentParser(description="seed demo data and, optionally, a large synthetic dataset")
+    parser.add_argument("--hotels", type=int, default=0, help="synthetic hotels to generate")
+    parser.add_argument("--bookings", type=int, default=0, help="synthetic bookings (across the generated hotels)")
+    parser.add_argument("--users", type=int, default=0, help="synthetic users")
+    parser.add_argument("--seed", type=int, default=42, help="random seed; same seed and anchor, same data")
+    parser.add_argument("--anchor", type=date.fromisoformat, default=date.today(), help="'today' for the data")
+    parser.add_argument("--days-back", type=int, default=365, help="history of stays before the anchor")
+    parser.add_argument("--days-ahead", type=int, default=180, help="future stays after the anchor")
+    parser.add_argument("--occupancy", type=float, default=0.65, help="target share of room nights sold")
+    parser.add_argument("--rooms-per-type", type=int, default=0,
+                        help="rooms of every room type (default: sized for --occupancy, at most 60)")
+    return parser
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    app = create_app()
+    seed_demo(app)
+    if args.hotels or args.users or args.bookings:
+        seed_synthetic(app, args)
+
+
+# Guarded: the password hashing pool's worker processes import __main__
+if __name__ == "__main__":
+    main()
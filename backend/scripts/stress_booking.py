@@ -0,0 +1,179 @@
+"""Overbooking stress test: many threads booking (and cancelling) one room type at once.
+
+    python -m scripts.stress_booking [--threads 32] [--requests 10] [--rooms 3]
+                                     [--mixed-threads 16] [--mixed-rooms 500] [--p99-ms 2000]
+
+PostgreSQL only; needs user@example.com / user123 from scripts.seed. Two
+throwaway hotels from the scripts.seed generator are committed, then two
+phases run, each thread (one Flask test client each, all released together)
+attempting --requests bookings:
+
+- book: --threads threads POST /api/bookings for overlapping 1-3 night stays
+  in the same few nights of a room type with --rooms rooms, so far more stays
+  are asked for than there are rooms.
+- book+cancel: --mixed-threads threads POST /api/bookings for overlapping 3-8
+  night stays of a room type with --mixed-rooms rooms, each booking cancelled
+  again right away
+  (PATCH /api/bookings/<id>/cancel), so both ledger writers, reserving and
+  releasing, contend for the same nights.
+
+Every answer must be 200 or 409. Afterwards no night may hold more bookings
+than rooms, room_type_nights must agree with the bookings and rooms
+(ledger.diff), every successful booking not cancelled must exist,
+pg_stat_database must count no new deadlocks, and the p99 request latency
+must stay under --p99-ms. Exits 1 if any of that fails. The hotels and their
+bookings are deleted at the end.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import timedelta
+from sqlalchemy import text
+from app import create_app, db, ledger
+from scripts._benchutil import pct
+from scripts.seed import delete_hotels, load_synthetic, synthetic_args
+
+USER = {"email": "user@example.com", "password": "user123"}
+
+
+def _overbooked(room_type_id: int, rooms: int) -> list:
+    """(night, bookings) for every night of the room type with more live bookings than rooms."""
+    return db.session.execute(text(f"""
+        SELECT CAST(d AS date) AS night, COUNT(*) AS booked
+        FROM bookings b
+        CROSS JOIN LATERAL {ledger.NIGHTS_SQL.format(ci="b.check_in", co="b.check_out")} AS d
+        WHERE b.room_type_id = :rtid AND b.status <> 'cancelled'
+        GROUP BY 1 HAVING COUNT(*) > :rooms
+        ORDER BY 1
+    """), {"rtid": room_type_id, "rooms": rooms}).all()
+
+
+def _deadlocks() -> int:
+    # Backends report their counters a moment after the fact
+    time.sleep(1.5)
+    db.session.execute(text("SELECT pg_stat_clear_snapshot()"))
+    return db.session.execute(text("""
+        SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()
+    """)).scalar()
+
+
+def _phase(app, args, headers, threads, hotel_id, room_type_id, start, nights, cancel):
+    """Run one phase; returns (sorted latencies in ms, {(operation, status): count})."""
+    latencies, statuses, lock = [], {}, threading.Lock()
+    go = threading.Barrier(threads)
+
+    def call(client, op, method, url, body=None):
+        t = time.perf_counter()
+        try:
+            resp = client.open(url, method=method, json=body, headers=headers)
+            status, data = resp.status_code, resp.get_json(silent=True) or {}
+        except Exception:
+            status, data = 0, {}
+        with lock:
+            latencies.append((time.perf_counter() - t) * 1000)
+            statuses[(op, status)] = statuses.get((op, status), 0) + 1
+        return status, data
+
+    def worker(i):
+        rng = random.Random(args.seed * 1000 + i)
+        client = app.test_client()
+        go.wait()
+        for _ in range(args.requests):
+            ci = start + timedelta(days=rng.randrange(3))
+            co = ci + timedelta(days=rng.randint(*nights))
+            status, data = call(client, "book", "POST", "/api/bookings", {
+                "hotel_id": hotel_id, "room_type_id": room_type_id, "check_in": ci.isoformat(),
+                "check_out": co.isoformat(), "num_guests": 1, "currency": "USD"})
+            if cancel and status == 200:
+                call(client, "cancel", "PATCH", f"/api/bookings/{data['booking_id']}/cancel")
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for th in workers:
+        th.start()
+    for th in workers:
+        th.join()
+    return sorted(latencies), statuses
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="concurrent booking overbooking check")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10, help="bookings attempted per thread and phase")
+    parser.add_argument("--rooms", type=int, default=3, help="rooms of the room type in the book phase")
+    parser.add_argument("--mixed-threads", type=int, default=16, help="threads in the book+cancel phase")
+    parser.add_argument("--mixed-rooms", type=int, default=500, help="rooms of the room type in the book+cancel phase")
+    parser.add_argument("--p99-ms", type=float, default=2000, help="fail if p99 latency exceeds this")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    app = create_app()
+    with app.app_context():
+        if db.engine.dialect.name != "postgresql":
+            print("stress_booking needs PostgreSQL (DATABASE_URL).")
+            return 2
+        small = load_synthetic(synthetic_args(hotels=1, rooms_per_type=args.rooms))
+        large = load_synthetic(synthetic_args(hotels=1, rooms_per_type=args.mixed_rooms, seed=args.seed + 1))
+        hotel_ids = small.hotel_ids + large.hotel_ids
+        start = small.anchor + timedelta(days=30)
+        deadlocks = _deadlocks()
+    try:
+        client = app.test_client()
+        resp = client.post("/api/auth/login", json=USER)
+        if resp.status_code != 200:
+            print("login failed; run scripts.seed first")
+            return 2
+        headers = {"Authorization": f"Bearer {resp.get_json()['access_token']}"}
+
+        phases = [
+            ("book", args.threads, small, args.rooms, (1, 3), False),
+            ("book+cancel", args.mixed_threads, large, args.mixed_rooms, (3, 8), True),
+        ]
+        failures, latencies = [], []
+        for label, threads, gen, rooms, nights, cancel in phases:
+            hid, rtid = gen.hotel_ids[0], gen.type_ids[0]
+            t = time.perf_counter()
+            lat, statuses = _phase(app, args, headers, threads, hid, rtid, start, nights, cancel)
+            elapsed = time.perf_counter() - t
+            latencies += lat
+            with app.app_context():
+                overbooked = _overbooked(rtid, rooms)
+                live = db.session.execute(text("""
+                    SELECT COUNT(*) FROM bookings WHERE room_type_id = :rtid AND status <> 'cancelled'
+                """), {"rtid": rtid}).scalar()
+            print(f"{label}: {len(lat)} requests from {threads} threads in {elapsed:.1f}s for {rooms} rooms: "
+                  + ", ".join(f"{n} x {op} {s}" for (op, s), n in sorted(statuses.items())))
+            print(f"  {live} live bookings; p50 {pct(lat, 50):.1f} ms, p99 {pct(lat, 99):.1f} ms")
+            if overbooked:
+                failures.append(f"{label}: overbooked nights: "
+                                + ", ".join(f"{night} ({n}/{rooms})" for night, n in overbooked))
+            expected = statuses.get(("book", 200), 0) - statuses.get(("cancel", 200), 0)
+            if live != expected:
+                failures.append(f"{label}: {expected} bookings should be live but {live} are")
+            unexpected = {key: n for key, n in statuses.items() if key[1] not in (200, 409)}
+            if unexpected:
+                failures.append(f"{label}: answers other than 200/409: "
+                                + ", ".join(f"{n} x {op} {s}" for (op, s), n in sorted(unexpected.items())))
+
+        latencies.sort()
+        with app.app_context():
+            drift = ledger.diff(hotel_ids)
+            deadlocks = _deadlocks() - deadlocks
+        if drift:
+            failures.append(f"ledger disagrees with bookings on {len(drift)} nights: {drift[:3]}")
+        if deadlocks:
+            failures.append(f"{deadlocks} deadlocks detected (pg_stat_database)")
+        if pct(latencies, 99) > args.p99_ms:
+            failures.append(f"p99 {pct(latencies, 99):.0f} ms exceeds {args.p99_ms:g} ms")
+        for f in failures:
+            print(f"[FAIL] {f}")
+        print("No overbooking, no deadlocks." if not failures else f"{len(failures)} check(s) failed.")
+        return 1 if failures else 0
+    finally:
+        with app.app_context():
+            delete_hotels(hotel_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
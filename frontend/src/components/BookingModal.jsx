@@ -1,6 +1,7 @@
 import { Fragment, useMemo, useState } from 'react';
 import { Dialog, Transition } from '@headlessui/react';
-import { createBooking } from '../lib/bookings';
+import { useQuery } from '@tanstack/react-query';
+import { createBooking, getQuote } from '../lib/bookings';
 import toast from 'react-hot-toast';
 import { isLoggedIn } from '../lib/auth';
 import { useNavigate } from 'react-router-dom';
@@ -23,12 +24,19 @@ export default function BookingModal({ open, onClose, hotel, roomType, checkIn,
   const nav = useNavigate();
 
   const nights = useMemo(() => nightsBetween(checkIn, checkOut), [checkIn, checkOut]);
-  const total = useMemo(() => Number(roomType?.base_price || 0) * nights, [roomType, nights]);
+  // Nightly rates vary (season, weekday, length of stay, demand): show and send the server's quote
+  const quoteQ = useQuery({
+    queryKey: ['quote', hotel?.id, roomType?.id, checkIn, checkOut],
+    enabled: Boolean(open && hotel && roomType && checkIn && checkOut),
+    queryFn: () => getQuote(hotel.id, roomType.id, checkIn, checkOut)
+  });
+  const total = quoteQ.data ? Number(quoteQ.data.total) : null;
 
   const submit = async () => {
     if (!isLoggedIn()) { toast.error('Please login to book'); nav('/login'); return; }
     if (!checkIn || !checkOut) { toast.error('Select dates first'); return; }
     if (!hotel || !roomType) { toast.error('Pick a room type'); return; }
+    if (total === null) { toast.error('Price not available yet'); return; }
 
     setLoading(true);
     try {
@@ -46,6 +54,7 @@ export default function BookingModal({ open, onClose, hotel, roomType, checkIn,
       onClose?.();
       nav('/my-bookings');
     } catch (e) {
+      if (e?.response?.status === 409 && e.response.data?.total_amount) quoteQ.refetch();
       const msg = e?.normalized?.message || e?.response?.data?.error || 'Booking failed';
       toast.error(msg);
     } finally {
@@ -72,8 +81,8 @@ export default function BookingModal({ open, onClose, hotel, roomType, checkIn,
                 <div className="flex justify-between"><span>Check-in</span><span>{fmtDate(checkIn)}</span></div>
                 <div className="flex justify-between"><span>Check-out</span><span>{fmtDate(checkOut)}</span></div>
                 <div className="flex justify-between"><span>Nights</span><span>{nights}</span></div>
-                <div className="flex justify-between"><span>Price / night</span><span>${roomType?.base_price}</span></div>
-                <div className="flex justify-between font-medium"><span>Total</span><span>${total.toFixed(2)}</span></div>
+                <div className="flex justify-between"><span>Price / night</span><span>{quoteQ.data ? `$${(total / quoteQ.data.nights).toFixed(2)} avg` : `from $${roomType?.base_price}`}</span></div>
+                <div className="flex justify-between font-medium"><span>Total</span><span>{total === null ? '…' : `$${total.toFixed(2)}`}</span></div>
                 <div className="flex items-center justify-between">
                   <label className="text-sm">Guests</label>
                   <input
@@ -93,7 +102,7 @@ export default function BookingModal({ open, onClose, hotel, roomType, checkIn,
                 </button>
                 <button
                   onClick={submit}
-                  disabled={loading}
+                  disabled={loading || total === null}
                   className="px-4 py-2 rounded-md bg-black text-white hover:bg-black/90 active:scale-[0.99] disabled:opacity-50"
                 >
                   {loading ? 'Booking…' : 'Book Now'}
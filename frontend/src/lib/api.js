@@ -13,14 +13,45 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Access tokens are short-lived: on a 401, trade the refresh token for a new
+// pair once (shared by concurrent requests) and replay the request.
+let refreshing = null;
+const refreshTokens = () => {
+  if (!refreshing) {
+    const rt = localStorage.getItem('refresh_token');
+    refreshing = (rt
+      ? api.post('/auth/refresh', null, { headers: { Authorization: `Bearer ${rt}` }, _retried: true })
+          .then(({ data }) => {
+            localStorage.setItem('access_token', data.access_token);
+            localStorage.setItem('refresh_token', data.refresh_token);
+            return data.access_token;
+          })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => { refreshing = null; });
+  }
+  return refreshing;
+};
+
 // Normalize errors and handle 401 logout
 api.interceptors.response.use(
   (res) => res,
-  (err) => {
+  async (err) => {
     const status = err?.response?.status;
+    const original = err?.config;
+    if (status === 401 && original && !original._retried && localStorage.getItem('refresh_token')) {
+      try {
+        const token = await refreshTokens();
+        original._retried = true;
+        original.headers.Authorization = `Bearer ${token}`;
+        return api(original);
+      } catch {
+        // fall through: refresh token expired or revoked
+      }
+    }
     if (status === 401) {
       // token invalid/expired -> clear and surface message
       localStorage.removeItem('access_token');
+      localStorage.removeItem('refresh_token');
     }
     err.normalized = {
       status: status || 0,
@@ -1,4 +1,5 @@
 // Lightweight auth helpers around JWT in localStorage
+import { api } from './api';
 
 const decode = (t) => {
   try { return JSON.parse(atob(t.split('.')[1] || '')) } catch { return null; }
@@ -12,8 +13,8 @@ export const getUser = () => {
   const p = decode(t);
   if (!p) return null;
   const now = Math.floor(Date.now()/1000);
-  if (p.exp && p.exp < now) {
-    // auto-expired -> cleanup
+  if (p.exp && p.exp < now && !localStorage.getItem('refresh_token')) {
+    // auto-expired and not renewable -> cleanup
     localStorage.removeItem('access_token');
     return null;
   }
@@ -27,8 +28,16 @@ export const getUser = () => {
 
 export const isLoggedIn = () => !!getUser();
 
-export const logout = () => {
+export const logout = async () => {
+  const refresh_token = localStorage.getItem('refresh_token');
+  try {
+    // Revoke both tokens server-side; best effort
+    await api.post('/auth/logout', { refresh_token }, { _retried: true });
+  } catch {
+    // already expired/revoked
+  }
   localStorage.removeItem('access_token');
+  localStorage.removeItem('refresh_token');
   window.location.assign('/');
 };
 
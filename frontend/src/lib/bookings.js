@@ -4,6 +4,11 @@ import { api } from './api';
 export const createBooking  = (payload)     => api.post('/bookings', payload).then(r => r.data);
 export const listMyBookings = (params = {}) => api.get('/bookings', { params }).then(r => r.data);
 
+// Server-side price of a stay for one room type: { total, nights, nightly: [{ night, price }] }
+export const getQuote = (hotelId, roomTypeId, checkIn, checkOut) =>
+  api.get(`/hotels/${hotelId}/quote`, { params: { room_type_id: roomTypeId, check_in: checkIn, check_out: checkOut } })
+    .then(r => r.data[0]);
+
 // NOTE: backend v1 does not expose GET /bookings/:id or PATCH /bookings/:id updates
 export const getBooking     = ()         => Promise.reject(new Error('getBooking not supported in backend v1'));
 export const updateBooking  = ()  => Promise.reject(new Error('updateBooking not supported in backend v1'));
@@ -27,7 +27,7 @@ export default function MyBookings(){
                 {String(b.check_in).slice(0,10)} → {String(b.check_out).slice(0,10)} · {b.status}
               </div>
             </div>
-            {b.status !== 'cancelled' && (
+            {(b.status === 'pending' || b.status === 'confirmed') && (
               <button
                 onClick={() => onCancel(b.id)}
                 className="px-3 py-2 border rounded-md hover:bg-gray-50"